@@ -1,74 +1,37 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import requests
-from groq import Groq
-import plotly.graph_objs as go
-from datetime import datetime, timedelta
-import time
-import re
 import os
+import time
 from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables (before the local modules read their settings)
 load_dotenv()
 
-# API Keys from environment variables
-GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
-SERPER_API_KEY = os.getenv("SERPER_API_KEY", "")
+from indicators import get_indicators, latest
+from charting import create_advanced_chart, update_chart, create_correlation_heatmap
+from universe import UNIVERSES, DEFAULT_UNIVERSE, get_universe, get_universe_snapshot, screener_universes
+from screener import screen, PRESETS as SCREENER_PRESETS, FEATURES as SCREENER_FEATURES
+from pipeline import (
+    normalize_stock_name, search_stock_symbol, get_stock_data,
+    get_comprehensive_stock_info, get_ai_analysis, get_best_indian_stocks_today
+)
+from backtest import STRATEGIES as BACKTEST_STRATEGIES, BACKTEST_COST_BPS, sweep, buy_and_hold, equity_curve
+from live import LIVE_INTERVALS, LIVE_POLL_SECONDS, get_live_series
+from timeframes import TIMEFRAMES, DEFAULT_TIMEFRAME, get_timeframe_data
+from portfolio import DEFAULT_HOLDINGS, PORTFOLIO_BENCHMARK, ROLLING_WINDOW, parse_holdings, analyze_portfolio
+from prefetch import start_prefetcher
+from prompts import dedupe_items
+from sentiment import news_sentiment, score_items, sentiment_series, label as sentiment_label
+from metrics import span, stage_stats, counters, start_metrics_server
+from cache import cache_stats, inflight
+from ratelimit import provider_stats
 
-# Initialize Groq client
-groq_client = Groq(api_key=GROQ_API_KEY)
+# Warm the shared caches for popular symbols in the background (once per process, PREFETCH=1)
+start_prefetcher()
+# Prometheus /metrics endpoint (once per process, METRICS_PORT)
+start_metrics_server()
 
-# Indian Stock Name to Symbol Mapping
-INDIAN_STOCKS = {
-    # Major Indian Companies
-    "reliance": "RELIANCE.NS", "reliance industries": "RELIANCE.NS", "ril": "RELIANCE.NS",
-    "tcs": "TCS.NS", "tata consultancy": "TCS.NS", "tata consultancy services": "TCS.NS",
-    "hdfc bank": "HDFCBANK.NS", "hdfc": "HDFCBANK.NS",
-    "infosys": "INFY.NS",
-    "icici bank": "ICICIBANK.NS", "icici": "ICICIBANK.NS",
-    "hul": "HINDUNILVR.NS", "hindustan unilever": "HINDUNILVR.NS",
-    "sbi": "SBIN.NS", "state bank of india": "SBIN.NS",
-    "bharti airtel": "BHARTIARTL.NS", "airtel": "BHARTIARTL.NS",
-    "bajaj finance": "BAJFINANCE.NS", "bajaj": "BAJFINANCE.NS",
-    "lt": "LT.NS", "larsen toubro": "LT.NS", "larsen": "LT.NS",
-    "itc": "ITC.NS",
-    "axis bank": "AXISBANK.NS", "axis": "AXISBANK.NS",
-    "asian paints": "ASIANPAINT.NS",
-    "maruti": "MARUTI.NS", "maruti suzuki": "MARUTI.NS",
-    "wipro": "WIPRO.NS",
-    "ultra tech": "ULTRACEMCO.NS", "ultratech cement": "ULTRACEMCO.NS",
-    "nestle": "NESTLEIND.NS", "nestle india": "NESTLEIND.NS",
-    "titan": "TITAN.NS",
-    "sun pharma": "SUNPHARMA.NS", "sun pharmaceutical": "SUNPHARMA.NS",
-    "hindalco": "HINDALCO.NS",
-    "jsw steel": "JSWSTEEL.NS",
-    "tata steel": "TATASTEEL.NS",
-    "adani ports": "ADANIPORTS.NS", "adani": "ADANIPORTS.NS",
-    "power grid": "POWERGRID.NS",
-    "ntpc": "NTPC.NS",
-    "coal india": "COALINDIA.NS",
-    "ongc": "ONGC.NS", "oil and natural gas": "ONGC.NS",
-    "indian oil": "IOC.NS", "ioc": "IOC.NS",
-    "gail": "GAIL.NS",
-    "vedanta": "VEDL.NS",
-    "jindal steel": "JINDALSTEL.NS",
-    "tata motors": "TATAMOTORS.NS",
-    "mahindra": "M&M.NS", "mahindra and mahindra": "M&M.NS",
-    "eicher motors": "EICHERMOT.NS", "royal enfield": "EICHERMOT.NS",
-    "hero motocorp": "HEROMOTOCO.NS", "hero": "HEROMOTOCO.NS",
-    "bajaj auto": "BAJAJ-AUTO.NS",
-    "dr reddy": "DRREDDY.NS", "dr reddys": "DRREDDY.NS",
-    "cipla": "CIPLA.NS",
-    "lupin": "LUPIN.NS",
-    "divis labs": "DIVISLAB.NS",
-    "zomato": "ZOMATO.NS",
-    "paytm": "PAYTM.NS",
-    "nykaa": "NYKAA.NS",
-    "policybazaar": "PBFintech.NS",
-    "delhivery": "DELHIVERY.NS",
-}
+DEBUG_PANEL = os.getenv("DEBUG_PANEL", "0") in ("1", "true", "True")
 
 # Page config with better styling
 st.set_page_config(
@@ -138,327 +101,84 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-def normalize_stock_name(name):
-    """Normalize and find stock symbol from name"""
-    if not name:
-        return None
-    
-    name_lower = name.lower().strip()
-    
-    # Check if it's already a symbol (contains .NS or .BO)
-    if '.NS' in name.upper() or '.BO' in name.upper():
-        return name.upper()
-    
-    # Direct match
-    if name_lower in INDIAN_STOCKS:
-        return INDIAN_STOCKS[name_lower]
-    
-    # Partial match
-    for key, symbol in INDIAN_STOCKS.items():
-        if name_lower in key or key in name_lower:
-            return symbol
-    
-    # Try with Serper to find the symbol
-    return None
-
-def search_stock_symbol(query):
-    """Search for stock symbol using Serper API"""
-    try:
-        url = "https://google.serper.dev/search"
-        payload = {
-            "q": f"{query} stock symbol NSE BSE India",
-            "num": 5
-        }
-        headers = {
-            "X-API-KEY": SERPER_API_KEY,
-            "Content-Type": "application/json"
-        }
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            results = response.json().get("organic", [])
-            # Try to extract symbol from results
-            for result in results:
-                title = result.get("title", "").upper()
-                snippet = result.get("snippet", "").upper()
-                # Look for .NS pattern
-                if ".NS" in title or ".NS" in snippet:
-                    match = re.search(r'([A-Z]+\.NS)', title + " " + snippet)
-                    if match:
-                        return match.group(1)
-        return None
-    except:
-        return None
-
-def get_stock_data(symbol, period="5d", interval="1h"):
-    """Fetch real-time stock data using yfinance"""
-    try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period=period, interval=interval)
-        info = ticker.info
-        return data, info
-    except Exception as e:
-        return None, None
-
-def get_comprehensive_stock_info(symbol, company_name):
-    """Get comprehensive stock information from Serper"""
-    try:
-        results = {}
-        
-        # Search for general information
-        url = "https://google.serper.dev/search"
-        queries = [
-            f"{company_name} {symbol} stock analysis India",
-            f"{company_name} financial results earnings India",
-            f"{company_name} stock price target India",
-            f"{company_name} news latest India"
-        ]
-        
-        all_news = []
-        all_info = []
-        
-        for query in queries:
-            payload = {"q": query, "num": 10}
-            headers = {
-                "X-API-KEY": SERPER_API_KEY,
-                "Content-Type": "application/json"
-            }
-            response = requests.post(url, json=payload, headers=headers)
-            if response.status_code == 200:
-                data = response.json()
-                all_news.extend(data.get("news", []))
-                all_info.extend(data.get("organic", []))
-        
-        # Get news separately
-        news_url = "https://google.serper.dev/news"
-        news_payload = {
-            "q": f"{company_name} {symbol} stock news India",
-            "num": 20
-        }
-        news_response = requests.post(news_url, json=news_payload, headers={
-            "X-API-KEY": SERPER_API_KEY,
-            "Content-Type": "application/json"
-        })
-        if news_response.status_code == 200:
-            all_news.extend(news_response.json().get("news", []))
-        
-        return {
-            "news": all_news[:30],  # Limit to 30 most recent
-            "search_results": all_info[:20],
-            "company_name": company_name
-        }
-    except Exception as e:
-        return {"news": [], "search_results": [], "company_name": company_name}
-
-def get_ai_analysis(symbol, stock_data, stock_info, serper_data):
-    """Get AI-powered comprehensive analysis using Groq"""
+def render_streamed_markdown(chunks, placeholder_text, error_prefix):
+    """Render markdown incrementally as chunks arrive; returns (full text, whether it failed)"""
+    placeholder = st.empty()
+    if isinstance(chunks, str):
+        placeholder.markdown(chunks)
+        return chunks, chunks.startswith(error_prefix)
+    placeholder.markdown(placeholder_text)
+    text = ""
+    failed = False
+    last_render = 0.0
     try:
-        # Prepare data summary
-        if stock_data is not None and not stock_data.empty:
-            current_price = stock_data['Close'].iloc[-1]
-            prev_close = stock_data['Close'].iloc[-2] if len(stock_data) > 1 else current_price
-            change = current_price - prev_close
-            change_pct = (change / prev_close) * 100 if prev_close > 0 else 0
-            
-            high_52w = stock_data['High'].max() if len(stock_data) > 0 else current_price
-            low_52w = stock_data['Low'].min() if len(stock_data) > 0 else current_price
-            
-            # Calculate technical indicators
-            sma_20 = stock_data['Close'].tail(20).mean() if len(stock_data) >= 20 else current_price
-            sma_50 = stock_data['Close'].tail(50).mean() if len(stock_data) >= 50 else current_price
-            
-            volume = stock_data['Volume'].iloc[-1]
-            avg_volume = stock_data['Volume'].tail(20).mean() if len(stock_data) >= 20 else volume
-        else:
-            current_price = stock_info.get('currentPrice', stock_info.get('regularMarketPrice', 0))
-            prev_close = stock_info.get('previousClose', current_price)
-            change = current_price - prev_close
-            change_pct = ((change / prev_close) * 100) if prev_close > 0 else 0
-            high_52w = stock_info.get('fiftyTwoWeekHigh', current_price)
-            low_52w = stock_info.get('fiftyTwoWeekLow', current_price)
-            sma_20 = current_price
-            sma_50 = current_price
-            volume = stock_info.get('volume', 0)
-            avg_volume = stock_info.get('averageVolume', volume)
-        
-        # Prepare news and info summary
-        news_summary = ""
-        if serper_data.get("news"):
-            news_summary = "\n".join([
-                f"- {item.get('title', '')}: {item.get('snippet', '')[:100]}"
-                for item in serper_data["news"][:10]
-            ])
-        
-        info_summary = ""
-        if serper_data.get("search_results"):
-            info_summary = "\n".join([
-                f"- {item.get('title', '')}: {item.get('snippet', '')[:100]}"
-                for item in serper_data["search_results"][:5]
-            ])
-        
-        company_name = serper_data.get("company_name", symbol)
-        
-        prompt = f"""Analyze the Indian stock {symbol} ({company_name}) with the following comprehensive information:
-
-PRICE DATA:
-Current Price: ₹{current_price:.2f}
-Previous Close: ₹{prev_close:.2f}
-Change: ₹{change:.2f} ({change_pct:+.2f}%)
-52 Week High: ₹{high_52w:.2f}
-52 Week Low: ₹{low_52w:.2f}
-SMA 20: ₹{sma_20:.2f}
-SMA 50: ₹{sma_50:.2f}
-Volume: {volume:,.0f}
-Average Volume (20d): {avg_volume:,.0f}
-
-COMPANY INFORMATION:
-- Sector: {stock_info.get('sector', 'N/A')}
-- Industry: {stock_info.get('industry', 'N/A')}
-- Market Cap: ₹{stock_info.get('marketCap', 0)/1e7:.2f} Cr
-- P/E Ratio: {stock_info.get('trailingPE', 'N/A')}
-- Book Value: ₹{stock_info.get('bookValue', 'N/A')}
-- Dividend Yield: {stock_info.get('dividendYield', 0)*100 if stock_info.get('dividendYield') else 0:.2f}%
-- Beta: {stock_info.get('beta', 'N/A')}
-
-RECENT NEWS & INFORMATION:
-{news_summary if news_summary else 'No recent news available'}
-
-MARKET INTELLIGENCE:
-{info_summary if info_summary else 'No additional information available'}
-
-Provide a comprehensive analysis including:
-1. **Executive Summary** - Brief overview of the stock
-2. **Technical Analysis** - Price action, support/resistance, indicators
-3. **Fundamental Analysis** - Financial health, valuation metrics
-4. **Market Sentiment** - Based on news and market data
-5. **Trading Recommendation** - Buy/Hold/Sell with reasoning
-6. **Price Targets** - Short-term and medium-term targets
-7. **Risk Assessment** - Key risks and concerns
-8. **Investment Strategy** - Best approach for this stock
-
-Format the analysis clearly with sections and actionable insights. Focus on Indian market context."""
-
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert Indian stock market analyst with deep knowledge of NSE, BSE, technical analysis, fundamental analysis, and Indian market trends. Provide detailed, actionable insights."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.7,
-            max_tokens=2000
-        )
-        
-        return chat_completion.choices[0].message.content
+        for chunk in chunks:
+            text += chunk
+            # Throttle redraws; each one is a websocket message to the browser
+            if time.monotonic() - last_render > 0.05:
+                placeholder.markdown(text + "▌")
+                last_render = time.monotonic()
     except Exception as e:
-        return f"Error generating AI analysis: {str(e)}"
-
-def get_best_indian_stocks_today():
-    """Get AI recommendation for best Indian stocks for today"""
-    try:
-        popular_symbols = ["RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "INFY.NS", "ICICIBANK.NS", 
-                          "BHARTIARTL.NS", "SBIN.NS", "BAJFINANCE.NS", "LT.NS", "ITC.NS"]
-        
-        prompt = f"""Based on current Indian market conditions (NSE/BSE), analyze these popular stocks: {', '.join(popular_symbols)}
+        text += f"\n\n{error_prefix}: {str(e)}"
+        failed = True
+    placeholder.markdown(text)
+    return text, failed
 
-Provide your top 5 best Indian stock picks for today with:
-1. Stock symbol and company name
-2. Current price range
-3. Brief reason (2-3 sentences)
-4. Expected price movement direction (Up/Down/Sideways)
-5. Risk level (Low/Medium/High)
-6. Entry strategy
+def symbol_memo(symbol):
+    """Per-session store of results computed for the symbol being viewed"""
+    if st.session_state.get("memo_symbol") != symbol:
+        # Switching stocks drops everything memoized for the previous one
+        st.session_state.memo_symbol = symbol
+        st.session_state.memo = {}
+    return st.session_state.memo
 
-Format as a numbered list with clear sections."""
+def session_memo(symbol, key, compute):
+    """Compute a value once per session for the current symbol and reuse it on later reruns"""
+    memo = symbol_memo(symbol)
+    if key not in memo:
+        memo[key] = compute()
+    return memo[key]
 
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert Indian stock market analyst. Provide actionable stock recommendations based on NSE/BSE market analysis."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.7,
-            max_tokens=1000
-        )
-        
-        return chat_completion.choices[0].message.content
-    except Exception as e:
-        return f"Error generating recommendations: {str(e)}"
-
-def create_advanced_chart(data, symbol):
-    """Create advanced interactive price chart"""
-    if data is None or data.empty:
-        return None
-    
-    fig = go.Figure()
-    
-    # Candlestick chart
-    fig.add_trace(go.Candlestick(
-        x=data.index,
-        open=data['Open'],
-        high=data['High'],
-        low=data['Low'],
-        close=data['Close'],
-        name=symbol,
-        increasing_line_color='#00ff88',
-        decreasing_line_color='#ff4444'
-    ))
-    
-    # Add moving averages
-    if len(data) >= 20:
-        data['SMA20'] = data['Close'].rolling(window=20).mean()
-        fig.add_trace(go.Scatter(
-            x=data.index,
-            y=data['SMA20'],
-            name='SMA 20',
-            line=dict(color='#ffaa00', width=2)
-        ))
+@st.fragment(run_every=LIVE_POLL_SECONDS)
+def render_live_chart(symbol, interval):
+    """Live intraday chart; only this fragment reruns on each poll, not the page around it"""
+    series = get_live_series(symbol, interval)
+    poll = series.poll()
+    bars, live_indicators, version = series.snapshot()
+    if bars.empty:
+        st.info(f"No {interval} bars available for {symbol} yet.")
+        return
+    memo = symbol_memo(symbol)
+    if memo.get("live_version") != (interval, version):
+        fig = memo.get("live_chart") if memo.get("live_interval") == interval else None
+        # New bars are swapped into the existing figure; it is only built once per interval
+        if fig is None or not update_chart(fig, bars, live_indicators):
+            with span("chart.build", symbol=symbol, bars=len(bars)):
+                fig = create_advanced_chart(bars, f"{symbol} {interval}", live_indicators)
+                # Keep the user's zoom and pan across updates
+                fig.update_layout(uirevision=f"{symbol}-{interval}")
+        memo.update(live_chart=fig, live_interval=interval, live_version=(interval, version))
+    with span("chart.render", symbol=symbol):
+        st.plotly_chart(memo["live_chart"], use_container_width=True, key="live_chart")
     
-    if len(data) >= 50:
-        data['SMA50'] = data['Close'].rolling(window=50).mean()
-        fig.add_trace(go.Scatter(
-            x=data.index,
-            y=data['SMA50'],
-            name='SMA 50',
-            line=dict(color='#7C5CFF', width=2)
-        ))
-    
-    # Volume bars
-    colors = ['#00ff88' if data['Close'].iloc[i] >= data['Open'].iloc[i] else '#ff4444' 
-              for i in range(len(data))]
-    
-    fig.add_trace(go.Bar(
-        x=data.index,
-        y=data['Volume'],
-        name='Volume',
-        marker_color=colors,
-        opacity=0.3,
-        yaxis='y2'
-    ))
-    
-    fig.update_layout(
-        title=f"{symbol} - Advanced Stock Analysis",
-        xaxis_title="Time",
-        yaxis_title="Price (₹)",
-        yaxis2=dict(title="Volume", overlaying="y", side="right"),
-        template="plotly_dark",
-        height=600,
-        xaxis_rangeslider_visible=False,
-        hovermode='x unified',
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-    )
-    
-    return fig
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Last", f"₹{bars['Close'].iloc[-1]:.2f}")
+    with col2:
+        vwap = latest(live_indicators, 'VWAP')
+        st.metric("VWAP", f"₹{vwap:.2f}" if vwap is not None else "N/A")
+    with col3:
+        rsi = latest(live_indicators, 'RSI14')
+        st.metric("RSI 14", f"{rsi:.1f}" if rsi is not None else "N/A")
+    with col4:
+        volatility = latest(live_indicators, 'Volatility20')
+        st.metric("Volatility", f"{volatility:.2f}%" if volatility is not None else "N/A")
+    status = f"Last bar {bars.index[-1]:%H:%M} • {len(bars)} bars held"
+    if poll:
+        status += f" • last poll: {poll['new']} new, {poll['revised']} updated in {poll['elapsed_ms']:.0f} ms"
+        if poll.get("error"):
+            status += f" • ⚠️ {poll['error']}"
+    st.caption(status)
 
 # Main App
 st.title("🇮🇳 Indian Stock AI Analyzer")
@@ -480,13 +200,34 @@ with st.sidebar:
     
     st.markdown("---")
     
+    best_stocks_universe = st.selectbox(
+        "Best Stocks universe",
+        options=list(UNIVERSES),
+        index=list(UNIVERSES).index(DEFAULT_UNIVERSE) if DEFAULT_UNIVERSE in UNIVERSES else 0,
+        format_func=lambda key: UNIVERSES[key][0]
+    )
+    
     if st.button("🏆 Get Best Indian Stocks Today", use_container_width=True):
         st.session_state.show_best_stocks = True
+        st.session_state.show_screener = False
+        st.session_state.show_portfolio = False
         st.session_state.current_symbol = None
     else:
         if 'show_best_stocks' not in st.session_state:
             st.session_state.show_best_stocks = False
     
+    if st.button("🔎 Stock Screener", use_container_width=True):
+        st.session_state.show_screener = True
+        st.session_state.show_best_stocks = False
+        st.session_state.show_portfolio = False
+        st.session_state.current_symbol = None
+    
+    if st.button("📂 Portfolio Risk", use_container_width=True):
+        st.session_state.show_portfolio = True
+        st.session_state.show_best_stocks = False
+        st.session_state.show_screener = False
+        st.session_state.current_symbol = None
+    
     st.markdown("---")
     st.markdown("### 💡 Tips")
     st.markdown("""
@@ -512,6 +253,8 @@ if user_input:
     if symbol:
         st.session_state.current_symbol = symbol
         st.session_state.show_best_stocks = False
+        st.session_state.show_screener = False
+        st.session_state.show_portfolio = False
         # Extract company name from input
         company_name = user_input.title()
     else:
@@ -520,23 +263,124 @@ if user_input:
 # Best Stocks Section
 if st.session_state.get('show_best_stocks', False):
     st.header("🏆 Best Indian Stocks for Today")
-    with st.spinner("🤖 AI is analyzing market conditions..."):
-        recommendations = get_best_indian_stocks_today()
-        st.markdown(recommendations)
+    with st.spinner("📊 Loading market snapshot..."):
+        snapshot = get_universe_snapshot(get_universe(best_stocks_universe))
+    if not snapshot.empty:
+        with st.expander("📊 Market snapshot used for these picks"):
+            st.dataframe(snapshot, use_container_width=True)
+    render_streamed_markdown(
+        get_best_indian_stocks_today(stream=True, universe=best_stocks_universe),
+        "🤖 AI is analyzing market conditions...",
+        "Error generating recommendations"
+    )
+    st.markdown("---")
+
+# Screener Section
+if st.session_state.get('show_screener', False):
+    st.header("🔎 Stock Screener")
+    universes = screener_universes()
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        screener_universe = st.selectbox(
+            "Universe", options=list(universes), index=list(universes).index("nifty50"),
+            format_func=lambda key: universes[key][0], key="screener_universe"
+        )
+    with col2:
+        preset = st.selectbox("Preset", ["Custom"] + list(SCREENER_PRESETS), key="screener_preset")
+    expression = st.text_input(
+        "Filter",
+        value=SCREENER_PRESETS.get(preset, ""),
+        placeholder="close > sma50 and rsi14 < 70 and vol_ratio > 1.5",
+        key=f"screener_expression_{preset}",
+        help="Columns: " + ", ".join(f"{name} ({desc})" for name, desc in SCREENER_FEATURES.items())
+    )
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sort_by = st.selectbox("Sort by", list(SCREENER_FEATURES), index=list(SCREENER_FEATURES).index("vol_ratio"))
+    with col2:
+        ascending = st.checkbox("Ascending", value=False)
+    with col3:
+        limit = st.number_input("Max results", min_value=5, max_value=500, value=50, step=5)
+    
+    with st.spinner(f"📊 Loading {universes[screener_universe][0]} price history..."):
+        started = time.perf_counter()
+        try:
+            results = screen(universes[screener_universe][1], expression, sort_by, ascending, int(limit))
+        except ValueError as e:
+            results = None
+            st.error(f"❌ {e}")
+    if results is not None:
+        st.caption(f"{len(results)} matches from {len(universes[screener_universe][1])} stocks "
+                   f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        st.dataframe(results, use_container_width=True)
+    st.markdown("---")
+
+# Portfolio Risk Section
+if st.session_state.get('show_portfolio', False):
+    st.header("📂 Portfolio Risk")
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        holdings_text = st.text_area(
+            "Holdings (one per line: name or symbol, optional quantity)",
+            value=DEFAULT_HOLDINGS, height=200, key="portfolio_holdings",
+            help="Weights follow market value when every line has a quantity; otherwise holdings are equally weighted"
+        )
+    with col2:
+        portfolio_period = st.selectbox("History", ["1y", "2y", "5y"], index=1, key="portfolio_period")
+        window = st.slider("Rolling window (days)", 20, 250, ROLLING_WINDOW, step=10, key="portfolio_window")
+    
+    holdings, unresolved = parse_holdings(holdings_text)
+    if unresolved:
+        st.warning(f"⚠️ Could not find: {', '.join(unresolved)}")
+    if holdings:
+        with st.spinner(f"📊 Loading price history for {len(holdings)} holdings..."):
+            started = time.perf_counter()
+            risk = analyze_portfolio(holdings, portfolio_period, window=window)
+        if risk is None:
+            st.error("❌ Could not load price history for these holdings")
+        else:
+            summary = risk["summary"]
+            if risk["missing"]:
+                st.warning(f"⚠️ No price history for: {', '.join(risk['missing'])}")
+            col1, col2, col3, col4, col5 = st.columns(5)
+            col1.metric("Volatility (annual)", f"{summary['volatility_%']:.1f}%")
+            col2.metric("Beta vs NIFTY 50", f"{summary['beta']:.2f}" if risk["benchmark"] else "N/A")
+            col3.metric("Return (annualized)", f"{summary['annual_return_%']:.1f}%")
+            col4.metric("Avg correlation", f"{summary['avg_correlation']:.2f}")
+            col5.metric("Diversification ratio", f"{summary['diversification_ratio']:.2f}")
+            st.caption(f"{summary['holdings']} holdings over {summary['days']} trading days "
+                       f"in {(time.perf_counter() - started) * 1000:.0f} ms (benchmark {PORTFOLIO_BENCHMARK})")
+            st.dataframe(risk["holdings"].sort_values("weight_%", ascending=False).round(3), use_container_width=True)
+            st.plotly_chart(create_correlation_heatmap(risk["correlation"]), use_container_width=True)
+            if risk["benchmark"]:
+                top = risk["holdings"]["weight_%"].nlargest(10).index
+                st.markdown(f"**{window}-day correlation with NIFTY 50** (largest holdings)")
+                st.line_chart(risk["rolling_correlation"][top].dropna(how="all"))
+            st.markdown(f"**{window}-day portfolio volatility (annualized %)**")
+            st.line_chart(risk["rolling_volatility"].dropna())
+            with st.expander("Covariance matrix (annualized)"):
+                st.dataframe(risk["covariance"], use_container_width=True)
     st.markdown("---")
 
 # Stock Analysis Section
 if st.session_state.get('current_symbol'):
     symbol = st.session_state.current_symbol
     
-    with st.spinner(f"📊 Fetching comprehensive data for {symbol}..."):
-        # Get stock data
+    with st.spinner(f"📊 Fetching price data for {symbol}..."):
+        # Only the price quote is loaded up front; each section loads what it needs
         stock_data, stock_info = get_stock_data(symbol, period="1mo", interval="1d")
-        
-        # Get comprehensive Serper data
-        serper_data = get_comprehensive_stock_info(symbol, company_name or stock_info.get('longName', symbol))
+    
+    def load_serper_data():
+        """News and search results, fetched the first time a section needs them"""
+        def fetch():
+            with st.spinner("📰 Fetching news and market intelligence..."):
+                return get_comprehensive_stock_info(symbol, company_name or stock_info.get('longName', symbol))
+        return session_memo(symbol, "serper", fetch)
     
     if stock_data is not None and stock_info:
+        # Indicators are shared by the chart, metrics and AI prompt (memoized per last bar)
+        indicators = get_indicators(symbol, "1d", stock_data)
+        
         # Header with stock name
         company_display = stock_info.get('longName', company_name or symbol)
         st.header(f"📈 {company_display} ({symbol})")
@@ -567,49 +411,116 @@ if st.session_state.get('current_symbol'):
         
         st.markdown("---")
         
-        # Tabs
-        tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Advanced Chart", "🤖 AI Analysis", "📰 Latest News", "📈 Market Data", "ℹ️ Company Info"])
+        # Sections: unlike st.tabs, only the selected one runs, so the chart, news
+        # fan-out and AI analysis cost nothing until the user opens them
+        sections = ["📊 Advanced Chart", "🤖 AI Analysis", "📰 Latest News", "📈 Market Data", "ℹ️ Company Info", "🧪 Backtest"]
+        section = st.radio("Section", sections, horizontal=True, label_visibility="collapsed", key="stock_section")
         
-        with tab1:
+        if section == sections[0]:
             st.subheader("📊 Advanced Price Chart with Technical Indicators")
-            if not stock_data.empty:
-                fig = create_advanced_chart(stock_data, symbol)
-                if fig:
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                # Additional technical metrics
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    sma_20 = stock_data['Close'].tail(20).mean() if len(stock_data) >= 20 else current_price
-                    st.metric("SMA 20", f"₹{sma_20:.2f}")
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                live_mode = st.toggle("🔴 Live intraday", key="live_mode")
+            if live_mode:
                 with col2:
-                    sma_50 = stock_data['Close'].tail(50).mean() if len(stock_data) >= 50 else current_price
-                    st.metric("SMA 50", f"₹{sma_50:.2f}")
-                with col3:
-                    volume = stock_data['Volume'].iloc[-1] if not stock_data.empty else 0
-                    st.metric("Volume", f"{volume:,.0f}")
-                with col4:
-                    volatility = stock_data['Close'].pct_change().std() * 100 if len(stock_data) > 1 else 0
-                    st.metric("Volatility", f"{volatility:.2f}%")
+                    live_interval = st.radio("Interval", LIVE_INTERVALS, horizontal=True, key="live_interval",
+                                             label_visibility="collapsed")
+                render_live_chart(symbol, live_interval)
             else:
-                st.info("Chart data loading...")
+                with col2:
+                    timeframe = st.radio("Timeframe", list(TIMEFRAMES), index=list(TIMEFRAMES).index(DEFAULT_TIMEFRAME),
+                                         horizontal=True, key="chart_timeframe", label_visibility="collapsed")
+                # Each timeframe is resampled from one cached base fetch, so switching costs no extra call
+                with st.spinner(f"📊 Loading {timeframe} bars..."):
+                    chart_data = get_timeframe_data(symbol, timeframe)
+                chart_indicators = get_indicators(symbol, timeframe, chart_data)
+                if chart_data is not None and not chart_data.empty:
+                    # Rebuilt only when a new or updated bar arrives
+                    memo = symbol_memo(symbol)
+                    last_bar = (timeframe, len(chart_data), chart_data.index[-1], float(chart_data['Close'].iloc[-1]))
+                    if memo.get("chart_bar") != last_bar:
+                        with span("chart.build", symbol=symbol, bars=len(chart_data)):
+                            memo["chart"] = create_advanced_chart(chart_data, f"{symbol} ({timeframe})", chart_indicators)
+                        memo["chart_bar"] = last_bar
+                    fig = memo["chart"]
+                    if fig:
+                        # Figure serialization and transfer to the browser
+                        with span("chart.render", symbol=symbol):
+                            st.plotly_chart(fig, use_container_width=True)
+                
+                    # Additional technical metrics
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        sma_20 = latest(chart_indicators, 'SMA20', current_price)
+                        st.metric("SMA 20", f"₹{sma_20:.2f}")
+                    with col2:
+                        sma_50 = latest(chart_indicators, 'SMA50', current_price)
+                        st.metric("SMA 50", f"₹{sma_50:.2f}")
+                    with col3:
+                        volume = chart_data['Volume'].iloc[-1]
+                        st.metric("Volume", f"{volume:,.0f}")
+                    with col4:
+                        volatility = latest(chart_indicators, 'Volatility20')
+                        st.metric("Volatility", f"{volatility:.2f}%" if volatility is not None else "N/A")
+                
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        rsi = latest(chart_indicators, 'RSI14')
+                        st.metric("RSI 14", f"{rsi:.1f}" if rsi is not None else "N/A")
+                    with col2:
+                        macd = latest(chart_indicators, 'MACD')
+                        st.metric("MACD", f"{macd:.2f}" if macd is not None else "N/A")
+                    with col3:
+                        atr = latest(chart_indicators, 'ATR14')
+                        st.metric("ATR 14", f"₹{atr:.2f}" if atr is not None else "N/A")
+                    with col4:
+                        vwap = latest(chart_indicators, 'VWAP')
+                        st.metric("VWAP", f"₹{vwap:.2f}" if vwap is not None else "N/A")
+                else:
+                    st.info(f"No {timeframe} bars available for {symbol}.")
         
-        with tab2:
+        if section == sections[1]:
             st.subheader("🤖 AI-Powered Comprehensive Analysis")
-            with st.spinner("🤖 AI is analyzing the stock..."):
-                analysis = get_ai_analysis(symbol, stock_data, stock_info, serper_data)
-                st.markdown(analysis)
+            memo = symbol_memo(symbol)
+            if "analysis" in memo:
+                st.markdown(memo["analysis"])
+            else:
+                serper_data = load_serper_data()
+                analysis, failed = render_streamed_markdown(
+                    get_ai_analysis(symbol, stock_data, stock_info, serper_data, stream=True, indicators=indicators),
+                    "🤖 AI is analyzing the stock...",
+                    "Error generating AI analysis"
+                )
+                if not failed:
+                    memo["analysis"] = analysis
         
-        with tab3:
+        if section == sections[2]:
             st.subheader("📰 Latest News & Market Updates")
-            news_items = serper_data.get("news", [])
+            # Syndicated copies of the same story are shown once
+            serper_data = load_serper_data()
+            news_items = dedupe_items(serper_data.get("news", []))
             if news_items:
-                for i, item in enumerate(news_items[:15]):
+                # Scored locally per article (cached by link); the history builds up across visits
+                with span("sentiment", symbol=symbol):
+                    summary = news_sentiment(symbol, serper_data)
+                    item_scores = score_items(news_items[:15])
+                    history = sentiment_series(symbol)
+                col1, col2, col3 = st.columns(3)
+                col1.metric("News Sentiment", f"{summary['score']:+.2f}", summary['label'].title())
+                col2.metric("Positive / Negative", f"{summary['positive']} / {summary['negative']}")
+                col3.metric("Articles Scored", summary['items'])
+                if len(history) > 1:
+                    st.markdown("**Daily news sentiment** (mean article score, -1 to +1)")
+                    st.bar_chart(history["score"])
+                st.markdown("---")
+                badges = {"positive": "🟢", "negative": "🔴", "neutral": "⚪"}
+                for i, (item, scored) in enumerate(zip(news_items[:15], item_scores)):
                     with st.container():
                         st.markdown(f"### {item.get('title', 'No title')}")
                         col1, col2 = st.columns([3, 1])
                         with col1:
-                            st.markdown(f"**Source:** {item.get('source', 'Unknown')}")
+                            st.markdown(f"**Source:** {item.get('source', 'Unknown')} · "
+                                        f"{badges[sentiment_label(scored['score'])]} {scored['score']:+.2f}")
                             st.markdown(f"{item.get('snippet', 'No description available')}")
                         with col2:
                             if item.get('link'):
@@ -619,7 +530,7 @@ if st.session_state.get('current_symbol'):
             else:
                 st.info("No recent news available for this stock.")
         
-        with tab4:
+        if section == sections[3]:
             st.subheader("📈 Detailed Market Data")
             col1, col2 = st.columns(2)
             
@@ -651,7 +562,7 @@ if st.session_state.get('current_symbol'):
                 for key, value in financial_data.items():
                     st.markdown(f"**{key}:** {value}")
         
-        with tab5:
+        if section == sections[4]:
             st.subheader("ℹ️ Company Information")
             info_cols = {
                 "Company Name": stock_info.get('longName', 'N/A'),
@@ -669,9 +580,60 @@ if st.session_state.get('current_symbol'):
                 st.markdown("---")
                 st.markdown("### Business Summary")
                 st.markdown(stock_info.get('longBusinessSummary'))
+        
+        if section == sections[5]:
+            st.subheader("🧪 Strategy Backtest")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                strategy = st.selectbox("Strategy", list(BACKTEST_STRATEGIES),
+                                        format_func=lambda name: BACKTEST_STRATEGIES[name]["label"])
+            with col2:
+                backtest_period = st.selectbox("History", ["2y", "5y", "10y"], index=1)
+            with col3:
+                cost_bps = st.number_input("Cost per trade (bps)", min_value=0.0, max_value=100.0,
+                                           value=BACKTEST_COST_BPS, step=5.0)
+            with st.spinner(f"📊 Loading {backtest_period} of daily history..."):
+                history, _ = get_stock_data(symbol, period=backtest_period, interval="1d")
+            if history is None or len(history) < 60:
+                st.info("Not enough daily history to backtest this stock.")
+            else:
+                closes = history['Close'].dropna()
+                started = time.perf_counter()
+                # Every combination in the strategy's grid is evaluated at once
+                results = sweep(closes.to_numpy(), strategy, cost_bps=cost_bps)
+                hold = buy_and_hold(closes.to_numpy())
+                st.caption(f"{len(results)} parameter combinations over {len(closes)} bars "
+                           f"in {(time.perf_counter() - started) * 1000:.0f} ms • signals trade at the close and "
+                           f"earn from the next bar • buy & hold: {hold['total_return_%']:.1f}% "
+                           f"(max drawdown {hold['max_drawdown_%']:.1f}%)")
+                if not results.empty:
+                    params = BACKTEST_STRATEGIES[strategy]["params"]
+                    best = results.iloc[0]
+                    st.markdown("**Best by Sharpe ratio:** " + ", ".join(f"{name} = {int(best[name])}" for name in params))
+                    st.line_chart(equity_curve(closes, strategy, [int(best[name]) for name in params], cost_bps))
+                    st.dataframe(results.head(20).round(2), use_container_width=True)
     else:
         st.error(f"❌ Could not fetch data for {symbol}. Please check the symbol and try again.")
 
+# Performance panel (DEBUG_PANEL=1 or ?debug=1); drawn last so it includes this rerun
+if DEBUG_PANEL or st.query_params.get("debug") == "1":
+    with st.sidebar:
+        st.markdown("---")
+        with st.expander("⏱️ Performance", expanded=True):
+            stages = pd.DataFrame(stage_stats())
+            if stages.empty:
+                st.caption("No stages timed yet")
+            else:
+                st.dataframe(
+                    stages.set_index("stage")[["count", "errors", "p50_ms", "p95_ms"]].round(1),
+                    use_container_width=True
+                )
+            if counters():
+                st.json(counters())
+            st.dataframe(pd.DataFrame(cache_stats()).set_index("name"), use_container_width=True)
+            st.dataframe(pd.DataFrame(provider_stats()).set_index("name"), use_container_width=True)
+            st.caption(f"In flight: {inflight.stats()}")
+
 # Footer
 st.markdown("---")
 st.markdown("""
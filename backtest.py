@@ -0,0 +1,214 @@
+"""Vectorized backtests of the indicator signals shown on the chart.
+
+Strategies are long/flat rules evaluated on daily closes:
+
+    ma_crossover  long while SMA(fast) > SMA(slow)
+    rsi           go long when RSI(period) < lower, exit when it rises above upper
+
+A parameter sweep is evaluated as a matrix: every indicator the grid needs is
+computed once, positions for all combinations form a bars x combos array, and
+returns, equity curves and drawdowns are reduced along the time axis in NumPy.
+Sweeps over several symbols run one symbol per worker process.
+
+    python backtest.py RELIANCE.NS TCS.NS --strategy ma_crossover --period 10y --processes 4
+"""
+import argparse
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from metrics import span
+
+PERIODS_PER_YEAR = 252
+BACKTEST_COST_BPS = float(os.getenv("BACKTEST_COST_BPS", "10"))
+
+STRATEGIES = {
+    "ma_crossover": {
+        "label": "SMA crossover",
+        "params": ("fast", "slow"),
+        "grid": {"fast": range(5, 55, 5), "slow": range(20, 210, 10)},
+    },
+    "rsi": {
+        "label": "RSI mean reversion",
+        "params": ("period", "lower", "upper"),
+        "grid": {"period": (7, 14, 21), "lower": range(20, 45, 5), "upper": range(50, 85, 5)},
+    },
+}
+
+
+def expand_grid(strategy, grid=None):
+    """Valid parameter combinations for `strategy` as a list of tuples"""
+    spec = STRATEGIES[strategy]
+    grid = grid or spec["grid"]
+    combos = itertools.product(*(list(grid[name]) for name in spec["params"]))
+    if strategy == "ma_crossover":
+        return [(fast, slow) for fast, slow in combos if fast < slow]
+    return [(period, lower, upper) for period, lower, upper in combos if lower < upper]
+
+
+def sma_columns(close, windows):
+    """{window: SMA array} from one cumulative sum (NaN until the window fills)"""
+    csum = np.concatenate(([0.0], np.cumsum(close)))
+    out = {}
+    for window in set(windows):
+        sma = np.full(len(close), np.nan)
+        if window <= len(close):
+            sma[window - 1:] = (csum[window:] - csum[:-window]) / window
+        out[window] = sma
+    return out
+
+
+def rsi_columns(close, periods):
+    """{period: Wilder RSI array}"""
+    delta = pd.Series(close).diff()
+    gain, loss = delta.clip(lower=0), -delta.clip(upper=0)
+    out = {}
+    for period in set(periods):
+        avg_gain = gain.ewm(alpha=1 / period, adjust=False, min_periods=period).mean().to_numpy()
+        avg_loss = loss.ewm(alpha=1 / period, adjust=False, min_periods=period).mean().to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[period] = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, np.nan),
+                                   100 - 100 / (1 + avg_gain / avg_loss))
+    return out
+
+
+def positions(close, strategy, combos):
+    """bars x combos array of 0/1 positions held at each bar's close"""
+    if strategy == "ma_crossover":
+        smas = sma_columns(close, [w for combo in combos for w in combo])
+        fast = np.column_stack([smas[f] for f, _ in combos])
+        slow = np.column_stack([smas[s] for _, s in combos])
+        with np.errstate(invalid="ignore"):
+            return (fast > slow).astype(np.float64)
+    if strategy == "rsi":
+        rsis = rsi_columns(close, [combo[0] for combo in combos])
+        rsi = np.column_stack([rsis[period] for period, _, _ in combos])
+        lower = np.array([combo[1] for combo in combos], dtype=float)
+        upper = np.array([combo[2] for combo in combos], dtype=float)
+        # 1 on entry bars, 0 on exit bars, NaN otherwise; carrying the last signal forward
+        # gives the stateful in/out position without a per-bar loop
+        with np.errstate(invalid="ignore"):
+            signal = np.where(rsi < lower, 1.0, np.where(rsi > upper, 0.0, np.nan))
+        return pd.DataFrame(signal).ffill().fillna(0.0).to_numpy()
+    raise ValueError(f"Unknown strategy: {strategy}")
+
+
+def evaluate(close, position, cost_bps=BACKTEST_COST_BPS):
+    """Performance of each position column; returns (metrics DataFrame, equity matrix)"""
+    close = np.asarray(close, dtype=float)
+    returns = np.zeros(len(close))
+    returns[1:] = close[1:] / close[:-1] - 1
+    # A signal at a close is traded at that close, so it earns from the next bar on
+    held = np.vstack([np.zeros((1, position.shape[1])), position[:-1]])
+    turnover = np.abs(np.diff(position, axis=0, prepend=0.0))
+    strategy_returns = held * returns[:, None] - turnover * cost_bps / 1e4
+    equity = np.cumprod(1 + strategy_returns, axis=0)
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+    years = max(len(close) - 1, 1) / PERIODS_PER_YEAR
+    mean, std = strategy_returns.mean(axis=0), strategy_returns.std(axis=0, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics = pd.DataFrame({
+            "total_return_%": (equity[-1] - 1) * 100,
+            "cagr_%": (equity[-1] ** (1 / years) - 1) * 100,
+            "volatility_%": std * np.sqrt(PERIODS_PER_YEAR) * 100,
+            "sharpe": np.where(std > 0, mean / std * np.sqrt(PERIODS_PER_YEAR), np.nan),
+            "max_drawdown_%": drawdown.min(axis=0) * 100,
+            "trades": (np.diff(position, axis=0, prepend=0.0) > 0).sum(axis=0),
+            "exposure_%": held.mean(axis=0) * 100,
+        })
+    return metrics, equity
+
+
+def buy_and_hold(close):
+    """Metrics for simply holding over the same bars"""
+    metrics, _ = evaluate(close, np.ones((len(close), 1)), cost_bps=0)
+    return metrics.iloc[0]
+
+
+def sweep(close, strategy, grid=None, cost_bps=BACKTEST_COST_BPS, sort_by="sharpe"):
+    """Every parameter combination of `strategy` over `close`, best first"""
+    close = np.asarray(close, dtype=float)
+    combos = expand_grid(strategy, grid)
+    if not combos or len(close) < 2:
+        return pd.DataFrame()
+    with span("backtest.sweep", strategy=strategy, bars=len(close), combos=len(combos)):
+        metrics, _ = evaluate(close, positions(close, strategy, combos), cost_bps)
+    params = pd.DataFrame(combos, columns=STRATEGIES[strategy]["params"])
+    result = pd.concat([params, metrics], axis=1)
+    return result.sort_values(sort_by, ascending=False, na_position="last").reset_index(drop=True)
+
+
+def equity_curve(closes, strategy, params, cost_bps=BACKTEST_COST_BPS):
+    """Strategy and buy-and-hold equity for one parameter set, indexed like `closes`"""
+    close = closes.to_numpy(dtype=float)
+    position = positions(close, strategy, [tuple(params)])
+    _, equity = evaluate(close, position, cost_bps)
+    return pd.DataFrame({"Strategy": equity[:, 0], "Buy & Hold": close / close[0]}, index=closes.index)
+
+
+def _sweep_symbol(args):
+    symbol, close, strategy, grid, cost_bps = args
+    result = sweep(close, strategy, grid, cost_bps)
+    result.insert(0, "symbol", symbol)
+    return result
+
+
+def sweep_symbols(closes, strategy, grid=None, cost_bps=BACKTEST_COST_BPS, processes=None):
+    """sweep() for each {symbol: close array}, one symbol per worker process"""
+    jobs = [(symbol, np.asarray(close, dtype=float), strategy, grid, cost_bps)
+            for symbol, close in closes.items() if len(close) > 1]
+    processes = processes or os.cpu_count() or 1
+    if processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(jobs))) as executor:
+            results = list(executor.map(_sweep_symbol, jobs))
+    else:
+        results = [_sweep_symbol(job) for job in jobs]
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+
+def load_closes(symbols, period="5y"):
+    """Daily closes per symbol from the shared caches and OHLCV store"""
+    from pipeline import get_stock_data
+
+    closes = {}
+    for symbol in symbols:
+        data, _ = get_stock_data(symbol, period=period, interval="1d")
+        if data is not None and not data.empty:
+            closes[symbol] = data["Close"].dropna()
+    return closes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep strategy parameters over daily history")
+    parser.add_argument("symbols", nargs="+", help="NSE/BSE symbols, e.g. RELIANCE.NS")
+    parser.add_argument("--strategy", choices=list(STRATEGIES), default="ma_crossover")
+    parser.add_argument("--period", default="5y")
+    parser.add_argument("--cost-bps", type=float, default=BACKTEST_COST_BPS, help="cost per position change")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--top", type=int, default=5, help="best combinations shown per symbol")
+    parser.add_argument("--out", help="write every result to this CSV")
+    args = parser.parse_args(argv)
+
+    closes = load_closes([s.upper() for s in args.symbols], args.period)
+    if not closes:
+        print("No price history for the given symbols", file=sys.stderr)
+        return 1
+    results = sweep_symbols({s: c.to_numpy() for s, c in closes.items()}, args.strategy,
+                            cost_bps=args.cost_bps, processes=args.processes)
+    if args.out:
+        results.to_csv(args.out, index=False)
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        for symbol, close in closes.items():
+            hold = buy_and_hold(close.to_numpy())
+            print(f"\n{symbol}: {len(close)} bars, buy & hold {hold['total_return_%']:.1f}% "
+                  f"(max drawdown {hold['max_drawdown_%']:.1f}%)")
+            print(results[results["symbol"] == symbol].head(args.top).round(2).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Analyze a watchlist without the UI.
+
+    python batch.py watchlist.txt --out results.json --workers 4 --no-ai
+
+The watchlist has one stock name or symbol per line; blank lines and lines
+starting with # are ignored. Results are written as JSON, or as a flat table
+when --out ends in .parquet or .csv.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from pipeline import analyze_symbol
+
+
+def read_watchlist(path):
+    """Stock names/symbols from a watchlist file, in order and without duplicates"""
+    with open(path, encoding="utf-8") as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return list(dict.fromkeys(line for line in lines if line))
+
+
+def run_batch(queries, workers=4, **options):
+    """analyze_symbol for every query on a bounded thread pool, results in input order"""
+    def run(query):
+        try:
+            return analyze_symbol(query, **options)
+        except Exception as e:
+            return {"query": query, "symbol": None, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(queries) or 1))) as executor:
+        return list(executor.map(run, queries))
+
+
+def write_results(results, path):
+    if path.endswith((".parquet", ".csv")):
+        # One row per stock; nested indicator and sentiment values become indicators.<name> / sentiment.<name> columns
+        table = pd.json_normalize([{k: v for k, v in r.items() if k != "news"} for r in results])
+        if path.endswith(".parquet"):
+            table.to_parquet(path, index=False)
+        else:
+            table.to_csv(path, index=False)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a watchlist of Indian stocks headlessly")
+    parser.add_argument("watchlist", help="file with one stock name or symbol per line")
+    parser.add_argument("--out", default="results.json", help="output file (.json, .parquet or .csv)")
+    parser.add_argument("--workers", type=int, default=4, help="stocks analyzed concurrently")
+    parser.add_argument("--period", default="1mo")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--no-ai", action="store_true", help="skip the Groq analysis")
+    parser.add_argument("--no-news", action="store_true", help="skip Serper news")
+    args = parser.parse_args(argv)
+
+    queries = read_watchlist(args.watchlist)
+    if not queries:
+        parser.error("watchlist is empty")
+    started = time.perf_counter()
+    results = run_batch(
+        queries, workers=args.workers, period=args.period, interval=args.interval,
+        with_news=not args.no_news, with_ai=not args.no_ai,
+    )
+    write_results(results, args.out)
+    failed = [r for r in results if r.get("error")]
+    print(f"Analyzed {len(results) - len(failed)}/{len(results)} stocks in "
+          f"{time.perf_counter() - started:.1f}s -> {args.out}", file=sys.stderr)
+    for r in failed:
+        print(f"  {r['query']}: {r['error']}", file=sys.stderr)
+    return 1 if len(failed) == len(results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,468 @@
+"""Offline benchmark of the page pipeline.
+
+Yahoo is replaced by recorded fixtures (or deterministic generated bars when a
+symbol has none), Serper and Groq by the local fake servers in stubs.py, each
+with configurable latency. The caches and on-disk stores live in a temporary
+directory, so every run starts cold.
+
+    python bench.py                                 # run and print the report
+    python bench.py --save-baseline                 # run and store it as the baseline
+    python bench.py --baseline .cache/bench_baseline.json --tolerance 0.2
+    python bench.py --record --symbols RELIANCE.NS,TCS.NS   # record real responses (needs network and keys)
+
+Reported: per-stage latency for a cold and a warm page view (price data,
+indicators, news, AI first token and total, chart), page latency and throughput
+for N concurrent sessions, peak traced memory, and app startup (import time of
+the app's modules, first script run, and rerun time with and without a stock
+page open, measured in a fresh interpreter). Compared with a baseline,
+any latency more than --tolerance slower (or throughput lower) is flagged and
+the exit status is 1.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES = os.path.join(ROOT, ".cache", "bench_fixtures")
+DEFAULT_BASELINE = os.path.join(ROOT, ".cache", "bench_baseline.json")
+DEFAULT_SYMBOLS = "RELIANCE.NS,TCS.NS,HDFCBANK.NS,INFY.NS,ICICIBANK.NS,SBIN.NS,ITC.NS,LT.NS"
+
+# Metrics where a larger value is better; everything else is a latency or size
+HIGHER_IS_BETTER = ("sessions.pages_per_sec",)
+
+# Imported on first use; the app loading any of them during a sidebar-only run is a
+# regression. Streamlit itself may already have imported some (recent versions load
+# plotly.graph_objs for st.plotly_chart); those are not the app's doing and are not flagged
+DEFERRED_MODULES = ("groq", "yfinance", "requests", "plotly.graph_objs")
+# The app's own modules import in 90-220 ms from a clean checkout (numpy and pandas
+# are timed separately); an eager yfinance (~360 ms) or groq (~260 ms) breaks this
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "400"))
+
+
+# --- Yahoo replay ---------------------------------------------------------
+
+def generated_history(symbol, bars=260, interval="1d"):
+    """Deterministic random-walk OHLCV for `symbol`, ending today"""
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+    freq = "B" if interval in ("1d", "5d") else interval.replace("m", "min")
+    end = pd.Timestamp.now(tz="Asia/Kolkata").normalize()
+    index = pd.date_range(end=end, periods=bars, freq=freq)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, bars)))
+    open_ = close * (1 + rng.normal(0, 0.004, bars))
+    frame = pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, bars)),
+        "Low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, bars)),
+        "Close": close,
+        "Volume": rng.integers(100_000, 5_000_000, bars).astype(float),
+        "Dividends": 0.0,
+        "Stock Splits": 0.0,
+    }, index=index)
+    frame.index.name = "Date"
+    return frame
+
+
+def generated_info(symbol):
+    name = symbol.split(".")[0].title()
+    return {"symbol": symbol, "longName": f"{name} Limited", "shortName": name, "sector": "Industrials",
+            "industry": "Conglomerates", "marketCap": 1.5e12, "trailingPE": 24.0, "beta": 1.1,
+            "fiftyTwoWeekHigh": 150.0, "fiftyTwoWeekLow": 80.0, "dividendYield": 0.01,
+            "longBusinessSummary": f"{name} is a benchmark fixture company."}
+
+
+def _fixture_path(fixtures, kind, symbol, ext):
+    return os.path.join(fixtures, kind, f"{symbol.replace('/', '_')}.{ext}")
+
+
+def install_yahoo_replay(fixtures, latency):
+    """Point yfinance's Ticker and download at recorded (or generated) data with `latency` per call"""
+    import yfinance as yf
+    from store import period_start
+
+    def history(symbol, period=None, interval="1d", start=None):
+        path = _fixture_path(fixtures, "history", f"{symbol}_{interval}", "parquet")
+        frame = pd.read_parquet(path) if os.path.exists(path) else generated_history(symbol, interval=interval)
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start)]
+        if period and period != "max":
+            return frame[frame.index >= period_start(period, frame.index[-1])]
+        return frame
+
+    class ReplayTicker:
+        def __init__(self, symbol):
+            self.symbol = symbol
+
+        def history(self, period=None, interval="1d", start=None, **kwargs):
+            time.sleep(latency)
+            return history(self.symbol, period, interval, start)
+
+        @property
+        def info(self):
+            time.sleep(latency)
+            path = _fixture_path(fixtures, "info", self.symbol, "json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    return json.load(f)
+            return generated_info(self.symbol)
+
+    def download(symbols, period="1mo", interval="1d", **kwargs):
+        time.sleep(latency)
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        frames = {s: history(s, period, interval).drop(columns=["Dividends", "Stock Splits"], errors="ignore")
+                  for s in symbols}
+        return pd.concat(frames, axis=1)
+
+    yf.Ticker = ReplayTicker
+    yf.download = download
+
+
+# --- Recording ------------------------------------------------------------
+
+def record(symbols, fixtures):
+    """Save real Yahoo history/info and Serper responses for `symbols` as fixtures"""
+    import yfinance as yf
+    import serper
+    from pipeline import get_comprehensive_stock_info
+
+    os.makedirs(os.path.join(fixtures, "history"), exist_ok=True)
+    os.makedirs(os.path.join(fixtures, "info"), exist_ok=True)
+    responses = {}
+    original_post = serper.serper_post
+
+    def recording_post(endpoint, payload, timeout=serper.SERPER_TIMEOUT, label=None):
+        body = original_post(endpoint, payload, timeout, label)
+        if body is not None:
+            responses[f"{endpoint}:{payload.get('q', '')}"] = body
+        return body
+
+    serper.serper_post = recording_post
+    for symbol in symbols:
+        ticker = yf.Ticker(symbol)
+        frame = ticker.history(period="1y", interval="1d")
+        if frame.empty:
+            print(f"  {symbol}: no history, skipped", file=sys.stderr)
+            continue
+        frame.to_parquet(_fixture_path(fixtures, "history", f"{symbol}_1d", "parquet"))
+        info = ticker.info
+        with open(_fixture_path(fixtures, "info", symbol, "json"), "w") as f:
+            json.dump(info, f, default=str)
+        get_comprehensive_stock_info(symbol, info.get("longName", symbol))
+        print(f"  {symbol}: {len(frame)} bars", file=sys.stderr)
+    serper.serper_post = original_post
+    path = os.path.join(fixtures, "serper.json")
+    existing = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+    existing.update(responses)
+    with open(path, "w") as f:
+        json.dump(existing, f)
+    print(f"Recorded {len(symbols)} symbols and {len(responses)} Serper responses into {fixtures}", file=sys.stderr)
+
+
+# --- Benchmark ------------------------------------------------------------
+
+def reset_caches():
+    """Empty every in-memory and on-disk cache the pipeline reads"""
+    from cache import history_cache, info_cache, news_cache
+    from indicators import indicator_cache
+    from llm import response_cache
+    from serper import symbol_search_cache
+    from store import OHLCV_STORE_DIR
+
+    for c in (history_cache, info_cache, news_cache, indicator_cache, response_cache, symbol_search_cache):
+        c.clear()
+    shutil.rmtree(OHLCV_STORE_DIR, ignore_errors=True)
+
+
+def _timed(timings, stage, fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    timings[stage] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def page_view(symbol, timings=None):
+    """Everything one stock page loads, with per-stage wall time in ms"""
+    from pipeline import get_stock_data, get_comprehensive_stock_info, get_ai_analysis
+    from indicators import get_indicators
+    from charting import create_advanced_chart
+
+    timings = {} if timings is None else timings
+    started = time.perf_counter()
+    stock_data, stock_info = _timed(timings, "get_stock_data", get_stock_data, symbol, "1mo", "1d")
+    if stock_data is None or not stock_info:
+        raise RuntimeError(f"no data for {symbol}")
+    indicators = _timed(timings, "indicators", get_indicators, symbol, "1d", stock_data)
+    _timed(timings, "chart", create_advanced_chart, stock_data, symbol, indicators)
+    serper_data = _timed(timings, "news", get_comprehensive_stock_info, symbol, stock_info.get("longName", symbol))
+
+    ai_started = time.perf_counter()
+    chunks = get_ai_analysis(symbol, stock_data, stock_info, serper_data, stream=True, indicators=indicators)
+    if isinstance(chunks, str):
+        raise RuntimeError(chunks)
+    for i, _ in enumerate(chunks):
+        if i == 0:
+            timings["ai_first_token"] = (time.perf_counter() - ai_started) * 1000
+    timings["ai_total"] = (time.perf_counter() - ai_started) * 1000
+    timings["page"] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def bench_stages(symbols):
+    """Median per-stage latency over `symbols`, cold caches then warm"""
+    results = {}
+    for phase in ("cold", "warm"):
+        if phase == "cold":
+            reset_caches()
+        runs = [page_view(symbol) for symbol in symbols]
+        for stage in runs[0]:
+            results[f"stage.{stage}.{phase}_ms"] = float(np.median([run[stage] for run in runs]))
+    return results
+
+
+def bench_chart(bars, repeats=5):
+    """Chart build time for one long intraday series (exercises downsampling)"""
+    from charting import create_advanced_chart
+    from indicators import compute_indicators
+
+    data = generated_history("CHART.NS", bars=bars, interval="5m")
+    indicators = compute_indicators(data)
+    runs = []
+    for _ in range(repeats):
+        timings = {}
+        _timed(timings, "chart", create_advanced_chart, data, "CHART.NS", indicators)
+        runs.append(timings["chart"])
+    return {f"chart.{bars}_bars_ms": float(np.median(runs))}
+
+
+def bench_sessions(symbols, sessions, pages):
+    """`sessions` concurrent users each opening `pages` stock pages, from cold caches"""
+    latencies = []
+    lock = threading.Lock()
+
+    def session(n):
+        for i in range(pages):
+            timings = page_view(symbols[(n + i) % len(symbols)])
+            with lock:
+                latencies.append(timings["page"])
+
+    def run():
+        reset_caches()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessions) as executor:
+            list(executor.map(session, range(sessions)))
+        return time.perf_counter() - started
+
+    elapsed = run()
+    results = {
+        "sessions.page_p50_ms": float(np.percentile(latencies, 50)),
+        "sessions.page_p95_ms": float(np.percentile(latencies, 95)),
+        "sessions.pages_per_sec": len(latencies) / elapsed,
+    }
+    # Again under tracemalloc, which slows Python code too much to time the same run
+    tracemalloc.start()
+    run()
+    results["memory.traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return results
+
+
+# Runs in a fresh interpreter: argv = root, reruns, deferred modules, fixtures
+_STARTUP_PROBE = r'''
+import ast, json, os, statistics, sys, time
+root, reruns, deferred, fixtures = sys.argv[1], int(sys.argv[2]), sys.argv[3].split(","), sys.argv[4]
+sys.path.insert(0, root)
+app_path = os.path.join(root, "app.py")
+results = {}
+
+started = time.perf_counter()
+from dotenv import load_dotenv
+from streamlit.testing.v1 import AppTest
+results["startup.streamlit_import_ms"] = (time.perf_counter() - started) * 1000
+preloaded = {module for module in deferred if module in sys.modules}
+
+# pandas (and the pyarrow it pulls in) is needed by every page and dominates a cold
+# import; timing it apart keeps import_ms about the repo's own modules
+started = time.perf_counter()
+import numpy, pandas
+results["startup.dependency_import_ms"] = (time.perf_counter() - started) * 1000
+
+load_dotenv()
+# The repo's own modules imported by app.py, in its order
+tree = ast.parse(open(app_path).read())
+modules = [node.module if isinstance(node, ast.ImportFrom) else node.names[0].name
+           for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+started = time.perf_counter()
+for module in modules:
+    if module and os.path.exists(os.path.join(root, module + ".py")):
+        __import__(module)
+results["startup.import_ms"] = (time.perf_counter() - started) * 1000
+
+app = AppTest.from_file(app_path, default_timeout=120)
+started = time.perf_counter()
+app.run()
+results["startup.first_run_ms"] = (time.perf_counter() - started) * 1000
+
+def rerun_ms():
+    samples = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        app.run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+results["startup.sidebar_rerun_ms"] = rerun_ms()
+loaded = [module for module in deferred if module in sys.modules and module not in preloaded]
+
+from bench import install_yahoo_replay
+install_yahoo_replay(fixtures, 0)
+app.sidebar.text_input[0].input("RELIANCE").run()
+results["startup.page_rerun_ms"] = rerun_ms()
+print(json.dumps({"results": results, "loaded": loaded, "errors": [str(e.value) for e in app.exception]}))
+'''
+
+
+def bench_startup(fixtures, reruns=5):
+    """app.py cold start and rerun times in a fresh interpreter, plus deferred modules it loaded early"""
+    probe = subprocess.run(
+        [sys.executable, "-c", _STARTUP_PROBE, ROOT, str(reruns), ",".join(DEFERRED_MODULES), fixtures],
+        capture_output=True, text=True, cwd=ROOT, env=os.environ.copy(),
+    )
+    if probe.returncode != 0:
+        raise RuntimeError(f"startup probe failed: {probe.stderr.strip()[-2000:]}")
+    report = json.loads(probe.stdout.strip().splitlines()[-1])
+    if report["errors"]:
+        raise RuntimeError(f"app.py raised during the startup probe: {report['errors']}")
+    return report["results"], report["loaded"]
+
+
+def compare(results, baseline, tolerance, noise_ms=5.0):
+    """Print results next to the baseline; returns the names of regressed metrics.
+
+    Latencies within `noise_ms` of the baseline are never flagged, so sub-millisecond
+    cache hits do not fail the comparison on timer jitter.
+    """
+    regressions = []
+    print(f"{'metric':40} {'value':>12} {'baseline':>12} {'change':>9}")
+    for name, value in results.items():
+        base = baseline.get(name)
+        if base is None or base == 0:
+            print(f"{name:40} {value:12.2f} {'-':>12} {'':>9}")
+            continue
+        change = value / base - 1
+        worse = -change if name in HIGHER_IS_BETTER else change
+        noise = name.endswith("_ms") and abs(value - base) < noise_ms
+        flag = "  REGRESSION" if worse > tolerance and not noise else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:40} {value:12.2f} {base:12.2f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the stock page pipeline")
+    parser.add_argument("--symbols", default=DEFAULT_SYMBOLS, help="comma-separated symbols")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="recorded Yahoo/Serper fixtures directory")
+    parser.add_argument("--record", action="store_true", help="record real responses into --fixtures and exit")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated sessions")
+    parser.add_argument("--pages", type=int, default=4, help="pages opened per session")
+    parser.add_argument("--chart-bars", type=int, default=50_000, help="bars in the long-series chart benchmark")
+    parser.add_argument("--yahoo-latency", type=float, default=0.15, help="seconds per Yahoo call")
+    parser.add_argument("--serper-latency", type=float, default=0.3, help="seconds per Serper call")
+    parser.add_argument("--groq-latency", type=float, default=0.4, help="seconds to the first Groq token")
+    parser.add_argument("--groq-chunk-delay", type=float, default=0.005, help="seconds between Groq chunks")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging")
+    parser.add_argument("--noise-ms", type=float, default=5.0, help="latency differences ignored as jitter")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--startup", action="store_true", help="only measure app startup and rerun time")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                        help="fail when importing the app's modules takes longer")
+    args = parser.parse_args(argv)
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+
+    # Isolated, cold caches; settings are read when the modules are first imported
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="stock-bench-")
+    os.environ.pop("OHLCV_STORE_DIR", None)
+    if args.record:
+        record(symbols, args.fixtures)
+        return 0
+
+    from stubs import FakeGroqHandler, FakeSerperHandler, start_server
+
+    FakeGroqHandler.first_token_delay = args.groq_latency
+    FakeGroqHandler.chunk_delay = args.groq_chunk_delay
+    FakeSerperHandler.latency = args.serper_latency
+    serper_fixtures = os.path.join(args.fixtures, "serper.json")
+    if os.path.exists(serper_fixtures):
+        with open(serper_fixtures) as f:
+            FakeSerperHandler.fixtures = json.load(f)
+    _, groq_url = start_server(FakeGroqHandler)
+    _, serper_url = start_server(FakeSerperHandler)
+    os.environ.update({"GROQ_BASE_URL": groq_url, "GROQ_API_KEY": "bench",
+                       "SERPER_BASE_URL": serper_url, "SERPER_API_KEY": "bench"})
+    # Measure the code, not the client-side quotas
+    for provider in ("SERPER", "GROQ", "YAHOO"):
+        os.environ[f"{provider}_RATE_PER_SEC"] = os.environ[f"{provider}_BURST"] = "10000"
+    install_yahoo_replay(args.fixtures, args.yahoo_latency)
+
+    results = {}
+    startup, loaded = bench_startup(args.fixtures)
+    results.update(startup)
+    if not args.startup:
+        results.update(bench_stages(symbols))
+        results.update(bench_chart(args.chart_bars))
+        results.update(bench_sessions(symbols, args.sessions, args.pages))
+    if resource is not None and not args.startup:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results["memory.max_rss_mb"] = rss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+    shutil.rmtree(os.environ["CACHE_DIR"], ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.noise_ms)
+    if results["startup.import_ms"] > args.import_budget_ms:
+        print(f"Importing the app's modules took {results['startup.import_ms']:.0f} ms "
+              f"(budget {args.import_budget_ms:.0f} ms)")
+        regressions.append("startup.import_ms")
+    if loaded:
+        print(f"Loaded before any page needed them: {', '.join(loaded)}")
+        regressions.append("startup.deferred_imports")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""Process-wide TTL caches shared across Streamlit reruns and sessions.
+
+Streamlit re-executes app.py on every widget interaction, so anything that
+must survive a rerun lives in this imported module instead of the script.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+from market import is_market_open, seconds_until_open
+
+# Price history is refreshed often while the market is open, fundamentals rarely
+HISTORY_TTL = int(os.getenv("HISTORY_CACHE_TTL", "60"))
+HISTORY_CLOSED_TTL_MAX = int(os.getenv("HISTORY_CACHE_CLOSED_TTL_MAX", str(6 * 3600)))
+INFO_TTL = int(os.getenv("INFO_CACHE_TTL", str(6 * 3600)))
+NEWS_TTL = int(os.getenv("NEWS_CACHE_TTL", str(15 * 60)))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+BARS_CACHE_MAX_ENTRIES = int(os.getenv("BARS_CACHE_MAX_ENTRIES", "4096"))
+
+# On-disk caches shared by every process on the host
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a per-entry TTL"""
+
+    def __init__(self, maxsize=CACHE_MAX_ENTRIES, ttl=300, name="cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for `key`, or `default` if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store `value` under `key` for `ttl` seconds (defaults to the cache TTL)"""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop a single entry"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class PersistentCache:
+    """SQLite-backed JSON cache with per-entry TTL and LRU eviction past `max_entries`.
+
+    Each instance owns one table in CACHE_DIR/cache.db; connections are opened (and
+    closed) per call so the cache is safe to share across threads and processes.
+    """
+
+    def __init__(self, name, ttl, max_entries=1000, path=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path or os.path.join(CACHE_DIR, "cache.db")
+        self.hits = 0
+        self.misses = 0
+        self._table = "cache_" + "".join(c if c.isalnum() else "_" for c in name)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self._table}_accessed ON {self._table} (accessed_at)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, key, default=None):
+        """Return the cached value for `key`, or `default` if missing or expired"""
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn, conn:
+                row = conn.execute(
+                    f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or row[1] <= now:
+                    if row is not None:
+                        conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+                    self.misses += 1
+                    return default
+                conn.execute(f"UPDATE {self._table} SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        """Store a JSON-serialisable `value` under `key` for `ttl` seconds"""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now + ttl, now),
+                )
+                conn.execute(f"DELETE FROM {self._table} WHERE expires_at <= ?", (now,))
+                conn.execute(
+                    f"DELETE FROM {self._table} WHERE key IN ("
+                    f"SELECT key FROM {self._table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error:
+            pass
+
+    def get_many(self, keys):
+        """{key: value} for the keys that are cached and fresh, read in one query"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        try:
+            with closing(self._connect()) as conn, conn:
+                # Stay well under SQLite's bound-parameter limit
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    marks = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT key, value FROM {self._table} WHERE key IN ({marks}) AND expires_at > ?",
+                        (*chunk, now),
+                    ).fetchall()
+                    found.update((key, json.loads(value)) for key, value in rows)
+                    conn.execute(
+                        f"UPDATE {self._table} SET accessed_at = ? WHERE key IN ({marks}) AND expires_at > ?",
+                        (now, *chunk, now),
+                    )
+        except sqlite3.Error:
+            found = {}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items, ttl=None):
+        """Store every {key: JSON-serialisable value} for `ttl` seconds in one transaction"""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or not items:
+            return
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    [(key, json.dumps(value), now + ttl, now) for key, value in items.items()],
+                )
+                conn.execute(f"DELETE FROM {self._table} WHERE expires_at <= ?", (now,))
+                conn.execute(
+                    f"DELETE FROM {self._table} WHERE key IN ("
+                    f"SELECT key FROM {self._table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error:
+            pass
+
+    def update(self, key, fn, default=None, ttl=None):
+        """Replace the value under `key` with fn(current value or `default`) in one transaction; returns it.
+
+        The write lock is taken before the read, so concurrent updates from any thread or
+        process apply one after another instead of overwriting each other.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    f"SELECT value FROM {self._table} WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                value = fn(json.loads(row[0]) if row else default)
+                if ttl > 0:
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                        (key, json.dumps(value), now + ttl, now),
+                    )
+                    conn.execute(f"DELETE FROM {self._table} WHERE expires_at <= ?", (now,))
+                    conn.execute(
+                        f"DELETE FROM {self._table} WHERE key IN ("
+                        f"SELECT key FROM {self._table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,),
+                    )
+        except sqlite3.Error:
+            return None
+        return value
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"DELETE FROM {self._table}")
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+
+    def stats(self):
+        """Hit/miss counters (this process) and current size (all processes)"""
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self),
+            "maxsize": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+        # Partial results a streaming leader has published so far, in order
+        self.parts = []
+        self.progress = threading.Condition()
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight wait and receive the same result (or exception).
+    """
+
+    def __init__(self, name="inflight"):
+        self.name = name
+        self.executions = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """Return (call, is_leader); the leader must later call finish()"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.coalesced += 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self.executions += 1
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        """Publish the leader's outcome to every waiting follower"""
+        call.result, call.error = result, error
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+        with call.progress:
+            call.progress.notify_all()
+
+    def forget(self, key, call):
+        """Stop routing new callers for `key` to `call`, leaving it to finish for its own followers"""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def publish(self, call, part):
+        """Share a partial result (e.g. a streamed chunk) with the followers as it is produced"""
+        with call.progress:
+            call.parts.append(part)
+            call.progress.notify_all()
+
+    def follow(self, call, timeout=None):
+        """Yield the leader's published parts as they arrive, until it finishes.
+
+        Raises TimeoutError when nothing new arrives for `timeout` seconds, and the
+        leader's error if it failed.
+        """
+        index = 0
+        while True:
+            with call.progress:
+                if not call.progress.wait_for(lambda: index < len(call.parts) or call.done.is_set(), timeout):
+                    raise TimeoutError("in-flight call made no progress")
+                parts = call.parts[index:]
+                finished = call.done.is_set()
+            index += len(parts)
+            yield from parts
+            if finished and index >= len(call.parts):
+                if call.error is not None:
+                    raise call.error
+                return
+
+    def do(self, key, fn, timeout=None):
+        """Run `fn()` once for all concurrent callers with the same key"""
+        call, leader = self.begin(key)
+        if not leader:
+            if not call.done.wait(timeout):
+                # The leader is stuck; don't let it take this caller down with it, and
+                # send later callers to a fresh execution instead of the stuck one
+                self.forget(key, call)
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result
+
+    def stats(self):
+        """Executions vs coalesced callers"""
+        return {"name": self.name, "in_flight": len(self._calls),
+                "executions": self.executions, "coalesced": self.coalesced}
+
+
+def history_ttl():
+    """TTL for price history: short during the session, until the next open otherwise"""
+    if is_market_open():
+        return HISTORY_TTL
+    return max(HISTORY_TTL, min(seconds_until_open(), HISTORY_CLOSED_TTL_MAX))
+
+
+# Shared by every session in the process: identical concurrent fetches run once
+inflight = SingleFlight()
+
+# Shared caches: history keyed by (symbol, period, interval), info and news keyed by symbol
+history_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=HISTORY_TTL, name="history")
+info_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=INFO_TTL, name="info")
+news_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=NEWS_TTL, name="news")
+# Daily bars per (symbol, period, interval) from batched downloads; sized for whole universes
+bars_cache = TTLCache(maxsize=BARS_CACHE_MAX_ENTRIES, ttl=HISTORY_TTL, name="bars")
+
+
+def cache_stats():
+    """Stats for every shared cache"""
+    return [history_cache.stats(), info_cache.stats(), news_cache.stats(), bars_cache.stats()]
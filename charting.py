@@ -0,0 +1,146 @@
+"""Plotly price charts with bounded payload size"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from indicators import compute_indicators, latest
+
+# Above this many bars the chart is aggregated into OHLC buckets
+MAX_CHART_POINTS = int(os.getenv("MAX_CHART_POINTS", "2000"))
+
+
+def downsample_ohlc(data, max_points, indicators=None):
+    """Aggregate bars into at most `max_points` OHLCV buckets of consecutive bars.
+
+    Each bucket keeps the first open, highest high, lowest low, last close and
+    total volume, stamped with the bucket's first timestamp. Indicator columns
+    take their value at the end of each bucket.
+    """
+    n = len(data)
+    if n <= max_points:
+        return data, indicators
+    bucket = np.arange(n) * max_points // n
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    ends = np.append(starts[1:] - 1, n - 1)
+
+    sampled = pd.DataFrame({
+        "Open": data["Open"].to_numpy()[starts],
+        "High": np.maximum.reduceat(data["High"].to_numpy(), starts),
+        "Low": np.minimum.reduceat(data["Low"].to_numpy(), starts),
+        "Close": data["Close"].to_numpy()[ends],
+        "Volume": np.add.reduceat(data["Volume"].to_numpy(), starts),
+    }, index=data.index[starts])
+    if indicators is not None:
+        indicators = pd.DataFrame(indicators.to_numpy()[ends], index=sampled.index, columns=indicators.columns)
+    return sampled, indicators
+
+
+def create_advanced_chart(data, symbol, indicators=None, max_points=MAX_CHART_POINTS):
+    """Create advanced interactive price chart (downsampled to at most `max_points` bars)"""
+    if data is None or data.empty:
+        return None
+    if indicators is None:
+        indicators = compute_indicators(data)
+    full_length = len(data)
+    if max_points and full_length > max_points:
+        data, indicators = downsample_ohlc(data, max_points, indicators)
+    # Plotly's figure classes take ~0.3s to import; only pages that draw a chart load them
+    import plotly.graph_objs as go
+    
+    fig = go.Figure()
+    
+    # Candlestick chart
+    fig.add_trace(go.Candlestick(
+        x=data.index,
+        open=data['Open'],
+        high=data['High'],
+        low=data['Low'],
+        close=data['Close'],
+        name=symbol,
+        increasing_line_color='#00ff88',
+        decreasing_line_color='#ff4444'
+    ))
+    
+    # Add moving averages
+    if latest(indicators, 'SMA20') is not None:
+        fig.add_trace(go.Scatter(
+            x=data.index,
+            y=indicators['SMA20'],
+            name='SMA 20',
+            line=dict(color='#ffaa00', width=2)
+        ))
+    
+    if latest(indicators, 'SMA50') is not None:
+        fig.add_trace(go.Scatter(
+            x=data.index,
+            y=indicators['SMA50'],
+            name='SMA 50',
+            line=dict(color='#7C5CFF', width=2)
+        ))
+    
+    # Volume bars
+    # Up/down as 1/0 mapped through a two-colour scale: one vectorized comparison, and
+    # plotly validates and serializes a numeric array far faster than per-bar colour strings
+    up = (data['Close'].to_numpy() >= data['Open'].to_numpy()).astype(np.int8)
+    
+    fig.add_trace(go.Bar(
+        x=data.index,
+        y=data['Volume'],
+        name='Volume',
+        marker=dict(color=up, colorscale=[[0, '#ff4444'], [1, '#00ff88']], cmin=0, cmax=1),
+        opacity=0.3,
+        yaxis='y2'
+    ))
+    
+    title = f"{symbol} - Advanced Stock Analysis"
+    if len(data) < full_length:
+        title += f" ({full_length:,} bars shown as {len(data):,})"
+    
+    fig.update_layout(
+        title=title,
+        xaxis_title="Time",
+        yaxis_title="Price (₹)",
+        yaxis2=dict(title="Volume", overlaying="y", side="right"),
+        template="plotly_dark",
+        height=600,
+        xaxis_rangeslider_visible=False,
+        hovermode='x unified',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    
+    return fig
+
+
+def update_chart(fig, data, indicators):
+    """Swap new bars and indicator values into a create_advanced_chart figure in place.
+
+    The traces, layout and template are kept, so a live update skips building the
+    figure. Returns False when an indicator line the chart needs is missing, in
+    which case the caller should rebuild it.
+    """
+    traces = {trace.name: trace for trace in fig.data}
+    lines = {"SMA 20": "SMA20", "SMA 50": "SMA50"}
+    if any(name not in traces and latest(indicators, column) is not None for name, column in lines.items()):
+        return False
+    up = (data['Close'].to_numpy() >= data['Open'].to_numpy()).astype(np.int8)
+    with fig.batch_update():
+        fig.data[0].update(x=data.index, open=data['Open'], high=data['High'], low=data['Low'], close=data['Close'])
+        for name, column in lines.items():
+            if name in traces:
+                traces[name].update(x=data.index, y=indicators[column])
+        traces['Volume'].update(x=data.index, y=data['Volume'], marker=dict(color=up))
+    return True
+
+
+def create_correlation_heatmap(correlation, title="Correlation of daily returns"):
+    """Heatmap of a symbol x symbol correlation DataFrame"""
+    import plotly.graph_objs as go
+
+    fig = go.Figure(go.Heatmap(
+        z=correlation.to_numpy(), x=list(correlation.columns), y=list(correlation.index),
+        zmin=-1, zmax=1, colorscale="RdBu", reversescale=True, colorbar=dict(title="ρ")
+    ))
+    fig.update_layout(title=title, template="plotly_dark", height=max(400, min(900, 28 * len(correlation))),
+                      yaxis=dict(autorange="reversed"))
+    return fig
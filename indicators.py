@@ -0,0 +1,144 @@
+"""Technical indicators computed once per symbol and shared by the chart, metrics and prompt"""
+import numpy as np
+import pandas as pd
+
+from cache import TTLCache
+import metrics
+
+# Which indicators to compute and with what parameters
+DEFAULT_INDICATORS = {
+    "sma": (20, 50),
+    "ema": (12, 26),
+    "rsi": 14,
+    "macd": (12, 26, 9),
+    "bollinger": (20, 2.0),
+    "atr": 14,
+    "volatility": 20,
+    "vwap": True,
+}
+
+# Keyed by (symbol, interval, config, bar count, last bar time, last close), so a
+# new or updated bar is a new key and stale entries simply age out
+indicator_cache = TTLCache(maxsize=256, ttl=3600, name="indicators")
+
+
+def _sma(values, window):
+    out = np.full(len(values), np.nan)
+    if window <= len(values):
+        csum = np.cumsum(np.insert(values, 0, 0.0))
+        out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+def _ema(series, span):
+    return series.ewm(span=span, adjust=False, min_periods=span).mean().to_numpy()
+
+
+def _wilder(series, period):
+    return series.ewm(alpha=1.0 / period, adjust=False, min_periods=period).mean().to_numpy()
+
+
+def _session_cumsum(values, session):
+    """Cumulative sum that restarts whenever `session` changes (sorted bars)"""
+    starts = np.concatenate(([True], session[1:] != session[:-1]))
+    csum = np.cumsum(values)
+    base = (csum - values)[starts]
+    return csum - base[np.cumsum(starts) - 1]
+
+
+def compute_indicators(data, config=None):
+    """Return a new frame of indicator columns aligned to `data`'s index (`data` is not modified)"""
+    config = DEFAULT_INDICATORS if config is None else config
+    out = {}
+    if data is None or data.empty:
+        return pd.DataFrame(index=getattr(data, "index", None))
+
+    close_s = data["Close"].astype(float).ffill()
+    close = close_s.to_numpy()
+    high = data["High"].astype(float).ffill().to_numpy()
+    low = data["Low"].astype(float).ffill().to_numpy()
+    volume = data["Volume"].astype(float).fillna(0).to_numpy()
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+
+    for window in config.get("sma", ()):
+        out[f"SMA{window}"] = _sma(close, window)
+
+    for span in config.get("ema", ()):
+        out[f"EMA{span}"] = _ema(close_s, span)
+
+    if config.get("rsi"):
+        period = config["rsi"]
+        delta = np.diff(close, prepend=np.nan)
+        gain = _wilder(pd.Series(np.where(delta > 0, delta, 0.0)), period)
+        loss = _wilder(pd.Series(np.where(delta < 0, -delta, 0.0)), period)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100.0 - 100.0 / (1.0 + gain / loss)
+        rsi[(loss == 0) & (gain > 0)] = 100.0
+        out[f"RSI{period}"] = rsi
+
+    if config.get("macd"):
+        fast, slow, signal = config["macd"]
+        macd = _ema(close_s, fast) - _ema(close_s, slow)
+        macd_signal = pd.Series(macd).ewm(span=signal, adjust=False, min_periods=signal).mean().to_numpy()
+        out["MACD"] = macd
+        out["MACD_signal"] = macd_signal
+        out["MACD_hist"] = macd - macd_signal
+
+    if config.get("bollinger"):
+        window, width = config["bollinger"]
+        mid = _sma(close, window)
+        std = close_s.rolling(window).std(ddof=0).to_numpy()
+        out["BB_mid"] = mid
+        out["BB_upper"] = mid + width * std
+        out["BB_lower"] = mid - width * std
+
+    if config.get("atr"):
+        period = config["atr"]
+        true_range = np.nanmax(
+            np.vstack([high - low, np.abs(high - prev_close), np.abs(low - prev_close)]), axis=0
+        )
+        out[f"ATR{period}"] = _wilder(pd.Series(true_range), period)
+
+    if config.get("vwap"):
+        typical = (high + low + close) / 3.0
+        index = data.index
+        session = index.normalize().asi8 if isinstance(index, pd.DatetimeIndex) else None
+        if session is not None and len(session) > 1 and (session[1:] == session[:-1]).any():
+            # Intraday bars: VWAP restarts every session
+            pv, vol = _session_cumsum(typical * volume, session), _session_cumsum(volume, session)
+        else:
+            pv, vol = np.cumsum(typical * volume), np.cumsum(volume)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["VWAP"] = np.where(vol > 0, pv / vol, np.nan)
+
+    if config.get("volatility"):
+        window = config["volatility"]
+        returns = close_s.pct_change()
+        out[f"Volatility{window}"] = (returns.rolling(window, min_periods=window).std() * 100).to_numpy()
+
+    return pd.DataFrame(out, index=data.index)
+
+
+def get_indicators(symbol, interval, data, config=None):
+    """Memoized compute_indicators for one symbol's bars"""
+    if data is None or data.empty:
+        return compute_indicators(data, config)
+    config = DEFAULT_INDICATORS if config is None else config
+    key = (
+        symbol, interval, tuple(sorted(config.items())),
+        len(data), data.index[-1], float(data["Close"].iloc[-1]),
+    )
+    result = indicator_cache.get(key)
+    if result is None:
+        with metrics.span("indicators", symbol=symbol, bars=len(data)):
+            result = compute_indicators(data, config)
+        indicator_cache.set(key, result)
+    return result
+
+
+def latest(indicators, name, default=None):
+    """Last non-NaN value of an indicator column, or `default`"""
+    if indicators is None or name not in indicators:
+        return default
+    values = indicators[name].dropna()
+    return float(values.iloc[-1]) if not values.empty else default
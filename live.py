@@ -0,0 +1,379 @@
+"""Live intraday series: incremental bar polling, a ring buffer and O(1) indicator updates.
+
+A LiveSeries is seeded once with the session's bars, then each poll asks the
+feed only for bars from the last one held onwards. Yahoo's latest intraday bar
+is still forming, so the newest bar is kept provisional: a poll may revise it
+in place, and it is only folded into the running indicator state once a newer
+bar arrives. Every indicator in indicators.DEFAULT_INDICATORS is updated from
+running sums or recursive averages, so a poll costs O(new bars) however long
+the series is, and the values match compute_indicators on the same bars.
+
+Series are shared by every session in the process, so a symbol is polled at
+most once per LIVE_POLL_SECONDS however many people are watching it. Set
+LIVE_FEED=simulated to use the random-walk tick feed from stubs.py instead of
+Yahoo (no network needed).
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from indicators import DEFAULT_INDICATORS
+from market import is_market_open
+from metrics import span
+from ratelimit import yahoo_provider
+
+LIVE_INTERVALS = ("1m", "5m")
+LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "5"))
+# Outside market hours Yahoo has nothing new; check rarely
+LIVE_CLOSED_POLL_SECONDS = float(os.getenv("LIVE_CLOSED_POLL_SECONDS", "300"))
+# Two NSE sessions of 1m bars (375 each)
+LIVE_BUFFER_BARS = int(os.getenv("LIVE_BUFFER_BARS", "750"))
+LIVE_MAX_SERIES = int(os.getenv("LIVE_MAX_SERIES", "32"))
+LIVE_FEED = os.getenv("LIVE_FEED", "yahoo")
+LIVE_SIM_SPEED = float(os.getenv("LIVE_SIM_SPEED", "1"))
+
+# History loaded when a series starts
+LIVE_SEED_PERIOD = {"1m": "1d", "5m": "5d"}
+
+BAR_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+
+class RingBuffer:
+    """The most recent `capacity` rows of fixed columns; appends and last-row updates are O(1)"""
+
+    def __init__(self, columns, capacity):
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.values = np.full((capacity, len(self.columns)), np.nan)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, timestamp, row):
+        if self.size < self.capacity:
+            slot = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            # Full: overwrite the oldest row
+            slot = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.times[slot] = timestamp
+        self.values[slot] = row
+
+    def set_last(self, timestamp, row):
+        slot = (self.start + self.size - 1) % self.capacity
+        self.times[slot] = timestamp
+        self.values[slot] = row
+
+    def ordered(self):
+        """(times, values) oldest first"""
+        order = (self.start + np.arange(self.size)) % self.capacity
+        return self.times[order], self.values[order]
+
+
+class _Rolling:
+    """Count, sum and sum of squares over the last `window` values (NaN counts as missing)"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+        self.sumsq = 0.0
+
+    def update(self, value, commit):
+        count, total, sumsq = self.count, self.sum, self.sumsq
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if not math.isnan(old):
+                count, total, sumsq = count - 1, total - old, sumsq - old * old
+        if not math.isnan(value):
+            count, total, sumsq = count + 1, total + value, sumsq + value * value
+        if commit:
+            self.values.append(value)
+            self.count, self.sum, self.sumsq = count, total, sumsq
+        return count, total, sumsq
+
+
+class _Ewm:
+    """Recursive exponentially weighted mean, like pandas ewm(alpha, adjust=False, min_periods)"""
+
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = math.nan
+        self.count = 0
+
+    def update(self, value, commit):
+        if math.isnan(value):
+            # Only leading NaNs occur (e.g. MACD before the slow EMA fills); they are skipped
+            mean, count = self.value, self.count
+        elif self.count == 0:
+            mean, count = value, 1
+        else:
+            mean, count = self.value + self.alpha * (value - self.value), self.count + 1
+        if commit:
+            self.value, self.count = mean, count
+        return mean if count >= self.min_periods else math.nan
+
+
+class LiveIndicators:
+    """Running state for an indicator config; each bar updates it in O(1)"""
+
+    def __init__(self, config=None):
+        config = DEFAULT_INDICATORS if config is None else config
+        self.config = config
+        self.sma = {window: _Rolling(window) for window in config.get("sma", ())}
+        self.ema = {span_: _Ewm(2 / (span_ + 1), span_) for span_ in config.get("ema", ())}
+        self.rsi = None
+        if config.get("rsi"):
+            period = config["rsi"]
+            self.rsi = (period, _Ewm(1 / period, period), _Ewm(1 / period, period))
+        self.macd = None
+        if config.get("macd"):
+            fast, slow, signal = config["macd"]
+            self.macd = (_Ewm(2 / (fast + 1), fast), _Ewm(2 / (slow + 1), slow), _Ewm(2 / (signal + 1), signal))
+        self.bollinger = None
+        if config.get("bollinger"):
+            window, width = config["bollinger"]
+            self.bollinger = (window, width, _Rolling(window))
+        self.atr = (config["atr"], _Ewm(1 / config["atr"], config["atr"])) if config.get("atr") else None
+        self.volatility = (config["volatility"], _Rolling(config["volatility"])) if config.get("volatility") else None
+        self.vwap = bool(config.get("vwap"))
+        self.vwap_state = (None, 0.0, 0.0)
+        self.prev_close = math.nan
+        # Column names in output order, from a dry run on an empty bar
+        self.columns = list(self._values(math.nan, math.nan, math.nan, math.nan, 0.0, None, commit=False))
+
+    def update(self, bar, session, commit):
+        """Indicator values for `bar` (open, high, low, close, volume); folded into the state if `commit`"""
+        return list(self._values(*bar, session, commit).values())
+
+    def _values(self, open_, high, low, close, volume, session, commit):
+        prev = self.prev_close
+        out = {}
+        for window, rolling in self.sma.items():
+            count, total, _ = rolling.update(close, commit)
+            out[f"SMA{window}"] = total / window if count == window else math.nan
+
+        for span_, ewm in self.ema.items():
+            out[f"EMA{span_}"] = ewm.update(close, commit)
+
+        if self.rsi:
+            period, gains, losses = self.rsi
+            delta = close - prev
+            gain = gains.update(delta if delta > 0 else 0.0, commit)
+            loss = losses.update(-delta if delta < 0 else 0.0, commit)
+            if loss == 0:
+                rsi = 100.0 if gain > 0 else math.nan
+            else:
+                rsi = 100.0 - 100.0 / (1.0 + gain / loss)
+            out[f"RSI{period}"] = rsi
+
+        if self.macd:
+            fast, slow, signal = self.macd
+            macd = fast.update(close, commit) - slow.update(close, commit)
+            macd_signal = signal.update(macd, commit)
+            out["MACD"] = macd
+            out["MACD_signal"] = macd_signal
+            out["MACD_hist"] = macd - macd_signal
+
+        if self.bollinger:
+            window, width, rolling = self.bollinger
+            count, total, sumsq = rolling.update(close, commit)
+            if count == window:
+                mid = total / window
+                std = math.sqrt(max(sumsq / window - mid * mid, 0.0))
+            else:
+                mid = std = math.nan
+            out["BB_mid"] = mid
+            out["BB_upper"] = mid + width * std
+            out["BB_lower"] = mid - width * std
+
+        if self.atr:
+            period, ewm = self.atr
+            true_range = high - low
+            if not math.isnan(prev):
+                true_range = max(true_range, abs(high - prev), abs(low - prev))
+            out[f"ATR{period}"] = ewm.update(true_range, commit)
+
+        if self.vwap:
+            current, pv, vol = self.vwap_state
+            if session != current:
+                # VWAP restarts every session
+                pv, vol = 0.0, 0.0
+            pv, vol = pv + (high + low + close) / 3.0 * volume, vol + volume
+            out["VWAP"] = pv / vol if vol > 0 else math.nan
+            if commit:
+                self.vwap_state = (session, pv, vol)
+
+        if self.volatility:
+            window, rolling = self.volatility
+            count, total, sumsq = rolling.update(close / prev - 1, commit)
+            # Like the batch rolling std, only a full window of returns gives a value
+            variance = (sumsq - total * total / count) / (count - 1) if count >= window else math.nan
+            out[f"Volatility{window}"] = math.sqrt(max(variance, 0.0)) * 100 if count >= window else math.nan
+
+        if commit:
+            self.prev_close = close
+        return out
+
+
+class LiveSeries:
+    """One symbol's intraday bars and indicators, kept current by polling a feed"""
+
+    def __init__(self, symbol, interval, capacity=LIVE_BUFFER_BARS, config=None):
+        self.symbol = symbol
+        self.interval = interval
+        self.indicators = LiveIndicators(config)
+        self.buffer = RingBuffer(BAR_COLUMNS + tuple(self.indicators.columns), capacity)
+        self.tz = None
+        # The newest bar: (time ns, session, bar values), not yet folded into the indicator state
+        self.pending = None
+        # Bumped whenever a bar is added or revised, so views know when to redraw
+        self.version = 0
+        self.polled_at = None
+        self.last_poll = {}
+        # Serializes polls; held across the feed call so concurrent sessions share one fetch
+        self._lock = threading.Lock()
+        # Guards the buffer, pending bar, indicator state and version, which every session reads
+        self._state_lock = threading.Lock()
+
+    @property
+    def last_time(self):
+        if self.pending is None:
+            return None
+        return pd.Timestamp(self.pending[0], tz="UTC").tz_convert(self.tz)
+
+    def ingest(self, bars):
+        """Apply a frame of bars (may overlap what is held); returns (new bars, revised bars)"""
+        if bars is None or bars.empty:
+            return 0, 0
+        bars = bars.dropna(subset=["Close"])
+        if bars.empty:
+            return 0, 0
+        with self._state_lock:
+            return self._ingest(bars)
+
+    def _ingest(self, bars):
+        if self.tz is None:
+            self.tz = bars.index.tz or "Asia/Kolkata"
+        index = bars.index if bars.index.tz is not None else bars.index.tz_localize(self.tz)
+        index = index.tz_convert(self.tz).as_unit("ns")
+        times, sessions = index.asi8, index.normalize().asi8
+        values = np.array(bars[list(BAR_COLUMNS)], dtype=float)
+        values[:, 4] = np.nan_to_num(values[:, 4])
+        new = revised = 0
+        for timestamp, session, bar in zip(times, sessions, values):
+            if self.pending is not None and timestamp < self.pending[0]:
+                continue
+            if self.pending is not None and timestamp > self.pending[0]:
+                # A newer bar exists, so the pending one is final
+                self.indicators.update(self.pending[2], self.pending[1], commit=True)
+            row = np.concatenate((bar, self.indicators.update(bar, session, commit=False)))
+            if self.pending is not None and timestamp == self.pending[0]:
+                if np.array_equal(bar, self.pending[2]):
+                    continue
+                self.buffer.set_last(timestamp, row)
+                revised += 1
+            else:
+                self.buffer.append(timestamp, row)
+                new += 1
+            self.pending = (timestamp, session, bar)
+        if new or revised:
+            self.version += 1
+        return new, revised
+
+    def frame(self):
+        """(bars, indicators) DataFrames for the buffered window, oldest first"""
+        bars, indicators, _ = self.snapshot()
+        return bars, indicators
+
+    def snapshot(self):
+        """(bars, indicators, version) read together, so a concurrent poll can't tear them"""
+        with self._state_lock:
+            times, values = self.buffer.ordered()
+            version = self.version
+        index = pd.DatetimeIndex(pd.to_datetime(times, utc=True)).tz_convert(self.tz or "Asia/Kolkata")
+        table = pd.DataFrame(values, index=index, columns=self.buffer.columns)
+        return table[list(BAR_COLUMNS)], table[self.indicators.columns], version
+
+    def poll_interval(self, feed):
+        if feed is yahoo_bars and not is_market_open():
+            return LIVE_CLOSED_POLL_SECONDS
+        return LIVE_POLL_SECONDS
+
+    def poll(self, feed=None, force=False):
+        """Fetch bars newer than the last one held (the whole seed period the first time).
+
+        Returns the poll summary; concurrent callers within the poll interval share the last one.
+        """
+        feed = feed or get_feed()
+        with self._lock:
+            now = time.monotonic()
+            if not force and self.polled_at is not None and now - self.polled_at < self.poll_interval(feed):
+                return self.last_poll
+            self.polled_at = now
+            started = time.perf_counter()
+            with span("live.poll", symbol=self.symbol, interval=self.interval) as fields:
+                try:
+                    if self.pending is None:
+                        bars = feed(self.symbol, self.interval, period=LIVE_SEED_PERIOD.get(self.interval, "1d"))
+                    else:
+                        bars = feed(self.symbol, self.interval, start=self.last_time)
+                    error = None
+                except Exception as e:
+                    bars, error = None, str(e)
+                new, revised = self.ingest(bars)
+                fields.update(new=new, revised=revised)
+            self.last_poll = {"new": new, "revised": revised, "error": error,
+                              "elapsed_ms": (time.perf_counter() - started) * 1000}
+            return self.last_poll
+
+
+def yahoo_bars(symbol, interval, start=None, period=None):
+    """Intraday bars from Yahoo since `start` (or for `period`), through the shared Yahoo quota"""
+    import yfinance as yf
+
+    ticker = yf.Ticker(symbol)
+    kwargs = {"start": start} if start is not None else {"period": period}
+    return yahoo_provider.call(lambda: ticker.history(interval=interval, timeout=10, **kwargs))
+
+
+_series = {}
+_feed = None
+_lock = threading.Lock()
+
+
+def get_feed():
+    """Bar source for live series: Yahoo, or the simulated tick feed with LIVE_FEED=simulated"""
+    global _feed
+    if LIVE_FEED != "simulated":
+        return yahoo_bars
+    with _lock:
+        if _feed is None:
+            from stubs import SimulatedTickFeed
+
+            _feed = SimulatedTickFeed(speed=LIVE_SIM_SPEED)
+        return _feed
+
+
+def get_live_series(symbol, interval):
+    """Process-wide LiveSeries for (symbol, interval); the least recently polled one is dropped past LIVE_MAX_SERIES"""
+    key = (symbol, interval)
+    with _lock:
+        series = _series.get(key)
+        if series is None:
+            if len(_series) >= LIVE_MAX_SERIES:
+                oldest = min(_series, key=lambda k: _series[k].polled_at or 0)
+                del _series[oldest]
+            series = _series[key] = LiveSeries(symbol, interval)
+        return series
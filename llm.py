@@ -0,0 +1,205 @@
+"""Groq chat completions, blocking or streamed token by token"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from cache import PersistentCache, inflight
+from metrics import span, observe, inc
+from ratelimit import groq_provider
+
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "60"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(6 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+
+# Completed responses keyed by a hash of (model, system prompt, prompt)
+response_cache = PersistentCache("llm_responses", ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES)
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_groq_client():
+    """Shared Groq client (GROQ_BASE_URL points it at a local fake server for testing)"""
+    global _client
+    with _lock:
+        if _client is None:
+            # Imported on first use: the SDK and its models take ~0.3s to load
+            from groq import Groq
+
+            # Retries are handled by ratelimit.groq_provider, not the SDK
+            _client = Groq(api_key=os.getenv("GROQ_API_KEY", ""), timeout=GROQ_TIMEOUT, max_retries=0)
+        return _client
+
+
+def _messages(system_prompt, prompt):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def prompt_key(model, system_prompt, prompt):
+    """Content address of a completion request"""
+    payload = json.dumps([model, system_prompt, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# A follower falls back to its own request when the identical in-flight one makes
+# no progress (no new chunk, or no result for a blocking call) for this long
+INFLIGHT_WAIT = float(os.getenv("LLM_INFLIGHT_WAIT", "20"))
+
+
+def _replay(text):
+    yield text
+
+
+def _abandon(key, call):
+    # Later requests start afresh instead of queueing behind a stalled leader. The leader's
+    # call is left alone: its other followers keep waiting on it with their own timeouts
+    inflight.forget(("llm", key), call)
+
+
+def _shared_stream(key, system_prompt, prompt, model, temperature, max_tokens):
+    """Stream a completion, shared chunk by chunk with identical requests in flight.
+
+    Nothing is registered until iteration starts, so a generator that is never
+    consumed never holds up anyone else.
+    """
+    cached = response_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    call, leader = inflight.begin(("llm", key))
+    if not leader:
+        # Follow the leader's stream; if it fails or stalls before sending anything, make our own request
+        sent = False
+        try:
+            for part in inflight.follow(call, INFLIGHT_WAIT):
+                sent = True
+                yield part
+            return
+        except TimeoutError:
+            _abandon(key, call)
+            if sent:
+                raise
+        except Exception:
+            if sent:
+                raise
+        yield from _stream_chunks(system_prompt, prompt, model, temperature, max_tokens)
+        return
+
+    parts = []
+    result = error = None
+    try:
+        for chunk in _stream_chunks(system_prompt, prompt, model, temperature, max_tokens):
+            parts.append(chunk)
+            inflight.publish(call, chunk)
+            yield chunk
+        # Only reached when the stream finished without error
+        result = "".join(parts)
+        response_cache.set(key, result)
+    except BaseException as e:
+        # Includes GeneratorExit when the consumer abandons the stream
+        error = e if isinstance(e, Exception) else RuntimeError("stream abandoned")
+        raise
+    finally:
+        inflight.finish(("llm", key), call, result=result, error=error)
+
+
+def _await_shared(key, call, fallback):
+    """Wait for an identical request in flight elsewhere, falling back to our own call"""
+    try:
+        # Consuming a streaming leader's chunks resets the timeout on every chunk
+        for _ in inflight.follow(call, INFLIGHT_WAIT):
+            pass
+    except TimeoutError:
+        _abandon(key, call)
+        return fallback()
+    except Exception:
+        return fallback()
+    return call.result if call.result is not None else fallback()
+
+
+def _record_usage(usage, fields):
+    """Add a response's token usage to the counters and the span's log fields"""
+    if usage is None:
+        return
+    fields["prompt_tokens"] = usage.prompt_tokens
+    fields["completion_tokens"] = usage.completion_tokens
+    inc("llm_prompt_tokens", usage.prompt_tokens or 0)
+    inc("llm_completion_tokens", usage.completion_tokens or 0)
+
+
+def _stream_chunks(system_prompt, prompt, model, temperature, max_tokens):
+    started = time.perf_counter()
+    with span("llm.stream", model=model) as fields:
+        stream = groq_provider.call(lambda: get_groq_client().chat.completions.create(
+            messages=_messages(system_prompt, prompt),
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        ))
+        fields["chunks"] = 0
+        for chunk in stream:
+            # Groq reports usage on the final chunk
+            x_groq = getattr(chunk, "x_groq", None)
+            _record_usage(getattr(chunk, "usage", None) or getattr(x_groq, "usage", None), fields)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if not fields["chunks"]:
+                    observe("llm.first_token", time.perf_counter() - started)
+                fields["chunks"] += 1
+                yield delta
+
+
+def chat_completion(system_prompt, prompt, max_tokens, temperature=0.7, model=GROQ_MODEL, stream=False, use_cache=True):
+    """Run a chat completion and return its text.
+
+    With stream=True a generator of text chunks is returned instead; the request
+    is only sent once iteration starts, and errors surface while iterating.
+    Identical (model, system prompt, prompt) requests are answered from the
+    on-disk response cache while the entry is fresh.
+    """
+    if not use_cache:
+        if stream:
+            return _stream_chunks(system_prompt, prompt, model, temperature, max_tokens)
+        return _complete(system_prompt, prompt, model, temperature, max_tokens)
+
+    key = prompt_key(model, system_prompt, prompt)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return _replay(cached) if stream else cached
+
+    # Identical requests already in flight (other sessions) share that one generation
+    if stream:
+        return _shared_stream(key, system_prompt, prompt, model, temperature, max_tokens)
+    call, leader = inflight.begin(("llm", key))
+    if not leader:
+        return _await_shared(key, call, lambda: _complete(system_prompt, prompt, model, temperature, max_tokens))
+    try:
+        text = _complete(system_prompt, prompt, model, temperature, max_tokens)
+    except Exception as e:
+        inflight.finish(("llm", key), call, error=e)
+        raise
+    if text:
+        response_cache.set(key, text)
+    inflight.finish(("llm", key), call, result=text)
+    return text
+
+
+def _complete(system_prompt, prompt, model, temperature, max_tokens):
+    with span("llm.complete", model=model) as fields:
+        completion = groq_provider.call(lambda: get_groq_client().chat.completions.create(
+            messages=_messages(system_prompt, prompt),
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        ))
+        _record_usage(getattr(completion, "usage", None), fields)
+    return completion.choices[0].message.content
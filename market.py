@@ -0,0 +1,41 @@
+"""NSE/BSE trading-session helpers"""
+from datetime import datetime, time, timedelta, timezone
+
+# Indian Standard Time (no DST)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Regular NSE/BSE equity session
+MARKET_OPEN = time(9, 15)
+MARKET_CLOSE = time(15, 30)
+
+
+def now_ist():
+    """Current time in IST"""
+    return datetime.now(IST)
+
+
+def is_market_open(now=None):
+    """Return True if the regular NSE session is running (exchange holidays are not modelled)"""
+    now = (now or now_ist()).astimezone(IST)
+    if now.weekday() >= 5:
+        return False
+    return MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def next_market_open(now=None):
+    """Datetime of the next regular session open after `now`"""
+    now = (now or now_ist()).astimezone(IST)
+    candidate = now.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
+    if now >= candidate:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def seconds_until_open(now=None):
+    """Seconds until the next session open, 0 while the market is open"""
+    now = (now or now_ist()).astimezone(IST)
+    if is_market_open(now):
+        return 0
+    return (next_market_open(now) - now).total_seconds()
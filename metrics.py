@@ -0,0 +1,169 @@
+"""Per-stage timing spans and counters, exported as logs and Prometheus text.
+
+Wrap a stage in `with span("history", symbol=symbol):` to record its wall time.
+Every span is kept in a bounded per-stage sample window (for p50/p95) plus
+running count/sum/error totals, and is logged on the "metrics" logger
+(INFO with METRICS_LOG=1, DEBUG otherwise). Set METRICS_PORT to serve the
+Prometheus exposition at http://<host>:<port>/metrics.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+METRICS_LOG = os.getenv("METRICS_LOG", "0") in ("1", "true", "True")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1000"))
+
+logger = logging.getLogger("metrics")
+
+
+class Stage:
+    """Recent durations and running totals for one named stage"""
+
+    def __init__(self, name, window=METRICS_WINDOW):
+        self.name = name
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+
+    def observe(self, seconds, error=False):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if error:
+            self.errors += 1
+
+    def stats(self):
+        samples = np.fromiter(self.samples, dtype=float)
+        p50, p95 = np.percentile(samples, [50, 95]) if len(samples) else (np.nan, np.nan)
+        return {"stage": self.name, "count": self.count, "errors": self.errors,
+                "p50_ms": p50 * 1000, "p95_ms": p95 * 1000,
+                "mean_ms": self.total / self.count * 1000 if self.count else np.nan, "total_s": self.total}
+
+
+_stages = {}
+_counters = {}
+_lock = threading.Lock()
+
+
+def observe(name, seconds, error=False):
+    """Record one duration for stage `name`"""
+    with _lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = Stage(name)
+        stage.observe(seconds, error)
+
+
+def inc(name, amount=1):
+    """Add to a monotonically increasing counter (e.g. tokens used)"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+@contextmanager
+def span(name, **fields):
+    """Time the enclosed block as stage `name`; `fields` only go to the log line"""
+    started = time.perf_counter()
+    error = False
+    try:
+        yield fields
+    except BaseException:
+        error = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        observe(name, elapsed, error)
+        if logger.isEnabledFor(logging.INFO if METRICS_LOG else logging.DEBUG):
+            extra = " ".join(f"{key}={value}" for key, value in fields.items())
+            logger.log(logging.INFO if METRICS_LOG else logging.DEBUG,
+                       "span=%s ms=%.1f error=%s %s", name, elapsed * 1000, error, extra)
+
+
+def stage_stats():
+    """p50/p95/mean and counts per stage, sorted by name"""
+    with _lock:
+        stages = sorted(_stages.values(), key=lambda s: s.name)
+        return [stage.stats() for stage in stages]
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def prometheus_text():
+    """All stages and counters in the Prometheus text exposition format"""
+    lines = [
+        "# HELP stock_stage_seconds Wall time of each pipeline stage",
+        "# TYPE stock_stage_seconds summary",
+    ]
+    errors = ["# TYPE stock_stage_errors_total counter"]
+    for stats in stage_stats():
+        stage = stats["stage"]
+        for quantile, key in (("0.5", "p50_ms"), ("0.95", "p95_ms")):
+            if not np.isnan(stats[key]):
+                lines.append(f'stock_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key] / 1000:.6f}')
+        lines.append(f'stock_stage_seconds_sum{{stage="{stage}"}} {stats["total_s"]:.6f}')
+        lines.append(f'stock_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        errors.append(f'stock_stage_errors_total{{stage="{stage}"}} {stats["errors"]}')
+    lines.extend(errors)
+    for name, value in sorted(counters().items()):
+        metric = f"stock_{_metric_name(name)}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server = None
+
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    """Serve /metrics once per process (no-op when port is 0 or already serving)"""
+    global _server
+    if not port:
+        return None
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                # Another worker on this host already owns the port
+                logger.warning("metrics server not started on port %s: %s", port, e)
+                _server = False
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server or None
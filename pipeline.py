@@ -0,0 +1,348 @@
+"""Stock analysis pipeline: symbol resolution, market data, news and AI analysis.
+
+Nothing here depends on Streamlit, so the same functions back the app
+(app.py) and headless batch runs (batch.py).
+"""
+import re
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables (before the local modules read their settings)
+load_dotenv()
+
+from cache import history_cache, info_cache, news_cache, history_ttl, inflight
+from store import get_history
+from ratelimit import yahoo_provider
+from indicators import get_indicators, compute_indicators, latest
+from serper import serper_post, serper_fan_out, symbol_search_cache, SYMBOL_SEARCH_MISS_TTL
+from llm import chat_completion
+from metrics import span, inc
+from prompts import build_news_context
+from sentiment import news_sentiment, sentiment_line
+from symbols import resolve_symbol, normalize_text
+from universe import DEFAULT_UNIVERSE, get_universe, get_universe_snapshot
+
+
+def normalize_stock_name(name):
+    """Normalize and find stock symbol from name"""
+    if not name:
+        return None
+    
+    # Check if it's already a symbol (contains .NS or .BO)
+    if '.NS' in name.upper() or '.BO' in name.upper():
+        return name.upper()
+    
+    # Ranked fuzzy match over the aliases and the listings master list
+    with span("resolve", query=name):
+        return resolve_symbol(name)
+
+def search_stock_symbol(query):
+    """Search for stock symbol using Serper API (results and misses are cached on disk)"""
+    # Queries made only of noise words ("ltd", "the co") normalize to ""; don't let them share a key
+    cache_key = normalize_text(query) or query.strip().lower()
+    cached = symbol_search_cache.get(cache_key)
+    if cached is not None:
+        return cached["symbol"]
+    try:
+        payload = {
+            "q": f"{query} stock symbol NSE BSE India",
+            "num": 5
+        }
+        with span("symbol_search", query=query):
+            data = serper_post("search", payload)
+        if data is None:
+            # Transport or API failure: don't remember it as a miss
+            return None
+        results = data.get("organic", [])
+        # Try to extract symbol from results
+        for result in results:
+            title = result.get("title", "").upper()
+            snippet = result.get("snippet", "").upper()
+            # Look for .NS pattern
+            if ".NS" in title or ".NS" in snippet:
+                match = re.search(r'([A-Z]+\.NS)', title + " " + snippet)
+                if match:
+                    symbol_search_cache.set(cache_key, {"symbol": match.group(1)})
+                    return match.group(1)
+        symbol_search_cache.set(cache_key, {"symbol": None}, ttl=SYMBOL_SEARCH_MISS_TTL)
+        return None
+    except Exception:
+        return None
+
+def fetch_stock_data(symbol, period, interval):
+    """History and info through the shared caches (returned objects are shared; don't mutate)"""
+    history_key = (symbol, period, interval)
+    data = history_cache.get(history_key)
+    info = info_cache.get(symbol)
+    if data is None or info is None:
+        # yfinance (~0.7s to import) is loaded by the first page that needs prices
+        import yfinance as yf
+
+        ticker = yf.Ticker(symbol)
+        if data is None:
+            # Stored bars plus only the missing tail from Yahoo
+            with span("history", symbol=symbol, period=period, interval=interval):
+                data = get_history(
+                    symbol, period, interval,
+                    lambda **kwargs: yahoo_provider.call(lambda: ticker.history(timeout=10, **kwargs))
+                )
+            if not data.empty:
+                history_cache.set(history_key, data, ttl=history_ttl())
+        if info is None:
+            with span("info", symbol=symbol):
+                info = yahoo_provider.call(lambda: ticker.info)
+            if info:
+                info_cache.set(symbol, info)
+    return data, info
+
+def get_stock_data(symbol, period="5d", interval="1h"):
+    """Fetch real-time stock data using yfinance, served from the shared TTL caches when fresh"""
+    try:
+        # Sessions asking for the same symbol at the same moment share one upstream fetch
+        data, info = inflight.do(
+            ("stock", symbol, period, interval),
+            lambda: fetch_stock_data(symbol, period, interval)
+        )
+        # Every caller gets its own frame; the cached one is shared across sessions
+        return data.copy(), info
+    except Exception as e:
+        return None, None
+
+def get_comprehensive_stock_info(symbol, company_name):
+    """Get comprehensive stock information from Serper (all queries run concurrently)"""
+    def fetch():
+        try:
+            queries = [
+                f"{company_name} {symbol} stock analysis India",
+                f"{company_name} financial results earnings India",
+                f"{company_name} stock price target India",
+                f"{company_name} news latest India"
+            ]
+            calls = [("search", {"q": query, "num": 10}) for query in queries]
+            # Dedicated news query
+            calls.append(("news", {"q": f"{company_name} {symbol} stock news India", "num": 20}))
+            
+            all_news = []
+            all_info = []
+            
+            # Failed or timed-out calls come back as None and are skipped
+            with span("news", symbol=symbol, calls=len(calls)):
+                responses = serper_fan_out(calls)
+            for data in responses:
+                if data:
+                    all_news.extend(data.get("news", []))
+                    all_info.extend(data.get("organic", []))
+            
+            result = {
+                "news": all_news[:30],  # Limit to 30 most recent
+                "search_results": all_info[:20],
+                "company_name": company_name
+            }
+            if all_news or all_info:
+                news_cache.set(symbol, result)
+            return result
+        except Exception as e:
+            return {"news": [], "search_results": [], "company_name": company_name}
+    
+    # Keyed by symbol, so a warm entry serves however the stock was searched for
+    cached = news_cache.get(symbol)
+    if cached is not None:
+        return cached
+    # Concurrent sessions opening the same stock share one fan-out
+    return inflight.do(("serper", symbol), fetch)
+
+def get_ai_analysis(symbol, stock_data, stock_info, serper_data, stream=False, indicators=None):
+    """Get AI-powered comprehensive analysis using Groq (a generator of text chunks when stream=True)"""
+    try:
+        if indicators is None:
+            indicators = compute_indicators(stock_data)
+        
+        # Prepare data summary
+        if stock_data is not None and not stock_data.empty:
+            current_price = stock_data['Close'].iloc[-1]
+            prev_close = stock_data['Close'].iloc[-2] if len(stock_data) > 1 else current_price
+            change = current_price - prev_close
+            change_pct = (change / prev_close) * 100 if prev_close > 0 else 0
+            
+            high_52w = stock_data['High'].max() if len(stock_data) > 0 else current_price
+            low_52w = stock_data['Low'].min() if len(stock_data) > 0 else current_price
+            
+            # Technical indicators (shared with the chart tab)
+            sma_20 = latest(indicators, 'SMA20', current_price)
+            sma_50 = latest(indicators, 'SMA50', current_price)
+            
+            volume = stock_data['Volume'].iloc[-1]
+            avg_volume = stock_data['Volume'].tail(20).mean() if len(stock_data) >= 20 else volume
+        else:
+            current_price = stock_info.get('currentPrice', stock_info.get('regularMarketPrice', 0))
+            prev_close = stock_info.get('previousClose', current_price)
+            change = current_price - prev_close
+            change_pct = ((change / prev_close) * 100) if prev_close > 0 else 0
+            high_52w = stock_info.get('fiftyTwoWeekHigh', current_price)
+            low_52w = stock_info.get('fiftyTwoWeekLow', current_price)
+            sma_20 = current_price
+            sma_50 = current_price
+            volume = stock_info.get('volume', 0)
+            avg_volume = stock_info.get('averageVolume', volume)
+        
+        # Deduplicated, ranked search results packed into a token budget (news only if PROMPT_NEWS_TOKENS is set)
+        with span("prompt.context", symbol=symbol) as fields:
+            news_summary, info_summary, context_stats = build_news_context(serper_data, symbol)
+            fields.update(context_stats)
+        inc("prompt_context_tokens", context_stats["tokens"])
+        # Scored locally, so the model gets a compact sentiment reading instead of inferring it from raw text
+        with span("sentiment", symbol=symbol):
+            sentiment = news_sentiment(symbol, serper_data)
+        
+        company_name = serper_data.get("company_name", symbol)
+        
+        technical_lines = []
+        for label, column, fmt in [
+            ("EMA 12", "EMA12", "₹{:.2f}"), ("EMA 26", "EMA26", "₹{:.2f}"),
+            ("RSI 14", "RSI14", "{:.1f}"), ("MACD", "MACD", "{:.2f}"),
+            ("MACD Signal", "MACD_signal", "{:.2f}"),
+            ("Bollinger Upper", "BB_upper", "₹{:.2f}"), ("Bollinger Lower", "BB_lower", "₹{:.2f}"),
+            ("ATR 14", "ATR14", "₹{:.2f}"), ("VWAP", "VWAP", "₹{:.2f}"),
+            ("Volatility (20 bars)", "Volatility20", "{:.2f}%"),
+        ]:
+            value = latest(indicators, column)
+            if value is not None:
+                technical_lines.append(f"{label}: {fmt.format(value)}")
+        technical_summary = "\n".join(technical_lines)
+        news_block = f"\nRECENT NEWS:\n{news_summary}\n" if news_summary else ""
+        
+        prompt = f"""Analyze the Indian stock {symbol} ({company_name}) with the following comprehensive information:
+
+PRICE DATA:
+Current Price: ₹{current_price:.2f}
+Previous Close: ₹{prev_close:.2f}
+Change: ₹{change:.2f} ({change_pct:+.2f}%)
+52 Week High: ₹{high_52w:.2f}
+52 Week Low: ₹{low_52w:.2f}
+SMA 20: ₹{sma_20:.2f}
+SMA 50: ₹{sma_50:.2f}
+Volume: {volume:,.0f}
+Average Volume (20d): {avg_volume:,.0f}
+
+TECHNICAL INDICATORS:
+{technical_summary if technical_summary else 'Not enough price history'}
+
+COMPANY INFORMATION:
+- Sector: {stock_info.get('sector', 'N/A')}
+- Industry: {stock_info.get('industry', 'N/A')}
+- Market Cap: ₹{stock_info.get('marketCap', 0)/1e7:.2f} Cr
+- P/E Ratio: {stock_info.get('trailingPE', 'N/A')}
+- Book Value: ₹{stock_info.get('bookValue', 'N/A')}
+- Dividend Yield: {stock_info.get('dividendYield', 0)*100 if stock_info.get('dividendYield') else 0:.2f}%
+- Beta: {stock_info.get('beta', 'N/A')}
+
+NEWS SENTIMENT (lexicon score):
+{sentiment_line(sentiment)}
+{news_block}
+MARKET INTELLIGENCE:
+{info_summary if info_summary else 'No additional information available'}
+
+Provide a comprehensive analysis including:
+1. **Executive Summary** - Brief overview of the stock
+2. **Technical Analysis** - Price action, support/resistance, indicators
+3. **Fundamental Analysis** - Financial health, valuation metrics
+4. **Market Sentiment** - Based on the news sentiment score and market data
+5. **Trading Recommendation** - Buy/Hold/Sell with reasoning
+6. **Price Targets** - Short-term and medium-term targets
+7. **Risk Assessment** - Key risks and concerns
+8. **Investment Strategy** - Best approach for this stock
+
+Format the analysis clearly with sections and actionable insights. Focus on Indian market context."""
+
+        return chat_completion(
+            "You are an expert Indian stock market analyst with deep knowledge of NSE, BSE, technical analysis, fundamental analysis, and Indian market trends. Provide detailed, actionable insights.",
+            prompt,
+            max_tokens=2000,
+            stream=stream
+        )
+    except Exception as e:
+        return f"Error generating AI analysis: {str(e)}"
+
+def get_best_indian_stocks_today(stream=False, universe=DEFAULT_UNIVERSE):
+    """Get AI recommendation for best Indian stocks for today (a generator of text chunks when stream=True)"""
+    try:
+        symbols = get_universe(universe)
+        snapshot = get_universe_snapshot(symbols)
+        if snapshot.empty:
+            market_data = "No market data available; base picks on general market knowledge."
+        else:
+            market_data = snapshot.to_csv(float_format="%.2f")
+        
+        prompt = f"""Based on current Indian market conditions (NSE/BSE), analyze these stocks: {', '.join(symbols)}
+
+MARKET SNAPSHOT (daily NSE data, prices in ₹, MCap in ₹ Cr):
+{market_data}
+
+Provide your top 5 best Indian stock picks for today from this list with:
+1. Stock symbol and company name
+2. Current price range (use the snapshot prices)
+3. Brief reason (2-3 sentences) referencing the data above
+4. Expected price movement direction (Up/Down/Sideways)
+5. Risk level (Low/Medium/High)
+6. Entry strategy
+
+Format as a numbered list with clear sections."""
+
+        return chat_completion(
+            "You are an expert Indian stock market analyst. Provide actionable stock recommendations based on NSE/BSE market analysis.",
+            prompt,
+            max_tokens=1000,
+            stream=stream
+        )
+    except Exception as e:
+        return f"Error generating recommendations: {str(e)}"
+
+
+def analyze_symbol(query, period="1mo", interval="1d", with_news=True, with_ai=True):
+    """Run the full page pipeline for one stock name or symbol and return a JSON-friendly dict"""
+    started = time.perf_counter()
+    result = {"query": query, "symbol": None, "error": None}
+    symbol = normalize_stock_name(query) or search_stock_symbol(query)
+    if not symbol:
+        result["error"] = "symbol not found"
+        return result
+    result["symbol"] = symbol
+
+    stock_data, stock_info = get_stock_data(symbol, period=period, interval=interval)
+    if stock_data is None or stock_data.empty or not stock_info:
+        result["error"] = "no market data"
+        return result
+
+    indicators = get_indicators(symbol, interval, stock_data)
+    current_price = float(stock_data["Close"].iloc[-1])
+    prev_close = float(stock_data["Close"].iloc[-2]) if len(stock_data) > 1 else current_price
+    result.update({
+        "company_name": stock_info.get("longName", symbol),
+        "sector": stock_info.get("sector"),
+        "industry": stock_info.get("industry"),
+        "market_cap": stock_info.get("marketCap"),
+        "pe_ratio": stock_info.get("trailingPE"),
+        "price": current_price,
+        "change_pct": (current_price / prev_close - 1) * 100 if prev_close else 0.0,
+        "last_bar": stock_data.index[-1].isoformat(),
+        "indicators": {column: latest(indicators, column) for column in indicators.columns},
+    })
+
+    serper_data = {"news": [], "search_results": [], "company_name": result["company_name"]}
+    if with_news or with_ai:
+        serper_data = get_comprehensive_stock_info(symbol, result["company_name"])
+    if with_news:
+        result["sentiment"] = news_sentiment(symbol, serper_data)
+        result["news"] = [
+            {key: item.get(key) for key in ("title", "link", "source", "date", "snippet")}
+            for item in serper_data.get("news", [])
+        ]
+    if with_ai:
+        analysis = get_ai_analysis(symbol, stock_data, stock_info, serper_data, indicators=indicators)
+        if analysis.startswith("Error generating AI analysis"):
+            result["error"] = analysis
+        else:
+            result["analysis"] = analysis
+    result["elapsed_sec"] = round(time.perf_counter() - started, 3)
+    return result
@@ -0,0 +1,187 @@
+"""Portfolio risk: aligned daily returns and batched covariance, correlation and beta.
+
+Closes for every holding and the benchmark come from the per-symbol bar cache
+and OHLCV store, so editing the holdings list only downloads symbols not seen
+before (in one batched call). They are aligned into a days x holdings return
+matrix. Covariance and correlation of every pair are a few matrix products
+over that matrix, masked pairwise so a holding listed later than the others
+only uses the days both were trading. Rolling correlations with the
+benchmark come from cumulative sums, so they cost O(days x holdings)
+whatever the window.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from metrics import span
+from pipeline import normalize_stock_name
+from screener import load_panel
+from symbols import get_resolver
+
+PORTFOLIO_BENCHMARK = os.getenv("PORTFOLIO_BENCHMARK", "^NSEI")
+PORTFOLIO_PERIOD = "2y"
+TRADING_DAYS = 252
+ROLLING_WINDOW = 60
+
+DEFAULT_HOLDINGS = """RELIANCE.NS, 10
+TCS.NS, 5
+HDFCBANK.NS, 12
+INFY.NS, 8
+ICICIBANK.NS, 15
+ITC.NS, 40"""
+
+
+def parse_holdings(text):
+    """({symbol: quantity or None}, unresolved names) from lines like "RELIANCE.NS, 10", "TCS 5" or "HDFC Bank" """
+    holdings, unresolved = {}, []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        match = re.fullmatch(r"(.*?)[\s,;:]+(\d+(?:\.\d+)?)", line)
+        name, quantity = (match.group(1).strip(), float(match.group(2))) if match else (line, None)
+        symbol = normalize_stock_name(name)
+        if not symbol:
+            unresolved.append(name)
+            continue
+        if quantity is not None and holdings.get(symbol) is not None:
+            quantity += holdings[symbol]
+        holdings[symbol] = quantity
+    return holdings, unresolved
+
+
+def pairwise_moments(returns):
+    """(covariance, variance, correlation, overlap) of every column pair, using the days both have values.
+
+    variance[i, j] is the variance of column i over the days it shares with column j.
+    """
+    mask = ~np.isnan(returns)
+    x = np.where(mask, returns, 0.0)
+    m = mask.astype(float)
+    overlap = m.T @ m
+    # sums[i, j]: sum of column i over the days column j is observed
+    sums = x.T @ m
+    squares = (x * x).T @ m
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = (x.T @ x - sums * sums.T / overlap) / (overlap - 1)
+        variance = (squares - sums * sums / overlap) / (overlap - 1)
+        correlation = covariance / np.sqrt(variance * variance.T)
+    return covariance, variance, correlation, overlap
+
+
+def _rolling_sum(values, window):
+    csum = np.cumsum(values, axis=0)
+    out = csum.copy()
+    out[window:] -= csum[:-window]
+    return out
+
+
+def rolling_correlation(returns, benchmark, window=ROLLING_WINDOW):
+    """Trailing-window correlation of each column with `benchmark` (days x columns)"""
+    mask = ~np.isnan(returns) & ~np.isnan(benchmark)[:, None]
+    x = np.where(mask, returns, 0.0)
+    y = np.where(mask, benchmark[:, None], 0.0)
+    n = _rolling_sum(mask.astype(float), window)
+    sx, sy = _rolling_sum(x, window), _rolling_sum(y, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = _rolling_sum(x * y, window) - sx * sy / n
+        var_x = _rolling_sum(x * x, window) - sx * sx / n
+        var_y = _rolling_sum(y * y, window) - sy * sy / n
+        correlation = covariance / np.sqrt(var_x * var_y)
+    # Require most of the window; early rows and thinly overlapping pairs stay NaN
+    correlation[n < window * 0.8] = np.nan
+    return correlation
+
+
+def analyze_portfolio(holdings, period=PORTFOLIO_PERIOD, benchmark=PORTFOLIO_BENCHMARK, window=ROLLING_WINDOW):
+    """Risk report for {symbol: quantity or None}; None if no holding has price history.
+
+    Holdings are weighted by market value when every quantity is given, equally otherwise.
+    """
+    symbols = list(holdings)
+    panel = load_panel(symbols + [benchmark], period)
+    if not panel:
+        return None
+    close = panel["Close"]
+    held = [s for s in symbols if s in close and close[s].notna().sum() > 2]
+    if not held:
+        return None
+    has_benchmark = benchmark in close and close[benchmark].notna().sum() > 2
+
+    with span("portfolio.risk", holdings=len(held), days=len(close)):
+        columns = held + ([benchmark] if has_benchmark else [])
+        returns = close[columns].pct_change(fill_method=None).iloc[1:]
+        matrix = returns.to_numpy(dtype=float)
+        covariance, variance, correlation, _ = pairwise_moments(matrix)
+        k = len(held)
+
+        last = close[held].ffill().iloc[-1].to_numpy(dtype=float)
+        quantities = np.array([np.nan if holdings[s] is None else holdings[s] for s in held], dtype=float)
+        if np.isnan(quantities).any():
+            weights = np.full(k, 1.0 / k)
+        else:
+            weights = quantities * last / np.sum(quantities * last)
+
+        # Pairs that never traded together contribute nothing to the portfolio variance
+        asset_cov = np.nan_to_num(covariance[:k, :k])
+        marginal = asset_cov @ weights
+        portfolio_var = float(weights @ marginal)
+        vols = np.sqrt(np.diag(asset_cov) * TRADING_DAYS)
+        portfolio_vol = np.sqrt(portfolio_var * TRADING_DAYS)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            contribution = weights * marginal / portfolio_var if portfolio_var > 0 else np.full(k, np.nan)
+        if has_benchmark:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                beta = covariance[:k, k] / variance[k, :k]
+            benchmark_corr = correlation[:k, k]
+            rolling = rolling_correlation(matrix[:, :k], matrix[:, k], window)
+        else:
+            beta = benchmark_corr = np.full(k, np.nan)
+            rolling = np.full((len(matrix), k), np.nan)
+
+        # Each day, weights are renormalized over the holdings that traded, so one listed
+        # later doesn't count as a flat 0% return at full weight before its listing
+        traded = ~np.isnan(matrix[:, :k]) * weights
+        totals = traded.sum(axis=1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            day_weights = np.where(totals > 0, traded / totals, 0.0)
+        portfolio_returns = np.sum(np.nan_to_num(matrix[:, :k]) * day_weights, axis=1)
+        years = len(portfolio_returns) / TRADING_DAYS
+        growth = np.prod(1 + portfolio_returns)
+        asset_corr = correlation[:k, :k]
+        off_diagonal = asset_corr[~np.eye(k, dtype=bool)]
+
+        names = get_resolver().names
+        table = pd.DataFrame({
+            "Name": [names.get(s, s) for s in held],
+            "weight_%": weights * 100,
+            "volatility_%": vols * 100,
+            "beta": beta,
+            "corr_benchmark": benchmark_corr,
+            "risk_contribution_%": contribution * 100,
+            "return_%": (np.nanprod(1 + matrix[:, :k], axis=0) - 1) * 100,
+        }, index=pd.Index(held, name="Symbol"))
+        summary = {
+            "holdings": k,
+            "days": len(matrix),
+            "volatility_%": portfolio_vol * 100,
+            "beta": float(np.nansum(weights * beta)) if has_benchmark else np.nan,
+            "annual_return_%": (growth ** (1 / years) - 1) * 100 if years > 0 else np.nan,
+            "avg_correlation": float(np.nanmean(off_diagonal)) if off_diagonal.size else np.nan,
+            # Weighted average volatility over portfolio volatility; 1 means no diversification benefit
+            "diversification_ratio": float(weights @ vols / portfolio_vol) if portfolio_vol > 0 else np.nan,
+        }
+        rolling_vol = pd.Series(portfolio_returns, index=returns.index).rolling(window).std() * np.sqrt(TRADING_DAYS) * 100
+
+    return {
+        "summary": summary,
+        "holdings": table,
+        "correlation": pd.DataFrame(asset_corr, index=held, columns=held),
+        "covariance": pd.DataFrame(covariance[:k, :k] * TRADING_DAYS, index=held, columns=held),
+        "rolling_correlation": pd.DataFrame(rolling, index=returns.index, columns=held),
+        "rolling_volatility": rolling_vol,
+        "missing": [s for s in symbols if s not in held],
+        "benchmark": benchmark if has_benchmark else None,
+    }
@@ -0,0 +1,210 @@
+"""Background prefetch of popular symbols into the shared caches.
+
+A daemon thread walks a watchlist (by default the INDIAN_STOCKS names plus the
+Best Stocks universe) and calls the same pipeline functions a page view does,
+so the first visitor for a popular stock finds its price history,
+fundamentals, news and optionally AI analysis already cached. Symbols are
+spaced out across each pass and a pass pauses while any provider's token
+bucket is below PREFETCH_RESERVE of its burst, leaving quota for interactive
+users. Passes run every PREFETCH_INTERVAL seconds during the NSE session and
+every PREFETCH_CLOSED_INTERVAL seconds (or at the next open, if sooner)
+outside it.
+
+Enable with PREFETCH=1; configure the list with PREFETCH_SYMBOLS (a universe
+name or comma-separated symbols). News warming (PREFETCH_NEWS=1) and AI
+warming (PREFETCH_AI=1) are opt-in because every stock costs paid Serper
+queries, and they stop for the day once PREFETCH_SERPER_DAILY_BUDGET queries
+have been spent.
+"""
+import logging
+import os
+import threading
+import time
+
+from cache import HISTORY_TTL, news_cache
+from market import is_market_open, now_ist, seconds_until_open
+from ratelimit import serper_provider, groq_provider, yahoo_provider
+from symbols import INDIAN_STOCKS
+from universe import DEFAULT_UNIVERSE, get_universe, get_universe_snapshot
+from indicators import get_indicators
+from pipeline import get_stock_data, get_comprehensive_stock_info, get_ai_analysis, get_best_indian_stocks_today
+
+PREFETCH = os.getenv("PREFETCH", "0") in ("1", "true", "True")
+PREFETCH_SYMBOLS = os.getenv("PREFETCH_SYMBOLS", "")
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", str(HISTORY_TTL)))
+PREFETCH_CLOSED_INTERVAL = float(os.getenv("PREFETCH_CLOSED_INTERVAL", "3600"))
+PREFETCH_SPACING = float(os.getenv("PREFETCH_SPACING", "1.0"))
+PREFETCH_RESERVE = float(os.getenv("PREFETCH_RESERVE", "0.5"))
+PREFETCH_NEWS = os.getenv("PREFETCH_NEWS", "0") in ("1", "true", "True")
+PREFETCH_AI = os.getenv("PREFETCH_AI", "0") in ("1", "true", "True")
+PREFETCH_SERPER_DAILY_BUDGET = int(os.getenv("PREFETCH_SERPER_DAILY_BUDGET", "300"))
+
+# Serper queries one stock's news fan-out makes (get_comprehensive_stock_info)
+SERPER_QUERIES_PER_STOCK = 5
+
+# Prefetcher.warm() results besides None (nothing could be fetched)
+WARMED = "warmed"
+BUDGET_SKIPPED = "budget_skipped"
+
+# The page loads this window; prefetching anything else would not be hit
+PAGE_PERIOD, PAGE_INTERVAL = "1mo", "1d"
+
+logger = logging.getLogger(__name__)
+
+
+def default_watchlist():
+    """PREFETCH_SYMBOLS if set, else the INDIAN_STOCKS symbols and the Best Stocks universe"""
+    if PREFETCH_SYMBOLS:
+        return get_universe(PREFETCH_SYMBOLS)
+    return list(dict.fromkeys(list(INDIAN_STOCKS.values()) + get_universe(DEFAULT_UNIVERSE)))
+
+
+class Prefetcher:
+    """Periodically warms the caches for a watchlist on a background thread"""
+
+    def __init__(self, symbols, news=PREFETCH_NEWS, ai=PREFETCH_AI, interval=PREFETCH_INTERVAL,
+                 closed_interval=PREFETCH_CLOSED_INTERVAL, spacing=PREFETCH_SPACING, reserve=PREFETCH_RESERVE,
+                 serper_budget=PREFETCH_SERPER_DAILY_BUDGET):
+        self.symbols = list(dict.fromkeys(symbols))
+        self.news = news
+        self.ai = ai
+        self.serper_budget = serper_budget
+        self.serper_used = 0
+        self._budget_day = None
+        self.interval = interval
+        self.closed_interval = closed_interval
+        self.spacing = spacing
+        self.reserve = reserve
+        self.passes = 0
+        self.warmed = 0
+        # Prices warmed, but news left cold because the day's Serper budget was spent
+        self.budget_skipped = 0
+        self.skipped = 0
+        self.last_pass = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _providers(self):
+        """Providers a warm-up would call, minus any that are failing fast right now"""
+        providers = [yahoo_provider]
+        if self.news or self.ai:
+            providers.append(serper_provider)
+        if self.ai:
+            providers.append(groq_provider)
+        return [p for p in providers if p.breaker.state != "open"]
+
+    def _wait_for_headroom(self):
+        """Block until the providers in use have spare quota; False if stopped or Yahoo is down"""
+        while not self._stop.is_set():
+            providers = self._providers()
+            if yahoo_provider not in providers:
+                return False
+            if all(p.bucket.available() >= p.bucket.burst * self.reserve for p in providers):
+                return True
+            self._stop.wait(1.0)
+        return False
+
+    def _serper_budget_left(self):
+        """Serper queries prefetch may still spend today (the budget resets at midnight IST)"""
+        today = now_ist().date()
+        if today != self._budget_day:
+            self._budget_day, self.serper_used = today, 0
+        return self.serper_budget - self.serper_used
+
+    def warm(self, symbol):
+        """Fetch everything a page view of `symbol` needs, through the shared caches.
+
+        Returns WARMED, BUDGET_SKIPPED when only prices were warmed because the Serper
+        budget ran out, or None when nothing could be fetched.
+        """
+        stock_data, stock_info = get_stock_data(symbol, period=PAGE_PERIOD, interval=PAGE_INTERVAL)
+        if stock_data is None or stock_data.empty or not stock_info:
+            return None
+        providers = self._providers()
+        if (self.news or self.ai) and serper_provider in providers:
+            if symbol not in news_cache and self._serper_budget_left() < SERPER_QUERIES_PER_STOCK:
+                return BUDGET_SKIPPED
+            calls_before = serper_provider.calls
+            serper_data = get_comprehensive_stock_info(symbol, stock_info.get("longName", symbol))
+            # Counted from the provider, so cache hits are free and concurrent user queries err on the safe side
+            self.serper_used += serper_provider.calls - calls_before
+            if self.ai and groq_provider in providers:
+                indicators = get_indicators(symbol, PAGE_INTERVAL, stock_data)
+                get_ai_analysis(symbol, stock_data, stock_info, serper_data, indicators=indicators)
+        return WARMED
+
+    def run_pass(self):
+        """Warm every symbol once, spread over at most one interval"""
+        spacing = min(self.spacing, self.interval / max(1, len(self.symbols)))
+        for symbol in self.symbols:
+            if not self._wait_for_headroom():
+                if self._stop.is_set():
+                    return
+                self.skipped += 1
+                continue
+            try:
+                result = self.warm(symbol)
+                if result == WARMED:
+                    self.warmed += 1
+                elif result == BUDGET_SKIPPED:
+                    self.budget_skipped += 1
+                else:
+                    self.skipped += 1
+            except Exception:
+                logger.exception("prefetch failed for %s", symbol)
+                self.skipped += 1
+            if self._stop.wait(spacing):
+                return
+        try:
+            get_universe_snapshot(get_universe(DEFAULT_UNIVERSE))
+            if self.ai:
+                get_best_indian_stocks_today()
+        except Exception:
+            logger.exception("prefetch failed for the Best Stocks snapshot")
+        self.passes += 1
+        self.last_pass = time.time()
+
+    def next_delay(self):
+        """Seconds until the next pass: short during the session, long (or until the open) outside it"""
+        if is_market_open():
+            return self.interval
+        return max(1.0, min(self.closed_interval, seconds_until_open()))
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.run_pass()
+            self._stop.wait(max(0.0, self.next_delay() - (time.monotonic() - started)))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {"name": "prefetch", "running": bool(self._thread and self._thread.is_alive()),
+                "symbols": len(self.symbols), "passes": self.passes, "warmed": self.warmed,
+                "budget_skipped": self.budget_skipped, "skipped": self.skipped, "last_pass": self.last_pass,
+                "serper_used_today": self.serper_used, "serper_budget": self.serper_budget}
+
+
+_prefetcher = None
+_lock = threading.Lock()
+
+
+def start_prefetcher(symbols=None):
+    """Start the process-wide prefetcher once (no-op unless PREFETCH=1 or symbols are given)"""
+    global _prefetcher
+    if symbols is None and not PREFETCH:
+        return None
+    with _lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher(symbols or default_watchlist())
+        return _prefetcher.start()
@@ -0,0 +1,177 @@
+"""Prompt context assembly: deduplicate, rank and pack Serper results into a token budget.
+
+The five overlapping Serper queries return many copies of the same story
+(same link, or the same headline syndicated with a different source suffix).
+Items are deduplicated by canonical link and near-duplicate title, scored by
+relevance to the stock, recency and how much concrete information the snippet
+carries, and the best ones are packed until the section's token budget is
+spent. Token counts are estimated (about 4 characters per token), which is
+close enough for budgeting without a tokenizer dependency.
+"""
+import math
+import os
+import re
+from datetime import datetime
+from urllib.parse import urlsplit
+
+# News reaches the analysis prompt as a sentiment score; raw news text is opt-in
+PROMPT_NEWS_TOKENS = int(os.getenv("PROMPT_NEWS_TOKENS", "0"))
+PROMPT_SEARCH_TOKENS = int(os.getenv("PROMPT_SEARCH_TOKENS", "250"))
+PROMPT_SNIPPET_CHARS = int(os.getenv("PROMPT_SNIPPET_CHARS", "220"))
+
+# Titles sharing at least this fraction of their words are the same story
+NEAR_DUPLICATE_TITLE = 0.6
+# News loses half its recency weight every this many hours
+RECENCY_HALF_LIFE_HOURS = 48
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in india indian is it its of on or over "
+    "says share shares stock stocks that the this to today up was will with".split()
+)
+# Words that signal a story with price-moving content
+_SIGNAL_WORDS = frozenset(
+    "results earnings profit loss revenue margin ebitda guidance quarter q1 q2 q3 q4 dividend "
+    "buyback target upgrade downgrade rating buy sell order deal acquisition merger stake "
+    "rbi sebi penalty approval launch expansion debt rally slump record".split()
+)
+_AGE_UNITS = {"minute": 1 / 60, "min": 1 / 60, "hour": 1, "day": 24, "week": 24 * 7, "month": 24 * 30, "year": 24 * 365}
+
+
+def estimate_tokens(text):
+    """Approximate LLM token count of `text`"""
+    return (len(text) + 3) // 4
+
+
+def title_words(title):
+    """Content words of a headline, ignoring a trailing " - Source" / " | Source" suffix"""
+    title = re.split(r"\s[-|–]\s(?=[^-|–]*$)", title or "")[0]
+    return {w for w in _WORD.findall(title.lower()) if w not in _STOPWORDS}
+
+
+def canonical_link(link):
+    """Link without scheme, www., query string, fragment or trailing slash"""
+    parts = urlsplit((link or "").strip().lower())
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    return f"{host}{parts.path.rstrip('/')}" if host else ""
+
+
+def age_hours(date, now=None):
+    """Age of a Serper date ("3 hours ago", "2 days ago", "Mar 5, 2025"), or None if unknown"""
+    if not date:
+        return None
+    match = re.match(r"(\d+)\s*(minute|min|hour|day|week|month|year)s?\s+ago", date.strip().lower())
+    if match:
+        return int(match.group(1)) * _AGE_UNITS[match.group(2)]
+    for fmt in ("%b %d, %Y", "%d %b %Y", "%Y-%m-%d", "%B %d, %Y"):
+        try:
+            published = datetime.strptime(date.strip(), fmt)
+        except ValueError:
+            continue
+        return max(0.0, ((now or datetime.now()) - published).total_seconds() / 3600)
+    return None
+
+
+def dedupe_items(items, seen_links=None, seen_titles=None):
+    """Drop items whose link or near-identical title was already seen (first, fullest copy wins).
+
+    `seen_links`/`seen_titles` carry state across calls, so search results can be
+    deduplicated against the news already kept.
+    """
+    seen_links = set() if seen_links is None else seen_links
+    seen_titles = [] if seen_titles is None else seen_titles
+    kept = []
+    for item in items:
+        link = canonical_link(item.get("link"))
+        words = title_words(item.get("title"))
+        if link and link in seen_links:
+            continue
+        duplicate = None
+        if words:
+            for owner, index, other in seen_titles:
+                if len(words & other) / max(1, min(len(words), len(other))) >= NEAR_DUPLICATE_TITLE:
+                    duplicate = (owner, index)
+                    break
+        if link:
+            seen_links.add(link)
+        if duplicate is not None:
+            # Same story: keep whichever copy has the more informative snippet
+            owner, index = duplicate
+            if owner is kept and len(item.get("snippet", "")) > len(kept[index].get("snippet", "")):
+                kept[index] = item
+            continue
+        seen_titles.append((kept, len(kept), words))
+        kept.append(item)
+    return kept
+
+
+def score_item(item, subject_words, now=None):
+    """Relevance to the stock, recency and information density, combined into 0..1"""
+    text = f"{item.get('title', '')} {item.get('snippet', '')}".lower()
+    words = set(_WORD.findall(text))
+    relevance = 0.6 if subject_words & words else 0.0
+    relevance += min(0.4, 0.1 * len(_SIGNAL_WORDS & words))
+    hours = age_hours(item.get("date"), now)
+    recency = 0.3 if hours is None else math.pow(0.5, hours / RECENCY_HALF_LIFE_HOURS)
+    numbers = len(re.findall(r"\d[\d,.]*\s*(?:%|cr|crore|lakh|bn|billion|mn)?", text))
+    information = min(1.0, len(item.get("snippet", "")) / PROMPT_SNIPPET_CHARS) * 0.5 + min(0.5, 0.1 * numbers)
+    return 0.45 * relevance + 0.35 * recency + 0.2 * information
+
+
+def _trim(text, limit):
+    text = " ".join((text or "").split())
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:") + "…"
+
+
+def format_item(item, snippet_chars=PROMPT_SNIPPET_CHARS):
+    title = " ".join((item.get("title") or "").split())
+    source = item.get("source")
+    if source:
+        # The source is listed separately; don't pay for it twice
+        title = re.sub(rf"\s[-|–]\s{re.escape(source)}$", "", title)
+    meta = ", ".join(part for part in (source, item.get("date")) if part)
+    head = f"- {title}" + (f" ({meta})" if meta else "")
+    snippet = _trim(item.get("snippet"), snippet_chars)
+    return f"{head}: {snippet}" if snippet else head
+
+
+def pack(items, budget_tokens, subject_words, snippet_chars=PROMPT_SNIPPET_CHARS, now=None):
+    """Best-scoring items formatted one per line within `budget_tokens`, plus (tokens used, items used)"""
+    ranked = sorted(items, key=lambda item: score_item(item, subject_words, now), reverse=True)
+    lines, used = [], 0
+    for item in ranked:
+        line = format_item(item, snippet_chars)
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget_tokens:
+            continue
+        lines.append(line)
+        used += cost
+    return "\n".join(lines), used, len(lines)
+
+
+def subject_words_for(symbol, company_name):
+    """Words that identify the stock in a headline (ticker and distinctive name words)"""
+    words = title_words(company_name) - {"ltd", "limited", "co", "company", "corporation", "corp", "inc"}
+    words.add(symbol.split(".")[0].lower())
+    return words
+
+
+def build_news_context(serper_data, symbol, news_tokens=PROMPT_NEWS_TOKENS, search_tokens=PROMPT_SEARCH_TOKENS):
+    """(news summary, search summary, stats) for the analysis prompt"""
+    company_name = serper_data.get("company_name") or symbol
+    subject = subject_words_for(symbol, company_name)
+    seen_links, seen_titles = set(), []
+    news = dedupe_items(serper_data.get("news", []), seen_links, seen_titles)
+    search = dedupe_items(serper_data.get("search_results", []), seen_links, seen_titles)
+    news_summary, news_tokens_used, news_count = pack(news, news_tokens, subject)
+    search_summary, search_tokens_used, search_count = pack(search, search_tokens, subject)
+    stats = {
+        "items_in": len(serper_data.get("news", [])) + len(serper_data.get("search_results", [])),
+        "items_unique": len(news) + len(search),
+        "items_used": news_count + search_count,
+        "tokens": news_tokens_used + search_tokens_used,
+    }
+    return news_summary, search_summary, stats
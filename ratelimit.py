@@ -0,0 +1,222 @@
+"""Client-side rate limiting, retries and circuit breaking for upstream providers.
+
+Each provider (Serper, Groq, Yahoo) gets a token bucket shared by every
+session in the process, jittered exponential backoff on 429/5xx and transient
+network errors, and a circuit breaker that fails fast after repeated failures.
+Quotas are configured per provider through environment variables, e.g.
+SERPER_RATE_PER_SEC, SERPER_BURST, SERPER_MAX_RETRIES, SERPER_BREAKER_THRESHOLD.
+"""
+import os
+import random
+import threading
+import time
+
+
+class ProviderUnavailable(Exception):
+    """Raised instead of calling a provider that is rate limited or tripped"""
+
+
+class RateLimitExceeded(ProviderUnavailable):
+    """No request token became available within the wait budget"""
+
+
+class CircuitOpenError(ProviderUnavailable):
+    """The provider failed repeatedly and is cooling down"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` saved"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        """Take one token, waiting up to `timeout` seconds; raises RateLimitExceeded"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                raise RateLimitExceeded("request quota exhausted")
+            time.sleep(wait)
+
+    def available(self):
+        """Tokens that could be taken right now without waiting"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failed calls and lets one probe through after `reset_timeout`"""
+
+    def __init__(self, threshold=5, reset_timeout=30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may proceed"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError("provider temporarily unavailable after repeated failures")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release_probe(self):
+        """Give back a half-open probe slot that was not used for a real call"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+def _env(name, key, default):
+    return float(os.getenv(f"{name.upper()}_{key}", str(default)))
+
+
+class Provider:
+    """Rate limit, retry policy and circuit breaker for one upstream service"""
+
+    def __init__(self, name, rate, burst, max_retries=3, base_delay=0.5, max_delay=8.0,
+                 breaker_threshold=5, breaker_reset=30.0, acquire_timeout=10.0, retryable=None):
+        self.name = name
+        self.bucket = TokenBucket(_env(name, "RATE_PER_SEC", rate), _env(name, "BURST", burst))
+        self.breaker = CircuitBreaker(
+            int(_env(name, "BREAKER_THRESHOLD", breaker_threshold)), _env(name, "BREAKER_RESET", breaker_reset)
+        )
+        self.max_retries = int(_env(name, "MAX_RETRIES", max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.acquire_timeout = _env(name, "ACQUIRE_TIMEOUT", acquire_timeout)
+        self.retryable = retryable or (lambda error: False)
+        self.calls = 0
+        self.retries = 0
+        self.rejected = 0
+
+    def _backoff(self, attempt, retry_after=None):
+        # Full jitter, but never sooner than the server asked for
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_delay))
+        time.sleep(delay)
+
+    def call(self, fn):
+        """Run `fn()` under the provider's quota, retry and breaker policy.
+
+        `fn` may return an HTTP response (429/5xx responses are retried and the
+        last one is returned) or raise (retryable errors are retried, the last
+        one is re-raised). Raises ProviderUnavailable without calling `fn` when
+        the breaker is open or no quota frees up in time.
+        """
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.rejected += 1
+            raise
+        attempt = 0
+        while True:
+            try:
+                self.bucket.acquire(self.acquire_timeout)
+            except RateLimitExceeded:
+                # Our own quota, not a provider failure
+                self.rejected += 1
+                self.breaker.release_probe()
+                raise
+            self.calls += 1
+            try:
+                result = fn()
+            except Exception as error:
+                if attempt < self.max_retries and self.retryable(error):
+                    self.retries += 1
+                    self._backoff(attempt, _retry_after(getattr(error, "response", None)))
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+                raise
+            status = getattr(result, "status_code", None)
+            if status is not None and (status == 429 or status >= 500):
+                if attempt < self.max_retries:
+                    self.retries += 1
+                    self._backoff(attempt, _retry_after(result))
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+                return result
+            self.breaker.record_success()
+            return result
+
+    def stats(self):
+        return {"name": self.name, "state": self.breaker.state, "calls": self.calls,
+                "retries": self.retries, "rejected": self.rejected}
+
+
+def _retry_after(response):
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After") or 0) or None
+    except (TypeError, ValueError):
+        return None
+
+
+def _transient_network_error(error):
+    # Covers requests/httpx/curl connection errors and timeouts without importing each client
+    name = type(error).__name__
+    return isinstance(error, (ConnectionError, TimeoutError)) or "Timeout" in name or "Connection" in name
+
+
+def _groq_retryable(error):
+    status = getattr(error, "status_code", None)
+    return status == 429 or (status is not None and status >= 500) or _transient_network_error(error)
+
+
+def _yahoo_retryable(error):
+    return type(error).__name__ == "YFRateLimitError" or _transient_network_error(error)
+
+
+serper_provider = Provider("serper", rate=5, burst=10, retryable=_transient_network_error)
+groq_provider = Provider("groq", rate=0.5, burst=5, retryable=_groq_retryable)
+yahoo_provider = Provider("yahoo", rate=2, burst=10, retryable=_yahoo_retryable)
+
+
+def provider_stats():
+    """Counters and breaker state for every provider"""
+    return [serper_provider.stats(), groq_provider.stats(), yahoo_provider.stats()]
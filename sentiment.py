@@ -0,0 +1,204 @@
+"""Local news sentiment: a finance lexicon scored over every headline at once.
+
+Each item's title and snippet are tokenized, looked up in a small market
+lexicon (strong words count 2, mild ones 1), flipped after a nearby negator
+("not", "no", "fails to"...) and boosted after an intensifier ("sharply",
+"record"), then summed per item with one bincount over the whole batch. The
+sum is squashed into -1..1 like VADER's compound score. No model or network
+call is involved, so a page of news scores in well under a millisecond.
+
+Scores and first-seen publish times are cached per article link on disk, and
+each symbol keeps the articles it has been scored on, which gives the News
+section a sentiment series that grows across visits.
+"""
+import os
+import re
+import time
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from cache import PersistentCache
+from market import IST
+from prompts import RECENCY_HALF_LIFE_HOURS, age_hours, canonical_link, dedupe_items
+
+SENTIMENT_CACHE_TTL = int(os.getenv("SENTIMENT_CACHE_TTL", str(30 * 24 * 3600)))
+SENTIMENT_HISTORY_DAYS = int(os.getenv("SENTIMENT_HISTORY_DAYS", "90"))
+SENTIMENT_HISTORY_MAX = int(os.getenv("SENTIMENT_HISTORY_MAX", "500"))
+
+# Bump when the lexicon or scoring changes so cached scores are recomputed
+SENTIMENT_VERSION = 1
+# Items scoring within this band of zero are neutral
+NEUTRAL_BAND = 0.1
+# Normalization constant: a raw sum of 2 maps to ~0.63, 4 to ~0.85
+ALPHA = 6.0
+NEGATION_WINDOW = 3
+NEGATION_FACTOR = -0.75
+INTENSIFIER_FACTOR = 1.5
+
+_STRONG_POSITIVE = """
+beat beats surge surges surged surging soar soars soared soaring rally rallies rallied record
+upgrade upgrades upgraded outperform outperforms outperformed outperformer bonus buyback
+multibagger breakout jump jumps jumped skyrocket skyrockets boom booming bullish windfall
+""".split()
+_POSITIVE = """
+gain gains gained gainer gainers rise rises rising rose higher high highs climb climbs climbed
+growth grow grows grew strong stronger strength robust healthy profit profits profitable
+dividend win wins won order orders approval approves approved clears cleared launch launches
+expands expansion expand boost boosts boosted improve improves improved improvement positive
+optimistic upbeat recovery recovers recovered rebound rebounds rebounded accumulate buy
+raises raised hike hikes exceed exceeds exceeded top tops topped inflow inflows
+momentum confident confidence opportunity opportunities upside attractive undervalued
+milestone award awarded partnership deal deals acquire acquires acquisition
+""".split()
+_STRONG_NEGATIVE = """
+plunge plunges plunged plunging crash crashes crashed slump slumps slumped tank tanks tanked
+downgrade downgrades downgraded fraud scam default defaults defaulted bankruptcy insolvency
+probe raid raids penalty penalties loss-making bearish collapse collapses collapsed tumble
+tumbles tumbled selloff sell-off underperform underperforms underperformed
+""".split()
+_NEGATIVE = """
+fall falls fell falling drop drops dropped decline declines declined declining slip slips
+slipped lower low lows weak weaker weakness loss losses miss misses missed disappoint
+disappoints disappointed disappointing concern concerns worry worries risk risks pressure
+sell cut cuts trim trims trimmed exit exits outflow outflows slowdown slow slower negative
+pessimistic caution cautious warning warns warned litigation lawsuit dispute fined
+resign resigns resigned resignation delay delays delayed halt halts halted debt volatile
+volatility overvalued expensive headwind headwinds downside shortfall layoffs strike
+""".split()
+_NEGATORS = frozenset("not no never without hardly barely neither nor fails fail failed".split())
+_INTENSIFIERS = frozenset("very sharply sharp massive huge steep steeply strongly significantly big biggest".split())
+
+LEXICON = {
+    **{word: 1.0 for word in _POSITIVE}, **{word: 2.0 for word in _STRONG_POSITIVE},
+    **{word: -1.0 for word in _NEGATIVE}, **{word: -2.0 for word in _STRONG_NEGATIVE},
+}
+
+_TOKEN = re.compile(r"[a-z]+(?:-[a-z]+)*")
+
+# Article link -> {"score": float, "published": epoch seconds}
+article_cache = PersistentCache("sentiment_articles", ttl=SENTIMENT_CACHE_TTL, max_entries=20000)
+# Symbol -> {article key: [published, score]}, the articles it has been scored on
+history_cache = PersistentCache("sentiment_history", ttl=SENTIMENT_HISTORY_DAYS * 24 * 3600, max_entries=2000)
+
+
+def score_texts(texts):
+    """Sentiment in -1..1 for each text, scored as one batch"""
+    docs = [_TOKEN.findall((text or "").lower()) for text in texts]
+    lengths = np.fromiter(map(len, docs), dtype=np.int64, count=len(docs))
+    tokens = list(chain.from_iterable(docs))
+    if not tokens:
+        return np.zeros(len(docs))
+    doc_ids = np.repeat(np.arange(len(docs)), lengths)
+    weights = np.fromiter((LEXICON.get(token, 0.0) for token in tokens), dtype=float, count=len(tokens))
+    negator = np.fromiter((token in _NEGATORS for token in tokens), dtype=bool, count=len(tokens))
+    intensifier = np.fromiter((token in _INTENSIFIERS for token in tokens), dtype=bool, count=len(tokens))
+
+    # A negator up to NEGATION_WINDOW tokens earlier in the same text flips the word
+    negated = np.zeros(len(tokens), dtype=bool)
+    for k in range(1, NEGATION_WINDOW + 1):
+        negated[k:] |= negator[:-k] & (doc_ids[:-k] == doc_ids[k:])
+    boosted = np.zeros(len(tokens), dtype=bool)
+    boosted[1:] = intensifier[:-1] & (doc_ids[:-1] == doc_ids[1:])
+    weights = weights * np.where(negated, NEGATION_FACTOR, 1.0) * np.where(boosted, INTENSIFIER_FACTOR, 1.0)
+
+    raw = np.bincount(doc_ids, weights=weights, minlength=len(docs))
+    return raw / np.sqrt(raw * raw + ALPHA)
+
+
+def label(score):
+    """"positive", "negative" or "neutral" for a score"""
+    if score > NEUTRAL_BAND:
+        return "positive"
+    if score < -NEUTRAL_BAND:
+        return "negative"
+    return "neutral"
+
+
+def article_key(item):
+    """Cache key for an item: its canonical link, or its title when it has none"""
+    link = canonical_link(item.get("link"))
+    return f"v{SENTIMENT_VERSION}:{link or ' '.join((item.get('title') or '').lower().split())}"
+
+
+def score_items(items, now=None):
+    """[{"score", "published"}] per item; cached articles keep their score and first-seen publish time"""
+    now = now or time.time()
+    keys = [article_key(item) for item in items]
+    cached = article_cache.get_many(keys)
+    fresh = [i for i, key in enumerate(keys) if key not in cached]
+    if fresh:
+        scores = score_texts([f"{items[i].get('title', '')}. {items[i].get('snippet', '')}" for i in fresh])
+        new = {}
+        for i, score in zip(fresh, scores):
+            # Serper dates are relative ("3 hours ago"), so pin them to an absolute time once
+            hours = age_hours(items[i].get("date"))
+            new[keys[i]] = {"score": float(score), "published": now - (hours or 0.0) * 3600}
+        article_cache.set_many(new)
+        cached.update(new)
+    return [cached[key] for key in keys]
+
+
+def news_sentiment(symbol, serper_data, now=None):
+    """Recency-weighted sentiment of a stock's deduplicated news and search results.
+
+    Also records the scored articles in the symbol's history for sentiment_series().
+    """
+    now = now or time.time()
+    seen_links, seen_titles = set(), []
+    items = dedupe_items(serper_data.get("news", []), seen_links, seen_titles)
+    items += dedupe_items(serper_data.get("search_results", []), seen_links, seen_titles)
+    summary = {"score": 0.0, "label": "neutral", "items": len(items), "positive": 0, "negative": 0, "neutral": 0,
+               "most_positive": None, "most_negative": None}
+    if not items:
+        return summary
+    scored = score_items(items, now)
+    scores = np.array([entry["score"] for entry in scored])
+    ages = np.array([max(0.0, now - entry["published"]) / 3600 for entry in scored])
+    weights = np.power(0.5, ages / RECENCY_HALF_LIFE_HOURS)
+    summary["score"] = float(np.average(scores, weights=weights)) if weights.sum() > 0 else float(scores.mean())
+    summary["label"] = label(summary["score"])
+    for score in scores:
+        summary[label(score)] += 1
+    if scores.max() > NEUTRAL_BAND:
+        summary["most_positive"] = items[int(scores.argmax())].get("title")
+    if scores.min() < -NEUTRAL_BAND:
+        summary["most_negative"] = items[int(scores.argmin())].get("title")
+
+    articles = {article_key(item): [entry["published"], entry["score"]] for item, entry in zip(items, scored)}
+    cutoff = now - SENTIMENT_HISTORY_DAYS * 24 * 3600
+
+    def merge(history):
+        history.update(articles)
+        return dict(sorted(((key, value) for key, value in history.items() if value[0] >= cutoff),
+                           key=lambda pair: pair[1][0])[-SENTIMENT_HISTORY_MAX:])
+
+    # One transaction, so sessions scoring the same symbol at once don't drop each other's articles
+    history_cache.update(symbol, merge, default={})
+    return summary
+
+
+def sentiment_series(symbol, freq="D"):
+    """Mean article sentiment and article count per `freq` period (IST) from the symbol's history"""
+    history = history_cache.get(symbol, {})
+    if not history:
+        return pd.DataFrame(columns=["score", "articles"])
+    published, scores = np.array(list(history.values()), dtype=float).T
+    frame = pd.DataFrame({"score": scores}, index=pd.to_datetime(published, unit="s", utc=True).tz_convert(IST))
+    grouped = frame["score"].resample(freq)
+    series = pd.DataFrame({"score": grouped.mean(), "articles": grouped.count()})
+    return series[series["articles"] > 0]
+
+
+def sentiment_line(summary):
+    """One-line summary for the analysis prompt"""
+    if not summary["items"]:
+        return "No recent news to score"
+    line = (f"{summary['score']:+.2f} ({summary['label']}, -1 to +1, recency-weighted) from {summary['items']} "
+            f"articles: {summary['positive']} positive, {summary['negative']} negative, {summary['neutral']} neutral")
+    if summary["most_positive"]:
+        line += f"\nMost positive: {summary['most_positive']}"
+    if summary["most_negative"]:
+        line += f"\nMost negative: {summary['most_negative']}"
+    return line
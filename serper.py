@@ -0,0 +1,88 @@
+"""Serper API client with a pooled keep-alive session and concurrent fan-out"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from cache import PersistentCache
+from metrics import span
+from ratelimit import ProviderUnavailable, serper_provider
+
+SERPER_API_KEY = os.getenv("SERPER_API_KEY", "")
+SERPER_BASE_URL = os.getenv("SERPER_BASE_URL", "https://google.serper.dev")
+SERPER_TIMEOUT = float(os.getenv("SERPER_TIMEOUT", "8"))
+SERPER_MAX_WORKERS = int(os.getenv("SERPER_MAX_WORKERS", "8"))
+SYMBOL_SEARCH_TTL = int(os.getenv("SYMBOL_SEARCH_TTL", str(7 * 24 * 3600)))
+SYMBOL_SEARCH_MISS_TTL = int(os.getenv("SYMBOL_SEARCH_MISS_TTL", str(24 * 3600)))
+
+# Resolved symbols and known misses from search_stock_symbol, shared across processes.
+# Values are {"symbol": "RELIANCE.NS"} or {"symbol": None} for a query that found nothing.
+symbol_search_cache = PersistentCache("symbol_search", ttl=SYMBOL_SEARCH_TTL, max_entries=5000)
+
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """Shared requests session so every call reuses pooled keep-alive connections"""
+    global _session
+    with _lock:
+        if _session is None:
+            # Imported on first use so app startup doesn't pay for it
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SERPER_MAX_WORKERS * 2)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Content-Type": "application/json"})
+            _session = session
+        return _session
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=SERPER_MAX_WORKERS, thread_name_prefix="serper")
+        return _executor
+
+
+def serper_post(endpoint, payload, timeout=SERPER_TIMEOUT, label=None):
+    """POST to a Serper endpoint ("search", "news") and return the JSON body, or None on failure.
+
+    `label` is appended to the recorded stage name ("serper.search.q2").
+    """
+    try:
+        # Quota, 429/5xx backoff and circuit breaking are shared by every session
+        stage = f"serper.{endpoint}.{label}" if label else f"serper.{endpoint}"
+        with span(stage, q=payload.get("q", "")) as fields:
+            response = serper_provider.call(lambda: get_session().post(
+                f"{SERPER_BASE_URL}/{endpoint}",
+                json=payload,
+                headers={"X-API-KEY": SERPER_API_KEY},
+                timeout=timeout,
+            ))
+            fields["status"] = response.status_code
+        if response.status_code == 200:
+            return response.json()
+        return None
+    # requests' exceptions are OSErrors
+    except (OSError, ValueError, ProviderUnavailable):
+        return None
+
+
+def serper_fan_out(calls, timeout=SERPER_TIMEOUT):
+    """Run several (endpoint, payload) calls concurrently.
+
+    Returns a list of JSON bodies in the same order as `calls`; calls that fail
+    or do not finish within `timeout` yield None so callers can use partial results.
+    Each call is timed as its own stage, labelled by its position ("serper.news.q4").
+    """
+    executor = _get_executor()
+    futures = [executor.submit(serper_post, endpoint, payload, timeout, f"q{i}")
+               for i, (endpoint, payload) in enumerate(calls)]
+    # Bound the whole fan-out: stragglers still retrying are dropped from this page load
+    wait(futures, timeout=timeout + 1)
+    return [f.result() if f.done() and not f.exception() else None for f in futures]
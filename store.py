@@ -0,0 +1,240 @@
+"""On-disk OHLCV store with incremental refresh.
+
+Bars are kept as one Parquet file per (symbol, interval) under OHLCV_STORE_DIR,
+with a small JSON record in the file's own metadata saying how far back the
+stored history is known to be complete. A request first reads the file and
+then only asks Yahoo for bars from the last stored one onwards.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import timedelta
+
+import pandas as pd
+
+from cache import CACHE_DIR
+
+OHLCV_STORE = os.getenv("OHLCV_STORE", "1") not in ("0", "false", "False", "")
+OHLCV_STORE_DIR = os.getenv("OHLCV_STORE_DIR", os.path.join(CACHE_DIR, "ohlcv"))
+
+# A re-fetched, already completed bar that moved more than this means Yahoo
+# re-adjusted the history (dividend/split), so the stored copy is discarded
+ADJUSTMENT_TOLERANCE = 1e-3
+
+_INTRADAY_LOOKBACK = {"1m": 7, "2m": 59, "5m": 59, "15m": 59, "30m": 59, "60m": 729, "90m": 59, "1h": 729}
+
+# Parquet schema metadata key holding the store's JSON record
+_META_KEY = b"ohlcv_store"
+
+_lock = threading.Lock()
+
+
+def _path(symbol, interval, namespace=None):
+    name = re.sub(r"[^A-Za-z0-9._-]", "_", "_".join(filter(None, (symbol, interval, namespace))))
+    return os.path.join(OHLCV_STORE_DIR, name + ".parquet")
+
+
+def read_bars(symbol, interval, namespace=None):
+    """Stored bars and metadata for (symbol, interval), or (None, {})"""
+    import pyarrow.parquet as pq
+
+    path = _path(symbol, interval, namespace)
+    if not os.path.exists(path):
+        return None, {}
+    try:
+        table = pq.read_table(path)
+        meta = json.loads((table.schema.metadata or {}).get(_META_KEY, b"{}"))
+        return table.to_pandas(), meta
+    except (OSError, ValueError):
+        return None, {}
+
+
+def write_bars(symbol, interval, frame, meta, namespace=None):
+    """Atomically replace the stored bars and metadata for (symbol, interval)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = _path(symbol, interval, namespace)
+    os.makedirs(OHLCV_STORE_DIR, exist_ok=True)
+    table = pa.Table.from_pandas(frame)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _META_KEY: json.dumps(meta).encode()})
+    # A unique temp file per writer, so concurrent processes never write into each other's
+    fd, tmp_path = tempfile.mkstemp(dir=OHLCV_STORE_DIR, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pq.write_table(table, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def merge_bars(stored, fresh):
+    """Union of two bar frames; fresh bars win where timestamps overlap"""
+    if stored is None or stored.empty:
+        return fresh
+    if fresh is None or fresh.empty:
+        return stored
+    merged = pd.concat([stored, fresh])
+    merged = merged[~merged.index.duplicated(keep="last")]
+    return merged.sort_index()
+
+
+def period_start(period, now):
+    """Earliest timestamp a yfinance `period` asks for (None for "max")"""
+    if period == "max":
+        return None
+    if period == "ytd":
+        return now.normalize().replace(month=1, day=1)
+    match = re.fullmatch(r"(\d+)(d|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        # "Nd" means N sessions; leave room for weekends and holidays
+        return now.normalize() - timedelta(days=count * 7 // 5 + 4)
+    if unit == "mo":
+        return now.normalize() - pd.DateOffset(months=count)
+    return now.normalize() - pd.DateOffset(years=count)
+
+
+def slice_period(frame, period, now):
+    """Rows of `frame` that a direct yfinance request for `period` would return"""
+    if frame.empty or period == "max":
+        return frame
+    if _sessions(period):
+        sessions = frame.index.normalize().unique()
+        return frame[frame.index.normalize() >= sessions[-min(_sessions(period), len(sessions))]]
+    return frame[frame.index >= period_start(period, now)]
+
+
+def _sessions(period):
+    match = re.fullmatch(r"(\d+)d", period)
+    return int(match.group(1)) if match else None
+
+
+def _covers(stored, meta, period, start):
+    """Whether the stored bars are complete for everything `period` asks for"""
+    covered_from = meta.get("covered_from")
+    if covered_from is None:
+        return False
+    if covered_from == "max":
+        return True
+    if _sessions(period):
+        # Stored bars are contiguous from covered_from, so enough sessions means full coverage
+        return len(stored.index.normalize().unique()) >= _sessions(period)
+    return start is not None and pd.Timestamp(covered_from) <= start
+
+
+def _now(stored):
+    return pd.Timestamp.now(tz=stored.index.tz if stored is not None and not stored.empty else "Asia/Kolkata")
+
+
+def _can_top_up(stored, meta, period, interval, now):
+    """Whether only the tail after the stored bars needs fetching"""
+    lookback = _INTRADAY_LOOKBACK.get(interval)
+    return (
+        stored is not None and len(stored) >= 2 and _covers(stored, meta, period, period_start(period, now))
+        and (lookback is None or stored.index[-1] >= now - timedelta(days=lookback))
+    )
+
+
+def _same_adjustment(stored, tail):
+    """Whether `tail` agrees with the stored bars at their last completed bar"""
+    anchor = stored.index[-2]
+    if anchor not in tail.index:
+        return False
+    old, new = stored.at[anchor, "Close"], tail.at[anchor, "Close"]
+    return bool(old) and abs(new / old - 1) <= ADJUSTMENT_TOLERANCE
+
+
+def _covered_from(fresh, period, now):
+    if period == "max":
+        return "max"
+    if _sessions(period):
+        return fresh.index[0].isoformat()
+    # Yahoo returned every bar since the requested start, even if the first one is later
+    return period_start(period, now).isoformat()
+
+
+def get_history(symbol, period, interval, fetch):
+    """History for `period`, read from the store and topped up with only the missing tail.
+
+    `fetch` is called like yfinance's Ticker.history (period=/start= plus interval=).
+    """
+    if not OHLCV_STORE:
+        return fetch(period=period, interval=interval)
+    with _lock:
+        stored, meta = read_bars(symbol, interval)
+    now = _now(stored)
+
+    if _can_top_up(stored, meta, period, interval, now):
+        # Re-fetch from the last completed bar: it refreshes the (possibly partial) latest bar
+        # and tells us whether Yahoo has re-adjusted older prices since we stored them
+        tail = fetch(start=stored.index[-2], interval=interval)
+        if tail is not None and not tail.empty and _same_adjustment(stored, tail):
+            merged = merge_bars(stored, tail)
+            with _lock:
+                write_bars(symbol, interval, merged, meta)
+            return slice_period(merged, period, now)
+        elif tail is not None and tail.empty:
+            return slice_period(stored, period, now)
+
+    # Nothing usable stored, not far enough back, or re-adjusted: replace it with a full fetch
+    fresh = fetch(period=period, interval=interval)
+    if fresh is None or fresh.empty:
+        return fresh
+    with _lock:
+        write_bars(symbol, interval, fresh, {"covered_from": _covered_from(fresh, period, now)})
+    return slice_period(fresh, period, now)
+
+
+def get_histories(symbols, period, interval, fetch, namespace="batch"):
+    """get_history() for many symbols, with one batched `fetch` for all tails and one for all full histories.
+
+    `fetch(symbols, period=/start=, interval=)` returns {symbol: frame}. Files live
+    under `namespace`, apart from get_history's, because batched downloads have
+    other columns than Ticker.history. Symbols with no data are left out.
+    """
+    if not OHLCV_STORE:
+        return fetch(list(symbols), period=period, interval=interval)
+    frames, tails, full = {}, {}, []
+    for symbol in symbols:
+        with _lock:
+            stored, meta = read_bars(symbol, interval, namespace)
+        if _can_top_up(stored, meta, period, interval, _now(stored)):
+            tails[symbol] = (stored, meta)
+        else:
+            full.append(symbol)
+
+    if tails:
+        # One call from the earliest anchor covers every symbol's tail
+        fetched = fetch(list(tails), start=min(stored.index[-2] for stored, _ in tails.values()), interval=interval)
+        for symbol, (stored, meta) in tails.items():
+            tail = fetched.get(symbol)
+            if tail is None or tail.empty:
+                frames[symbol] = slice_period(stored, period, _now(stored))
+            elif _same_adjustment(stored, tail):
+                merged = merge_bars(stored, tail)
+                with _lock:
+                    write_bars(symbol, interval, merged, meta, namespace)
+                frames[symbol] = slice_period(merged, period, _now(merged))
+            else:
+                full.append(symbol)
+
+    if full:
+        fetched = fetch(full, period=period, interval=interval)
+        for symbol in full:
+            fresh = fetched.get(symbol)
+            if fresh is None or fresh.empty:
+                continue
+            now = _now(fresh)
+            with _lock:
+                write_bars(symbol, interval, fresh, {"covered_from": _covered_from(fresh, period, now)}, namespace)
+            frames[symbol] = slice_period(fresh, period, now)
+    return frames
@@ -0,0 +1,274 @@
+"""Local fake upstream servers for development, testing and benchmarks.
+
+Run a fake Groq server that streams chunked chat completions:
+
+    python stubs.py --port 8765
+    GROQ_BASE_URL=http://127.0.0.1:8765 streamlit run app.py
+
+or a fake Serper server (search and news results, optionally replayed from
+recorded fixtures):
+
+    python stubs.py --serper --port 8766
+    SERPER_BASE_URL=http://127.0.0.1:8766 streamlit run app.py
+
+SimulatedTickFeed stands in for Yahoo's intraday bars in live mode
+(LIVE_FEED=simulated).
+"""
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_REPLY = (
+    "**Executive Summary** - This is a canned analysis from the local fake Groq server. "
+    "It is streamed in small chunks so incremental rendering can be exercised without network access."
+)
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeGroqHandler(_JSONHandler):
+    """OpenAI-compatible /openai/v1/chat/completions endpoint backed by a canned reply"""
+
+    reply = DEFAULT_REPLY
+    chunk_size = 8
+    first_token_delay = 0.0
+    chunk_delay = 0.01
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        request = self._read_json()
+        model = request.get("model", "fake-model")
+        created = int(time.time())
+        if not request.get("stream"):
+            time.sleep(self.first_token_delay)
+            self._send_json(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self.reply},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        time.sleep(self.first_token_delay)
+        pieces = [self.reply[i:i + self.chunk_size] for i in range(0, len(self.reply), self.chunk_size)]
+        for i, piece in enumerate(pieces):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": piece} if i == 0 else {"content": piece},
+                    "finish_reason": None,
+                }],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(self.chunk_delay)
+        final = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+        self.wfile.flush()
+
+
+class FakeSerperHandler(_JSONHandler):
+    """Serper /search and /news endpoints: recorded responses when available, generated ones otherwise"""
+
+    # {"<endpoint>:<query>": response body}, e.g. loaded from a recorded fixtures file
+    fixtures = {}
+    latency = 0.0
+
+    def do_POST(self):
+        endpoint = self.path.rstrip("/").rsplit("/", 1)[-1]
+        if endpoint not in ("search", "news"):
+            self._send_json(404, {"message": "not found"})
+            return
+        request = self._read_json()
+        query, num = request.get("q", ""), int(request.get("num", 10))
+        time.sleep(self.latency)
+        body = self.fixtures.get(f"{endpoint}:{query}")
+        self._send_json(200, body if body is not None else fake_serper_response(endpoint, query, num))
+
+
+FAKE_HEADLINES = [
+    "{name} Q2 results: net profit rises 8% to ₹4,210 crore, beats estimates",
+    "{name} shares hit 52-week high after brokerage raises target price",
+    "{name} wins ₹2,500 crore order from state utility",
+    "{name} board approves 1:1 bonus issue and interim dividend",
+    "Foreign investors trim stake in {name} during September quarter",
+    "{name} management guides for double-digit revenue growth in FY26",
+    "{name} stock slips 3% as margins disappoint analysts",
+    "Brokerages split on {name} after management commentary",
+    "{name} to raise ₹1,000 crore via non-convertible debentures",
+    "SEBI clears {name} subsidiary IPO; listing expected next quarter",
+    "{name} expands capacity with new plant in Gujarat",
+    "Nifty ends higher led by banks; {name} among top gainers",
+]
+
+
+def fake_serper_response(endpoint, query, num=10):
+    """Deterministic Serper-shaped results for `query`.
+
+    Headlines come from a fixed pool, so overlapping queries return some of the
+    same stories (often under another outlet's link), as the real API does.
+    """
+    name = query.split()[0] if query else "Company"
+    offset = zlib.crc32(query.encode()) % len(FAKE_HEADLINES)
+    news = []
+    for i in range(num):
+        story = (offset + i) % len(FAKE_HEADLINES)
+        outlet = ("Economic Times", "Mint", "Business Standard", "Moneycontrol")[(offset + i) % 4]
+        news.append({
+            "title": f"{FAKE_HEADLINES[story].format(name=name)} - {outlet}",
+            "link": f"https://{outlet.lower().replace(' ', '')}.example.com/{name.lower()}-{story}",
+            "snippet": f"{FAKE_HEADLINES[story].format(name=name)}. Analysts at domestic brokerages "
+                       f"discussed the impact on earnings, valuation and the stock's near-term outlook.",
+            "date": f"{i * 5 + 1} hours ago",
+            "source": outlet,
+        })
+    if endpoint == "news":
+        return {"searchParameters": {"q": query, "type": "news"}, "news": news}
+    organic = [{
+        "title": f"{name} share price, results and analysis | result {i + 1}",
+        "link": f"https://www.example.com/{name.lower()}/{(offset + i) % 15}",
+        "snippet": f"{query}: price, results, targets and analyst views (result {i + 1}).",
+        "position": i + 1,
+    } for i in range(num)]
+    return {"searchParameters": {"q": query, "type": "search"}, "organic": organic, "news": news[:3]}
+
+
+class SimulatedTickFeed:
+    """Intraday OHLCV bars aggregated from a simulated tick stream, called like live.yahoo_bars.
+
+    Every symbol follows its own random walk, generated a day of ticks at a time
+    from a seed, so the same minute always has the same ticks. The current bar
+    only holds the ticks up to the simulated now, so it changes between polls as
+    a real forming bar does. `speed` runs the clock faster than real time (60
+    makes every second a minute).
+    """
+
+    def __init__(self, speed=1.0, ticks_per_minute=12, volatility=0.001, history_days=5, seed=0, tz="Asia/Kolkata"):
+        self.speed = speed
+        self.ticks_per_minute = ticks_per_minute
+        self.volatility = volatility
+        self.seed = seed
+        self.origin = pd.Timestamp.now(tz=tz).floor("min")
+        self.anchor = self.origin - pd.Timedelta(days=history_days)
+        self._started = time.monotonic()
+        # Per symbol, one (tick offsets, prices, volumes, minute OHLCV) tuple per day since the anchor
+        self._days = {}
+        self._lock = threading.Lock()
+
+    def now(self):
+        return self.origin + pd.Timedelta(seconds=(time.monotonic() - self._started) * self.speed)
+
+    def _day(self, symbol, number, open_price):
+        rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode()), number])
+        shape = (1440, self.ticks_per_minute)
+        offsets = np.sort(rng.uniform(0, 60, shape), axis=1)
+        steps = rng.normal(0, self.volatility / np.sqrt(self.ticks_per_minute), shape)
+        prices = open_price * np.exp(np.cumsum(steps.ravel())).reshape(shape)
+        volumes = rng.integers(1, 50, shape) * 100.0
+        ohlcv = np.column_stack((prices[:, 0], prices.max(axis=1), prices.min(axis=1), prices[:, -1], volumes.sum(axis=1)))
+        return offsets, prices, volumes, ohlcv
+
+    def __call__(self, symbol, interval="1m", start=None, period=None):
+        """Bars from `start` (or the last `period`, e.g. "1d") up to the simulated now"""
+        now = self.now()
+        elapsed = (now - self.anchor).total_seconds()
+        complete = int(elapsed // 60)
+        with self._lock:
+            days = self._days.setdefault(symbol, [])
+            while len(days) * 1440 <= complete:
+                open_price = days[-1][1][-1, -1] if days else 100.0 + zlib.crc32(symbol.encode()) % 2900
+                days.append(self._day(symbol, len(days), open_price))
+        rows = np.concatenate([day[3] for day in days])[:complete]
+        # The forming minute holds only the ticks seen so far
+        offsets, prices, volumes, _ = days[complete // 1440]
+        minute = complete % 1440
+        seen = offsets[minute] <= elapsed - complete * 60
+        if seen.any():
+            ticks = prices[minute][seen]
+            partial = (ticks[0], ticks.max(), ticks.min(), ticks[-1], volumes[minute][seen].sum())
+            rows = np.vstack((rows, partial))
+        index = self.anchor + pd.to_timedelta(np.arange(len(rows)), unit="min")
+        frame = pd.DataFrame(rows, index=index, columns=["Open", "High", "Low", "Close", "Volume"])
+        if interval != "1m":
+            frame = frame.resample(interval.replace("m", "min")).agg(
+                {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+            ).dropna()
+        if start is not None:
+            return frame[frame.index >= start]
+        if period:
+            return frame[frame.index >= now - pd.Timedelta(days=int(period.rstrip("d")))]
+        return frame
+
+
+def start_server(handler=FakeGroqHandler, host="127.0.0.1", port=0):
+    """Start `handler` on a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local fake Groq (default) or Serper server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serper", action="store_true", help="serve Serper /search and /news instead of Groq")
+    parser.add_argument("--fixtures", help="JSON file of recorded Serper responses to replay")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each Serper response")
+    parser.add_argument("--chunk-delay", type=float, default=FakeGroqHandler.chunk_delay)
+    args = parser.parse_args()
+    if args.serper:
+        handler, name = FakeSerperHandler, "Serper"
+        FakeSerperHandler.latency = args.latency
+        if args.fixtures:
+            with open(args.fixtures) as f:
+                FakeSerperHandler.fixtures = json.load(f)
+    else:
+        handler, name = FakeGroqHandler, "Groq"
+        FakeGroqHandler.chunk_delay = args.chunk_delay
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"Fake {name} server on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,267 @@
+"""Company name to NSE/BSE symbol resolution.
+
+Names are resolved against the hand-curated INDIAN_STOCKS aliases plus a master
+list of listings loaded from CSV (data/nse_symbols.csv by default, or any NSE
+EQUITY_L.csv / BSE scrip list via SYMBOLS_CSV). A prebuilt exact/prefix/token/
+trigram index gives ranked fuzzy matches without scanning every name.
+"""
+import bisect
+import csv
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+SYMBOLS_CSV = os.getenv(
+    "SYMBOLS_CSV", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "nse_symbols.csv")
+)
+MIN_MATCH_SCORE = float(os.getenv("SYMBOL_MIN_MATCH_SCORE", "0.6"))
+# A curated alias starting with, or containing every word of, the query scores the same
+# whatever its length, so a popular company isn't outranked by a shorter listing name
+CURATED_PREFIX_SCORE = 0.9
+CURATED_TOKEN_SCORE = 0.85
+
+# Indian Stock Name to Symbol Mapping
+INDIAN_STOCKS = {
+    # Major Indian Companies
+    "reliance": "RELIANCE.NS", "reliance industries": "RELIANCE.NS", "ril": "RELIANCE.NS",
+    "tcs": "TCS.NS", "tata consultancy": "TCS.NS", "tata consultancy services": "TCS.NS",
+    "hdfc bank": "HDFCBANK.NS", "hdfc": "HDFCBANK.NS",
+    "infosys": "INFY.NS",
+    "icici bank": "ICICIBANK.NS", "icici": "ICICIBANK.NS",
+    "hul": "HINDUNILVR.NS", "hindustan unilever": "HINDUNILVR.NS",
+    "sbi": "SBIN.NS", "state bank of india": "SBIN.NS",
+    "bharti airtel": "BHARTIARTL.NS", "airtel": "BHARTIARTL.NS",
+    "bajaj finance": "BAJFINANCE.NS", "bajaj": "BAJFINANCE.NS",
+    "lt": "LT.NS", "larsen toubro": "LT.NS", "larsen": "LT.NS",
+    "itc": "ITC.NS",
+    "axis bank": "AXISBANK.NS", "axis": "AXISBANK.NS",
+    "asian paints": "ASIANPAINT.NS",
+    "maruti": "MARUTI.NS", "maruti suzuki": "MARUTI.NS",
+    "wipro": "WIPRO.NS",
+    "ultra tech": "ULTRACEMCO.NS", "ultratech cement": "ULTRACEMCO.NS",
+    "nestle": "NESTLEIND.NS", "nestle india": "NESTLEIND.NS",
+    "titan": "TITAN.NS",
+    "sun pharma": "SUNPHARMA.NS", "sun pharmaceutical": "SUNPHARMA.NS",
+    "hindalco": "HINDALCO.NS",
+    "jsw steel": "JSWSTEEL.NS",
+    "tata steel": "TATASTEEL.NS",
+    "adani ports": "ADANIPORTS.NS", "adani": "ADANIPORTS.NS",
+    "power grid": "POWERGRID.NS",
+    "ntpc": "NTPC.NS",
+    "coal india": "COALINDIA.NS",
+    "ongc": "ONGC.NS", "oil and natural gas": "ONGC.NS",
+    "indian oil": "IOC.NS", "ioc": "IOC.NS",
+    "gail": "GAIL.NS",
+    "vedanta": "VEDL.NS",
+    "jindal steel": "JINDALSTEL.NS",
+    "tata motors": "TATAMOTORS.NS",
+    "mahindra": "M&M.NS", "mahindra and mahindra": "M&M.NS",
+    "eicher motors": "EICHERMOT.NS", "royal enfield": "EICHERMOT.NS",
+    "hero motocorp": "HEROMOTOCO.NS", "hero": "HEROMOTOCO.NS",
+    "bajaj auto": "BAJAJ-AUTO.NS",
+    "dr reddy": "DRREDDY.NS", "dr reddys": "DRREDDY.NS",
+    "cipla": "CIPLA.NS",
+    "lupin": "LUPIN.NS",
+    "divis labs": "DIVISLAB.NS",
+    "zomato": "ZOMATO.NS",
+    "paytm": "PAYTM.NS",
+    "nykaa": "NYKAA.NS",
+    "policybazaar": "PBFintech.NS",
+    "delhivery": "DELHIVERY.NS",
+}
+
+# Corporate suffixes that never help tell two listings apart
+_NOISE_WORDS = {"ltd", "limited", "the", "inc", "corp", "pvt", "private", "co"}
+_STOP_WORDS = {"of", "and", "the"}
+
+
+def normalize_text(text):
+    """Lowercase, drop punctuation and corporate suffixes"""
+    text = text.lower().replace("&", " and ")
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return " ".join(word for word in text.split() if word not in _NOISE_WORDS)
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _initials(name):
+    words = [word for word in name.split() if word not in _STOP_WORDS]
+    return "".join(word[0] for word in words) if len(words) >= 2 else ""
+
+
+def load_listings(path=SYMBOLS_CSV):
+    """Read (symbol, company name) pairs from an NSE, BSE or simple symbol,name CSV"""
+    listings = []
+    if not path or not os.path.exists(path):
+        return listings
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+        if "symbol" in fields and "name of company" in fields:
+            # NSE EQUITY_L.csv
+            symbol_col, name_col, suffix = fields["symbol"], fields["name of company"], ".NS"
+        elif "security id" in fields and "security name" in fields:
+            # BSE scrip master
+            symbol_col, name_col, suffix = fields["security id"], fields["security name"], ".BO"
+        elif "symbol" in fields and "company name" in fields:
+            # NSE index constituents (ind_nifty500list.csv etc.)
+            symbol_col, name_col, suffix = fields["symbol"], fields["company name"], ".NS"
+        elif "symbol" in fields and "name" in fields:
+            symbol_col, name_col, suffix = fields["symbol"], fields["name"], ".NS"
+        else:
+            return listings
+        for row in reader:
+            symbol = (row.get(symbol_col) or "").strip().upper()
+            name = (row.get(name_col) or "").strip()
+            if not symbol or not name:
+                continue
+            if not symbol.endswith((".NS", ".BO")):
+                symbol += suffix
+            listings.append((symbol, name))
+    return listings
+
+
+class SymbolResolver:
+    """Ranked fuzzy lookup of company names, abbreviations and tickers"""
+
+    def __init__(self, listings=(), aliases=None):
+        self._alias_symbol = {}
+        self.names = {}
+        for symbol, name in listings:
+            self.names.setdefault(symbol, name)
+        # Curated aliases win over anything derived from the listings
+        self._curated = set()
+        # Curated symbols in table order (largest companies first) break ties between equal scores
+        self._rank = {}
+        for alias, symbol in (aliases or {}).items():
+            alias = normalize_text(alias)
+            self._add(alias, symbol)
+            if self._alias_symbol.get(alias) == symbol:
+                self._curated.add(alias)
+            self._rank.setdefault(symbol, len(self._rank))
+        # NSE listings are added before BSE ones so a shared name resolves to NSE
+        for symbol, name in sorted(listings, key=lambda item: item[0].endswith(".BO")):
+            self._add(normalize_text(name), symbol)
+            self._add(normalize_text(symbol.rsplit(".", 1)[0]), symbol)
+        self._add_initials(listings)
+        self._build_index()
+
+    def _add(self, alias, symbol):
+        if alias and alias not in self._alias_symbol:
+            self._alias_symbol[alias] = symbol
+
+    def _add_initials(self, listings):
+        # Only unambiguous initials ("tcs", "sbi") become aliases
+        candidates = defaultdict(set)
+        for symbol, name in listings:
+            initials = _initials(normalize_text(name))
+            if len(initials) >= 2:
+                candidates[initials].add(symbol)
+        for initials, symbols in candidates.items():
+            if len(symbols) == 1:
+                self._add(initials, next(iter(symbols)))
+
+    def _build_index(self):
+        self._aliases = sorted(self._alias_symbol)
+        self._tokens = defaultdict(set)
+        self._grams = defaultdict(list)
+        self._gram_counts = []
+        for i, alias in enumerate(self._aliases):
+            for token in alias.split():
+                self._tokens[token].add(i)
+            grams = _trigrams(alias)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._grams[gram].append(i)
+
+    def __len__(self):
+        return len(self._alias_symbol)
+
+    def search(self, query, limit=5):
+        """Return up to `limit` (symbol, name, score) matches, best first; scores are in [0, 1]"""
+        q = normalize_text(query or "")
+        if not q:
+            return []
+        scores = {}
+
+        def offer(i, score):
+            if score > scores.get(i, 0.0):
+                scores[i] = score
+
+        exact = self._alias_symbol.get(q)
+        if exact is not None:
+            offer(bisect.bisect_left(self._aliases, q), 1.0)
+
+        # Query contains a whole alias ("hdfc bank share price")
+        words = q.split()
+        for size in range(min(len(words), 5), 0, -1):
+            for start in range(len(words) - size + 1):
+                phrase = " ".join(words[start:start + size])
+                if phrase != q and phrase in self._alias_symbol:
+                    offer(bisect.bisect_left(self._aliases, phrase), 0.6 + 0.3 * size / len(words))
+
+        # Alias starts with the query ("tata cons")
+        start = bisect.bisect_left(self._aliases, q)
+        for i in range(start, min(start + 20, len(self._aliases))):
+            alias = self._aliases[i]
+            if not alias.startswith(q):
+                break
+            offer(i, CURATED_PREFIX_SCORE if alias in self._curated else 0.8 + 0.15 * len(q) / len(alias))
+
+        # Every query word appears in the alias ("consultancy")
+        postings = [self._tokens.get(word) for word in words]
+        if all(postings):
+            for i in set.intersection(*postings):
+                alias = self._aliases[i]
+                offer(i, CURATED_TOKEN_SCORE if alias in self._curated else 0.7 + 0.2 * len(q) / len(alias))
+
+        # Typo tolerance: trigram overlap picks candidates, edit similarity ranks them ("relaince")
+        grams = _trigrams(q)
+        shared = Counter()
+        for gram in grams:
+            for i in self._grams.get(gram, ()):
+                shared[i] += 1
+        for i, count in shared.most_common(30):
+            dice = 2.0 * count / (len(grams) + self._gram_counts[i])
+            if dice >= 0.3:
+                ratio = SequenceMatcher(None, q, self._aliases[i]).ratio()
+                offer(i, 0.9 * max(dice, ratio))
+
+        best = {}
+        for i, score in scores.items():
+            symbol = self._alias_symbol[self._aliases[i]]
+            if score > best.get(symbol, 0.0):
+                best[symbol] = score
+        unranked = len(self._rank)
+        ranked = sorted(best.items(), key=lambda item: (-item[1], self._rank.get(item[0], unranked), item[0]))[:limit]
+        return [(symbol, self.names.get(symbol, symbol), round(score, 3)) for symbol, score in ranked]
+
+    def resolve(self, query, min_score=MIN_MATCH_SCORE):
+        """Best matching symbol for `query`, or None if nothing scores at least `min_score`"""
+        matches = self.search(query, limit=1)
+        if matches and matches[0][2] >= min_score:
+            return matches[0][0]
+        return None
+
+
+_resolver = None
+_lock = threading.Lock()
+
+
+def get_resolver():
+    """Process-wide resolver, built on first use"""
+    global _resolver
+    with _lock:
+        if _resolver is None:
+            _resolver = SymbolResolver(load_listings(), INDIAN_STOCKS)
+        return _resolver
+
+
+def resolve_symbol(name, min_score=MIN_MATCH_SCORE):
+    """Resolve a company name, abbreviation or ticker to a symbol, or None"""
+    return get_resolver().resolve(name, min_score)
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# The modules create their on-disk caches at import time; keep them out of the working tree
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="stock-tests-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,25 @@
+import gc
+import os
+
+import pytest
+
+from cache import PersistentCache
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_persistent_cache_closes_its_connections(tmp_path):
+    cache = PersistentCache("fds", ttl=60, path=str(tmp_path / "cache.db"))
+    gc.disable()
+    try:
+        before = len(os.listdir("/proc/self/fd"))
+        for i in range(50):
+            cache.set(f"k{i}", i)
+            cache.get(f"k{i}")
+            cache.set_many({f"m{i}": i})
+            cache.get_many([f"m{i}"])
+            cache.update("total", lambda total: total + 1, default=0)
+        assert len(cache) == 101
+        assert len(os.listdir("/proc/self/fd")) - before < 5
+    finally:
+        gc.enable()
+    assert cache.get("total") == 50
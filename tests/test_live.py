@@ -0,0 +1,69 @@
+import threading
+
+import numpy as np
+
+from indicators import compute_indicators
+from live import LiveSeries
+from stubs import SimulatedTickFeed
+
+
+def advance(feed, minutes):
+    # Move the simulated clock forward without sleeping
+    feed._started -= minutes * 60 / feed.speed
+
+
+def assert_matches_batch(bars, indicators, reference):
+    # The last bar is still forming, so only completed bars are compared
+    live, batch = indicators.iloc[:-1], reference[indicators.columns].iloc[:-1]
+    assert (live.isna() == batch.isna()).all().all()
+    assert np.nanmax(np.abs(live.to_numpy() - batch.to_numpy())) < 1e-8
+
+
+def test_incremental_indicators_match_batch_over_simulated_polls():
+    feed = SimulatedTickFeed(seed=1)
+    series = LiveSeries("SIM.NS", "1m", capacity=5000)
+    series.poll(feed, force=True)
+    seeded = len(series.buffer)
+    for _ in range(5):
+        advance(feed, 1.5)
+        series.poll(feed, force=True)
+    bars, indicators, version = series.snapshot()
+    assert len(bars) > seeded and version > 1
+    assert_matches_batch(bars, indicators, compute_indicators(bars))
+    # Completed bars are the feed's own bars, not a drifted copy
+    full = feed("SIM.NS", "1m", period="1d")
+    assert np.allclose(bars.to_numpy()[-30:-1], full.loc[bars.index[-30:-1]].to_numpy())
+
+
+def test_ring_buffer_keeps_indicators_of_the_full_history():
+    feed = SimulatedTickFeed(seed=2)
+    series = LiveSeries("SIM.NS", "5m", capacity=100)
+    series.ingest(feed("SIM.NS", "5m", period="5d"))
+    bars, indicators = series.frame()
+    reference = compute_indicators(feed("SIM.NS", "5m", period="5d")).iloc[-100:]
+    assert len(bars) == 100
+    assert_matches_batch(bars, indicators, reference)
+
+
+def test_snapshots_stay_consistent_during_concurrent_polls():
+    feed = SimulatedTickFeed(seed=3)
+    series = LiveSeries("SIM.NS", "1m", capacity=200)
+    series.poll(feed, force=True)
+    stop, errors = threading.Event(), []
+
+    def poller():
+        while not stop.is_set():
+            advance(feed, 0.2)
+            series.poll(feed, force=True)
+
+    thread = threading.Thread(target=poller)
+    thread.start()
+    try:
+        for _ in range(200):
+            bars, indicators, _ = series.snapshot()
+            if not bars.index.is_monotonic_increasing or bars["Close"].isna().any() or len(bars) != len(indicators):
+                errors.append(bars.index[-3:])
+    finally:
+        stop.set()
+        thread.join()
+    assert not errors
@@ -0,0 +1,47 @@
+import threading
+import time
+
+import llm
+
+
+def test_a_follower_timing_out_leaves_the_leader_to_the_others(monkeypatch):
+    release = threading.Event()
+    requests = []
+
+    def fake_stream(system_prompt, prompt, model, temperature, max_tokens):
+        requests.append(threading.current_thread().name)
+        if len(requests) == 1:
+            # The leader stalls before its first chunk until released
+            release.wait(5)
+            yield "leader "
+            yield "text"
+        else:
+            yield "own text"
+
+    monkeypatch.setattr(llm, "_stream_chunks", fake_stream)
+    results = {}
+
+    def consume(name):
+        results[name] = "".join(llm.chat_completion("system", "stalled prompt", 10, stream=True))
+
+    leader = threading.Thread(target=consume, args=("leader",), name="leader")
+    leader.start()
+    time.sleep(0.1)
+    monkeypatch.setattr(llm, "INFLIGHT_WAIT", 0.2)
+    impatient = threading.Thread(target=consume, args=("impatient",), name="impatient")
+    impatient.start()
+    time.sleep(0.05)
+    monkeypatch.setattr(llm, "INFLIGHT_WAIT", 5)
+    patient = threading.Thread(target=consume, args=("patient",), name="patient")
+    patient.start()
+
+    impatient.join(2)
+    assert results["impatient"] == "own text"
+    release.set()
+    for thread in (leader, patient):
+        thread.join(5)
+
+    # Only the follower that timed out made its own request; the other still shared the leader's
+    assert sorted(requests) == ["impatient", "leader"]
+    assert results["leader"] == results["patient"] == "leader text"
+    assert llm.response_cache.get(llm.prompt_key(llm.GROQ_MODEL, "system", "stalled prompt")) == "leader text"
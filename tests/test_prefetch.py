@@ -0,0 +1,24 @@
+import pandas as pd
+
+import prefetch
+from ratelimit import serper_provider
+
+
+def test_symbols_past_the_serper_budget_count_as_budget_skipped(monkeypatch):
+    frame = pd.DataFrame({"Close": [100.0, 101.0]})
+    monkeypatch.setattr(prefetch, "get_stock_data", lambda symbol, period, interval: (frame, {"longName": symbol}))
+    monkeypatch.setattr(prefetch, "get_universe_snapshot", lambda symbols: None)
+    monkeypatch.setattr(serper_provider, "calls", 0)
+
+    def news(symbol, company_name):
+        serper_provider.calls += prefetch.SERPER_QUERIES_PER_STOCK
+        return {}
+
+    monkeypatch.setattr(prefetch, "get_comprehensive_stock_info", news)
+    prefetcher = prefetch.Prefetcher(["AAA.NS", "BBB.NS", "CCC.NS"], news=True, spacing=0,
+                                     serper_budget=prefetch.SERPER_QUERIES_PER_STOCK)
+    prefetcher.run_pass()
+
+    stats = prefetcher.stats()
+    assert (stats["warmed"], stats["budget_skipped"], stats["skipped"]) == (1, 2, 0)
+    assert stats["serper_used_today"] == prefetch.SERPER_QUERIES_PER_STOCK
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from screener import FEATURES, filter_mask
+
+
+@pytest.fixture
+def features():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.uniform(10, 100, (6, len(FEATURES))), columns=list(FEATURES),
+                         index=[f"S{i}.NS" for i in range(6)])
+    frame.loc["S5.NS", "sma200"] = np.nan
+    return frame
+
+
+def test_filter_mask_matches_manual_conditions(features):
+    mask = filter_mask(features, "close > sma50 and not rsi14 >= 70 or vol_ratio > 1.5 * sma20 / 10")
+    expected = ((features.close > features.sma50) & ~(features.rsi14 >= 70)) | \
+               (features.vol_ratio > 1.5 * features.sma20 / 10)
+    assert mask.tolist() == expected.tolist()
+
+
+def test_filter_mask_chained_comparison_and_nan(features):
+    assert filter_mask(features, "20 < close < 80").tolist() == ((features.close > 20) & (features.close < 80)).tolist()
+    assert not filter_mask(features, "sma200 > -1")[-1]
+
+
+@pytest.mark.parametrize("expression", [
+    'close.to_csv("/tmp/screener-pwned.csv") == 0',
+    "__import__('os').system('true') == 0",
+    "close.values > 0",
+    "close[0] > 1",
+    "@close > 1",
+    "open_interest > 1",
+    "close > 'x'",
+    "(lambda: 1)() == 1",
+    "close",
+    "close + (sma50 > 1) > 0",
+])
+def test_filter_mask_rejects_unsafe_or_invalid(features, expression):
+    with pytest.raises(ValueError):
+        filter_mask(features, expression)
+
+
+def test_filter_mask_does_not_execute_calls(features):
+    import os
+    path = "/tmp/screener-pwned.csv"
+    if os.path.exists(path):
+        os.remove(path)
+    with pytest.raises(ValueError):
+        filter_mask(features, f'close.to_csv("{path}") == 0')
+    assert not os.path.exists(path)
@@ -0,0 +1,41 @@
+import threading
+
+import pipeline
+import sentiment
+
+
+def test_concurrent_sessions_keep_every_article():
+    # Each session scores its own article for the same symbol at the same moment
+    sentiment.history_cache.clear()
+    barrier = threading.Barrier(8)
+
+    def session(i):
+        barrier.wait()
+        sentiment.news_sentiment("RACE.NS", {"news": [{
+            "title": f"Company {i} shares surge on record order win",
+            "link": f"https://example.com/article-{i}",
+            "date": f"{i + 1} hours ago",
+        }]})
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(sentiment.history_cache.get("RACE.NS")) == 8
+    assert sentiment.sentiment_series("RACE.NS")["articles"].sum() == 8
+
+
+def test_analysis_prompt_carries_the_score_instead_of_news_text(monkeypatch):
+    prompts = []
+    monkeypatch.setattr(pipeline, "chat_completion", lambda system, prompt, **kwargs: prompts.append(prompt))
+    serper_data = {"company_name": "TCS", "news": [
+        {"title": "TCS shares surge on record deal", "link": "https://example.com/deal",
+         "snippet": "The order book snippet text", "date": "2 hours ago"},
+    ], "search_results": []}
+    pipeline.get_ai_analysis("TCS.NS", None, {"currentPrice": 100, "previousClose": 98}, serper_data)
+
+    assert "Most positive: TCS shares surge on record deal" in prompts[0]
+    assert "RECENT NEWS" not in prompts[0]
+    assert "order book snippet" not in prompts[0]
@@ -0,0 +1,54 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import store
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "OHLCV_STORE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def bars(seed, rows=500):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01", periods=rows, freq="B", tz="Asia/Kolkata")
+    close = 100 + rng.standard_normal(rows).cumsum()
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": rng.integers(1000, 5000, rows)}, index=index)
+
+
+def test_bars_and_metadata_round_trip():
+    frame = bars(0)
+    store.write_bars("TCS.NS", "1d", frame, {"covered_from": "max"})
+    stored, meta = store.read_bars("TCS.NS", "1d")
+    pd.testing.assert_frame_equal(stored, frame, check_freq=False)
+    assert meta == {"covered_from": "max"}
+    assert store.read_bars("INFY.NS", "1d") == (None, {})
+
+
+def test_concurrent_writers_leave_one_whole_file(store_dir):
+    # Every writer stores its seed in both the bars and the metadata, so a mix of two writes shows up
+    errors = []
+
+    def writer(seed):
+        try:
+            for _ in range(10):
+                store.write_bars("TCS.NS", "1d", bars(seed), {"seed": seed})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    stored, meta = store.read_bars("TCS.NS", "1d")
+    pd.testing.assert_frame_equal(stored, bars(meta["seed"]), check_freq=False)
+    assert os.listdir(store_dir) == ["TCS.NS_1d.parquet"]
@@ -0,0 +1,30 @@
+import pytest
+
+from symbols import SymbolResolver, get_resolver, resolve_symbol
+
+
+@pytest.mark.parametrize("query, symbol", [
+    ("tata", "TCS.NS"),
+    ("tata cons", "TCS.NS"),
+    ("tata steel", "TATASTEEL.NS"),
+    ("tata power", "TATAPOWER.NS"),
+    ("hdfc", "HDFCBANK.NS"),
+    ("relaince", "RELIANCE.NS"),
+    ("infosys ltd", "INFY.NS"),
+])
+def test_resolves_common_names(query, symbol):
+    assert resolve_symbol(query) == symbol
+
+
+def test_equal_scores_follow_the_curated_table_order():
+    resolver = SymbolResolver(
+        [("AAA.NS", "Acme Alpha Widgets"), ("ZZZ.NS", "Acme Zeta")],
+        {"acme zeta": "ZZZ.NS", "acme alpha": "AAA.NS"},
+    )
+    assert [symbol for symbol, _, _ in resolver.search("acme")] == ["ZZZ.NS", "AAA.NS"]
+
+
+def test_curated_prefix_outranks_a_shorter_listing_name():
+    top = get_resolver().search("tata", limit=5)
+    assert top[0][0] == "TCS.NS"
+    assert "TATAELXSI.NS" not in [symbol for symbol, _, score in top if score >= top[0][2]]
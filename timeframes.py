@@ -0,0 +1,90 @@
+"""Chart timeframes resampled locally from one base fetch per family.
+
+Intraday timeframes (15m, 1h) are built from 5-minute bars and the daily,
+weekly and monthly ones from daily bars, because Yahoo only serves about 60
+days of 5-minute history. Each base is fetched once through the shared caches
+and the OHLCV store. Coarser bars are aggregated with vectorized reductions
+over runs of consecutive bars, so after the first view of a family, switching
+timeframes costs no network call.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import TTLCache
+from metrics import span
+from pipeline import get_stock_data
+
+INTRADAY_PERIOD = os.getenv("TIMEFRAME_INTRADAY_PERIOD", "1mo")
+DAILY_PERIOD = os.getenv("TIMEFRAME_DAILY_PERIOD", "2y")
+
+# NSE opens at 09:15 IST; intraday bins are aligned to the open like Yahoo's 60m bars
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=15)
+
+# Timeframe: (base interval, base period, bin); a bin of None shows the base bars as they are
+TIMEFRAMES = {
+    "15m": ("5m", INTRADAY_PERIOD, pd.Timedelta(minutes=15)),
+    "1h": ("5m", INTRADAY_PERIOD, pd.Timedelta(hours=1)),
+    "1D": ("1d", DAILY_PERIOD, None),
+    "1W": ("1d", DAILY_PERIOD, "W"),
+    "1M": ("1d", DAILY_PERIOD, "M"),
+}
+DEFAULT_TIMEFRAME = "1D"
+
+# Keyed by (symbol, timeframe, base bar count, last base bar, last close), like the indicator cache
+timeframe_cache = TTLCache(maxsize=256, ttl=3600, name="timeframes")
+
+
+def bin_starts(index, rule):
+    """Start of the `rule` bin each timestamp falls in (a Timedelta, "W" for Monday weeks or "M")"""
+    local = index.tz_localize(None) if index.tz is not None else index
+    if isinstance(rule, pd.Timedelta):
+        width = rule.value
+        offset = SESSION_OPEN.value % width
+        ns = local.as_unit("ns").asi8
+        starts = pd.DatetimeIndex(((ns - offset) // width * width + offset).astype("datetime64[ns]"))
+    elif rule == "W":
+        day = local.normalize()
+        starts = day - pd.to_timedelta(day.weekday, unit="D")
+    elif rule == "M":
+        starts = local.to_period("M").to_timestamp()
+    else:
+        raise ValueError(f"Unsupported resampling rule: {rule}")
+    return starts.tz_localize(index.tz) if index.tz is not None else starts
+
+
+def resample_ohlcv(data, rule):
+    """Aggregate sorted bars into `rule` bins: first open, highest high, lowest low, last close, total volume"""
+    if rule is None or data is None or data.empty:
+        return data
+    data = data.dropna(subset=["Open", "High", "Low", "Close"])
+    if data.empty:
+        return data
+    starts_index = bin_starts(data.index, rule)
+    keys = starts_index.asi8
+    # Bars are sorted, so each bin is a run of equal keys
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.append(starts[1:] - 1, len(keys) - 1)
+    return pd.DataFrame({
+        "Open": data["Open"].to_numpy()[starts],
+        "High": np.maximum.reduceat(data["High"].to_numpy(), starts),
+        "Low": np.minimum.reduceat(data["Low"].to_numpy(), starts),
+        "Close": data["Close"].to_numpy()[ends],
+        "Volume": np.add.reduceat(data["Volume"].fillna(0).to_numpy(), starts),
+    }, index=starts_index[starts].rename(data.index.name))
+
+
+def get_timeframe_data(symbol, timeframe=DEFAULT_TIMEFRAME):
+    """Bars for `timeframe`, resampled from the cached base fetch of its family"""
+    interval, period, rule = TIMEFRAMES[timeframe]
+    base, _ = get_stock_data(symbol, period=period, interval=interval)
+    if base is None or base.empty or rule is None:
+        return base
+    key = (symbol, timeframe, len(base), base.index[-1], float(base["Close"].iloc[-1]))
+    bars = timeframe_cache.get(key)
+    if bars is None:
+        with span("timeframe.resample", symbol=symbol, timeframe=timeframe, bars=len(base)):
+            bars = resample_ohlcv(base, rule)
+        timeframe_cache.set(key, bars)
+    return bars
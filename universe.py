@@ -0,0 +1,180 @@
+"""Stock universes and batched multi-symbol market data"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from cache import bars_cache, info_cache, history_ttl
+from ratelimit import yahoo_provider
+from store import get_histories
+from symbols import SYMBOLS_CSV, load_listings
+
+INFO_MAX_WORKERS = int(os.getenv("INFO_MAX_WORKERS", "8"))
+# Where NSE index constituent files (ind_nifty100list.csv, ...) are looked up
+UNIVERSE_DIR = os.getenv("UNIVERSE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+POPULAR_SYMBOLS = [
+    "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "INFY.NS", "ICICIBANK.NS",
+    "BHARTIARTL.NS", "SBIN.NS", "BAJFINANCE.NS", "LT.NS", "ITC.NS",
+]
+
+NIFTY_50 = [
+    "ADANIENT.NS", "ADANIPORTS.NS", "APOLLOHOSP.NS", "ASIANPAINT.NS", "AXISBANK.NS",
+    "BAJAJ-AUTO.NS", "BAJFINANCE.NS", "BAJAJFINSV.NS", "BEL.NS", "BPCL.NS",
+    "BHARTIARTL.NS", "BRITANNIA.NS", "CIPLA.NS", "COALINDIA.NS", "DRREDDY.NS",
+    "EICHERMOT.NS", "GRASIM.NS", "HCLTECH.NS", "HDFCBANK.NS", "HDFCLIFE.NS",
+    "HEROMOTOCO.NS", "HINDALCO.NS", "HINDUNILVR.NS", "ICICIBANK.NS", "ITC.NS",
+    "INDUSINDBK.NS", "INFY.NS", "JSWSTEEL.NS", "KOTAKBANK.NS", "LT.NS",
+    "M&M.NS", "MARUTI.NS", "NTPC.NS", "NESTLEIND.NS", "ONGC.NS",
+    "POWERGRID.NS", "RELIANCE.NS", "SBILIFE.NS", "SHRIRAMFIN.NS", "SBIN.NS",
+    "SUNPHARMA.NS", "TCS.NS", "TATACONSUM.NS", "TATAMOTORS.NS", "TATASTEEL.NS",
+    "TECHM.NS", "TITAN.NS", "TRENT.NS", "ULTRACEMCO.NS", "WIPRO.NS",
+]
+
+UNIVERSES = {
+    "popular": ("Popular 10", POPULAR_SYMBOLS),
+    "nifty50": ("NIFTY 50", NIFTY_50),
+}
+
+DEFAULT_UNIVERSE = os.getenv("BEST_STOCKS_UNIVERSE", "popular")
+
+# Larger universes for the screener, read from files when present: NSE's index
+# constituent lists (download from niftyindices.com into UNIVERSE_DIR) and the
+# listings master list used by symbol search
+INDEX_FILES = {
+    "nifty100": ("NIFTY 100", "ind_nifty100list.csv"),
+    "nifty200": ("NIFTY 200", "ind_nifty200list.csv"),
+    "nifty500": ("NIFTY 500", "ind_nifty500list.csv"),
+}
+
+
+def screener_universes():
+    """{name: (label, symbols)} of every universe available to the screener"""
+    universes = dict(UNIVERSES)
+    for name, (label, filename) in INDEX_FILES.items():
+        symbols = [symbol for symbol, _ in load_listings(os.path.join(UNIVERSE_DIR, filename))]
+        if symbols:
+            universes[name] = (label, symbols)
+    listed = [symbol for symbol, _ in load_listings(SYMBOLS_CSV) if symbol.endswith(".NS")]
+    if listed:
+        universes["listings"] = (f"All listed ({len(listed)})", listed)
+    return universes
+
+
+def get_universe(name=DEFAULT_UNIVERSE):
+    """Symbols for a named universe, or a comma-separated symbol list"""
+    if name in UNIVERSES:
+        return list(UNIVERSES[name][1])
+    if name in INDEX_FILES or name == "listings":
+        universes = screener_universes()
+        if name in universes:
+            return list(universes[name][1])
+    symbols = [symbol.strip().upper() for symbol in (name or "").split(",") if symbol.strip()]
+    return symbols or list(POPULAR_SYMBOLS)
+
+
+def _batch_download(symbols, interval, period=None, start=None):
+    # One yf.download call for every symbol, split into {symbol: frame}
+    import yfinance as yf
+
+    try:
+        data = yahoo_provider.call(lambda: yf.download(
+            symbols, period=period, start=start, interval=interval, group_by="ticker",
+            auto_adjust=True, threads=True, progress=False, timeout=20
+        ))
+    except Exception:
+        return {}
+    frames = {}
+    if data is not None and not data.empty:
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                frame = data[symbol]
+            else:
+                frame = data
+            frame = frame.dropna(how="all")
+            if not frame.empty:
+                frames[symbol] = frame
+    return frames
+
+
+def download_history(symbols, period="3mo", interval="1d"):
+    """OHLCV for many symbols as {symbol: frame}.
+
+    Cached per symbol, so a list that differs by a few symbols only downloads
+    those; they come from the OHLCV store plus one batched yf.download call.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    frames, missing = {}, []
+    for symbol in symbols:
+        frame = bars_cache.get((symbol, period, interval))
+        if frame is None:
+            missing.append(symbol)
+        else:
+            frames[symbol] = frame
+    if missing:
+        fetched = get_histories(missing, period, interval, _batch_download)
+        ttl = history_ttl()
+        for symbol, frame in fetched.items():
+            bars_cache.set((symbol, period, interval), frame, ttl=ttl)
+        frames.update(fetched)
+    return {symbol: frames[symbol] for symbol in symbols if symbol in frames}
+
+
+def _fetch_info(symbol):
+    info = info_cache.get(symbol)
+    if info is not None:
+        return info
+    import yfinance as yf
+
+    try:
+        info = yahoo_provider.call(lambda: yf.Ticker(symbol).info)
+    except Exception:
+        return {}
+    if info:
+        info_cache.set(symbol, info)
+    return info or {}
+
+
+def fetch_info(symbols, max_workers=INFO_MAX_WORKERS):
+    """Ticker .info for many symbols, fetched concurrently and through the info cache"""
+    symbols = list(dict.fromkeys(symbols))
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as executor:
+        return dict(zip(symbols, executor.map(_fetch_info, symbols)))
+
+
+def summarize(frames, infos=None):
+    """Compact per-symbol table of price action and key fundamentals"""
+    if not frames:
+        return pd.DataFrame()
+    infos = infos or {}
+    close = pd.DataFrame({symbol: frame["Close"] for symbol, frame in frames.items()}).ffill()
+    volume = pd.DataFrame({symbol: frame["Volume"] for symbol, frame in frames.items()}).fillna(0)
+    last = close.iloc[-1]
+
+    def pct_vs(rows_back):
+        base = close.iloc[-1 - rows_back] if len(close) > rows_back else close.iloc[0]
+        return (last / base - 1) * 100
+
+    summary = pd.DataFrame({
+        "Name": [infos.get(s, {}).get("shortName") or s for s in close.columns],
+        "Close": last,
+        "1D %": pct_vs(1),
+        "5D %": pct_vs(5),
+        "1M %": pct_vs(21),
+        "vs SMA20 %": (last / close.tail(20).mean() - 1) * 100,
+        "Vol/Avg20": volume.iloc[-1] / volume.tail(20).mean().replace(0, float("nan")),
+        "P/E": [infos.get(s, {}).get("trailingPE") for s in close.columns],
+        "MCap Cr": [(infos.get(s, {}).get("marketCap") or 0) / 1e7 or None for s in close.columns],
+        "Sector": [infos.get(s, {}).get("sector", "") for s in close.columns],
+    }, index=close.columns)
+    summary.index.name = "Symbol"
+    return summary.round(2)
+
+
+def get_universe_snapshot(symbols, period="3mo"):
+    """Batched history plus threaded fundamentals, summarized per symbol"""
+    frames = download_history(symbols, period=period, interval="1d")
+    infos = fetch_info(list(frames)) if frames else {}
+    return summarize(frames, infos)